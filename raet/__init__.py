@@ -5,7 +5,8 @@ raet modules
 __init__.py file for raet package
 '''
 
-__all__ = ['raeting', 'nacling', 'keeping', 'lotting', 'stacking', 'road', 'lane']
+__all__ = ['raeting', 'nacling', 'keeping', 'lotting', 'serializing', 'stacking',
+           'road', 'lane']
 
 import importlib
 for m in __all__:
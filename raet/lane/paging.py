@@ -12,11 +12,6 @@ try:
 except ImportError:
     import json
 
-try:
-    import msgpack
-except ImportError:
-    mspack = None
-
 # Import ioflo libs
 from ioflo.base.odicting import odict
 
@@ -26,6 +21,7 @@ console = getConsole()
 # Import raet libs
 from ..abiding import *  # import globals
 from .. import raeting
+from .. import serializing
 from ..raeting import PackKind
 
 class Part(object):
@@ -153,22 +149,12 @@ class TxBody(Body):
         self.packed = b''
         pk = self.page.data['pk']
 
-        if pk == PackKind.json:
-            if self.data:
-                self.packed = ns2b(json.dumps(self.data,
-                                         separators=(',', ':'),
-                                         encoding='utf-8'))
-        elif pk == PackKind.pack:
-            if self.data:
-                if not msgpack:
-                    emsg = "Msgpack not installed."
-                    raise raeting.PacketError(emsg)
-                self.packed = msgpack.dumps(self.data,
-                                            encoding='utf-8')
-        else:
+        serializer = serializing.PackSerializers.get(pk)
+        if serializer is None:
             emsg = "Unrecognized message pack kind '{0}'\n".format(pk)
             console.terse(emsg)
             raise raeting.PageError(emsg)
+        self.packed = serializer.pack(self.data)
 
         if self.size > raeting.MAX_MESSAGE_SIZE:
             emsg = "Packed message length of {0}, exceeds max of {1}".format(
@@ -187,25 +173,14 @@ class RxBody(Body):
         self.data = odict()
         pk = self.page.data['pk']
 
-        if pk not in list(PackKind):
+        serializer = serializing.PackSerializers.get(pk)
+        if serializer is None:
             emsg = "Unrecognizable page body."
             raise raeting.PageError(emsg)
 
-        if pk == PackKind.json:
-            if self.packed:
-                self.data = json.loads(self.packed.decode(encoding='utf-8'),
-                                       object_pairs_hook=odict,
-                                       encoding='utf-8')
-        elif pk == PackKind.pack:
-            if self.packed:
-                if not msgpack:
-                    emsg = "Msgpack not installed."
-                    raise raeting.PacketError(emsg)
-                self.data = msgpack.loads(self.packed,
-                                          object_pairs_hook=odict,
-                                          encoding='utf-8')
-
-        if not isinstance(self.data, Mapping):
+        self.data = serializer.parse(self.packed)
+
+        if serializer.Mapped and not isinstance(self.data, Mapping):
             emsg = "Message body not a mapping\n"
             console.terse(emsg)
             raise raeting.PageError(emsg)
@@ -60,6 +60,15 @@ header data =
         Next segment or ordered packet is waiting for ack to this packet
     ml: Message Length (MsgLen)  Default 0
         Length of message only (unsegmented)
+    mc: Message Count (MsgCnt) Default 0
+        Number of coalesced messages in body, 0 means body is one message
+    pg: Parity Group (PrtyGrp) Default 0
+        Number of segments per xor parity segment, 0 means no parity
+        Parity segment of group g has segment number sc + g
+    dd: Dedup Kind (DedupKind) Default 0
+        Step of deduplicated message exchange, 0 means ordinary message
+    rk: Resume Kind (ResumeKind) Default 0
+        Step of resumable message exchange, 0 means ordinary message
     sn: Segment Number (SgmtNum) Default 0
     sc: Segment Count  (SgmtCnt) Default 1
     sf: Segment Flag  (SgmtFlag) Default 0
@@ -68,6 +77,8 @@ header data =
         This segment is being sent again
 
     bk: Body kind   (BodyKind) Default 0
+    zk: Zip kind    (ZipKind) Default 0
+        Compression of packed body before coat
     ck: Coat kind   (CoatKind) Default 0
     fk: Footer kind   (FootKind) Default 0
     fl: Footer length (FootLen) Default 0
@@ -83,6 +94,10 @@ The Body .data is a Mapping
 Body Encoding
     When the body kind is json = 0, then the .data is json encoded
 
+Body Compression
+    When the zip kind is not nada = 0, then the encoded .data is compressed
+    before the coat encrypts it
+
 Body Decoding
 
 
@@ -118,6 +133,7 @@ UDP_MAX_DATAGRAM_SIZE = (2 ** 16) - 1  # 65535
 UDP_MAX_SAFE_PAYLOAD = 548  # IPV4 MTU 576 - udp headers 28
 # IPV6 MTU is 1280 but headers are bigger
 UDP_MAX_PACKET_SIZE = min(1024, UDP_MAX_DATAGRAM_SIZE)  # assumes IPV6 capable equipment
+UDP_MAX_PAYLOAD_SIZE = UDP_MAX_DATAGRAM_SIZE - 28  # 65507 IPV4 less ip and udp headers
 UXD_MAX_PACKET_SIZE = (2 ** 16) - 1  # 65535
 MAX_SEGMENT_COUNT = (2 ** 16) - 1  # 65535
 MAX_MESSAGE_SIZE = min(67107840, UDP_MAX_PACKET_SIZE * MAX_SEGMENT_COUNT)
@@ -160,6 +176,16 @@ class BodyKind(enum.IntEnum):
     unknown = 255
 
 
+@enum.unique
+class ZipKind(enum.IntEnum):
+    '''
+    Integer Enums of Body Compression Kinds
+    '''
+    nada = 0
+    zlib = 1
+    unknown = 255
+
+
 @enum.unique
 class FootKind(enum.IntEnum):
     '''
@@ -240,6 +266,8 @@ class PcktKind(enum.IntEnum):
     reject = 13
     pend = 14
     done = 15
+    container = 16
+    datagram = 17
     unknown = 255
 
 
@@ -272,6 +300,28 @@ class PackKind(enum.IntEnum):
     pack = 1
 
 
+@enum.unique
+class DedupKind(enum.IntEnum):
+    '''
+    Integer Enums of Dedup Kinds of deduplicated message exchange steps
+    '''
+    nada = 0
+    offer = 1
+    need = 2
+    chunks = 3
+
+
+@enum.unique
+class ResumeKind(enum.IntEnum):
+    '''
+    Integer Enums of Resume Kinds of resumable message exchange steps
+    '''
+    nada = 0
+    offer = 1
+    need = 2
+    piece = 3
+
+
 # head fields that may be included in packet header if not default value
 PACKET_DEFAULTS = odict([
                             ('sh', DEFAULT_SRC_HOST),
@@ -300,9 +350,14 @@ PACKET_DEFAULTS = odict([
                             ('sn', 0),
                             ('sc', 1),
                             ('ml', 0),
+                            ('mc', 0),
+                            ('pg', 0),
+                            ('dd', 0),
+                            ('rk', 0),
                             ('sf', False),
                             ('af', False),
                             ('bk', 0),
+                            ('zk', 0),
                             ('ck', 0),
                             ('fk', 0),
                             ('fl', 0),
@@ -312,13 +367,13 @@ PACKET_DEFAULTS = odict([
 PACKET_FIELDS = ['sh', 'sp', 'dh', 'dp',
                  'ri', 'vn', 'pk', 'pl', 'hk', 'hl',
                  'se', 'de', 'cf', 'bf', 'nf', 'df', 'vf', 'si', 'ti', 'tk',
-                 'dt', 'oi', 'wf', 'sn', 'sc', 'ml', 'sf', 'af',
-                 'bk', 'ck', 'fk', 'fl', 'fg']
+                 'dt', 'oi', 'wf', 'sn', 'sc', 'ml', 'mc', 'pg', 'dd', 'rk', 'sf', 'af',
+                 'bk', 'zk', 'ck', 'fk', 'fl', 'fg']
 
 PACKET_HEAD_FIELDS = ['ri', 'vn', 'pk', 'pl', 'hk', 'hl',
                'se', 'de', 'cf', 'bf', 'nf', 'df', 'vf', 'si', 'ti', 'tk',
-               'dt', 'oi', 'wf', 'sn', 'sc', 'ml', 'sf', 'af',
-               'bk', 'bl', 'ck', 'cl', 'fk', 'fl', 'fg']
+               'dt', 'oi', 'wf', 'sn', 'sc', 'ml', 'mc', 'pg', 'dd', 'rk', 'sf', 'af',
+               'bk', 'bl', 'zk', 'ck', 'cl', 'fk', 'fl', 'fg']
 
 PACKET_FLAGS = ['vf', 'df', 'nf', 'af', 'sf', 'wf', 'bf', 'cf']
 PACKET_FLAG_FIELDS = ['vf', 'df', 'nf', 'af', 'sf', 'wf', 'bf', 'cf']
@@ -346,9 +401,14 @@ PACKET_FIELD_FORMATS = odict([
                     ('sn', 'x'),
                     ('sc', 'x'),
                     ('ml', 'x'),
+                    ('mc', 'x'),
+                    ('pg', 'x'),
+                    ('dd', 'x'),
+                    ('rk', 'x'),
                     ('sf', ''),
                     ('af', ''),
                     ('bk', 'x'),
+                    ('zk', 'x'),
                     ('ck', 'x'),
                     ('fk', 'x'),
                     ('fl', 'x'),
@@ -4,7 +4,8 @@ road.raet package
 modules associated with UDP socket communications
 '''
 
-__all__ = ['estating', 'keeping', 'packeting', 'stacking', 'transacting']
+__all__ = ['estating', 'keeping', 'packeting', 'streaming', 'scheduling', 'limiting',
+           'exchanging', 'deduping', 'resuming', 'stacking', 'transacting']
 
 import  importlib
 for m in __all__:
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+'''
+deduping.py raet protocol message deduplication classes
+
+A large packed message body is split into content defined chunks named by
+their sha256 digest. The sender offers the digests, the receiver asks only
+for the chunks missing from its bounded chunk cache and rebuilds the body
+from cached and received chunks so repeated content crosses the wire once.
+'''
+# pylint: skip-file
+# pylint: disable=W0611
+
+# Import python libs
+import re
+import uuid
+import struct
+import random
+import hashlib
+from collections import OrderedDict
+
+# Import ioflo libs
+from ioflo.base.odicting import odict
+from ioflo.base import aiding
+
+from ioflo.base.consoling import getConsole
+console = getConsole()
+
+# Import raet libs
+from ..abiding import *  # import globals
+from .. import raeting, serializing
+from ..raeting import DedupKind
+from . import exchanging
+
+GEAR = tuple(random.Random(0x52414554).sample(xrange(1 << 32), 256)) # gear hash table
+DIGEST_RE = re.compile(r'[0-9a-f]{64}\Z')
+CHUNK_HEAD = struct.Struct(b'!I')  # length of each chunk in chunks body
+ID_SIZE = 32  # hex uuid dedup id leading chunks body
+
+
+def chunkify(data, size):
+    '''
+    Returns list of content defined chunks of bytes data averaging about size
+    bytes and between a quarter and four times size
+    A cut is made where a gear rolling hash of the trailing bytes matches a
+    mask so an insert or delete only changes the chunks around it
+    '''
+    size = max(64, int(size))
+    least = size // 4
+    most = size * 4
+    bits = max(1, (size - least).bit_length() - 1)
+    mask = ((1 << bits) - 1) << (32 - bits)
+    gear = GEAR
+    view = bytearray(data)
+    chunks = []
+    start = 0
+    end = len(view)
+    while start < end:
+        stop = min(start + most, end)
+        cut = stop
+        h = 0
+        for i in xrange(start + least, stop):
+            h = ((h << 1) + gear[view[i]]) & 0xffffffff
+            if not h & mask:
+                cut = i + 1
+                break
+        chunks.append(bytes(data[start:cut]))
+        start = cut
+    return chunks
+
+
+def digest(chunk):
+    '''
+    Returns hex sha256 digest naming chunk
+    '''
+    return hashlib.sha256(chunk).hexdigest()
+
+
+def packChunks(did, chunks):
+    '''
+    Returns raw chunks body of dedup id did and list of chunks
+    '''
+    parts = [ns2b(str(did))]
+    for chunk in chunks:
+        parts.append(CHUNK_HEAD.pack(len(chunk)))
+        parts.append(chunk)
+    return b''.join(parts)
+
+
+def unpackChunks(body):
+    '''
+    Returns duple (did, chunks) parsed from raw chunks body
+    Raises PacketError if body is truncated
+    '''
+    if not isinstance(body, bytes) or len(body) < ID_SIZE:
+        raise raeting.PacketError("Invalid dedup chunks, missing id")
+    did = body[:ID_SIZE].decode('ascii', 'replace')
+    chunks = []
+    index = ID_SIZE
+    while index < len(body):
+        if index + CHUNK_HEAD.size > len(body):
+            raise raeting.PacketError("Invalid dedup chunks, truncated head")
+        length, = CHUNK_HEAD.unpack_from(body, index)
+        index += CHUNK_HEAD.size
+        if index + length > len(body):
+            raise raeting.PacketError("Invalid dedup chunks, truncated chunk")
+        chunks.append(body[index:index + length])
+        index += length
+    return (did, chunks)
+
+
+class ChunkCache(exchanging.PartStore):
+    '''
+    Bounded cache of chunks keyed by string key with at most .size bytes
+    Least recently used chunks are evicted first
+    Chunks are held in memory or as files in .dirpath when given
+    '''
+    Ext = '.chunk'
+
+    def __init__(self, size, dirpath=''):
+        '''
+        Setup instance
+
+        size is max bytes of cached chunks
+        dirpath is directory of chunk files, empty means in memory
+        '''
+        super(ChunkCache, self).__init__(size=size, dirpath=dirpath)
+
+
+class TxDedup(exchanging.TxExchange):
+    '''
+    RAET protocol outgoing deduplicated message to remote at .uid
+    Offers the digests of the chunks of packed body and sends only the
+    chunks the remote needs
+    Kept until the chunks are delivered. Times out waiting for the need.
+    Once supplied the chunks transfer decides failure by its own timeout.
+    When any step fails the packed body is sent again whole
+    '''
+    Kind = 'dedup'
+
+    def __init__(self, stack, uid, packed, bk, timeout=None, expiry=None):
+        '''
+        Setup instance
+
+        packed is message body packed for body kind bk
+        timeout is passed to each message transaction of the exchange
+        expiry is stamp when message is dropped, None means never
+        '''
+        super(TxDedup, self).__init__(stack=stack,
+                                      uid=uid,
+                                      xid=uuid.uuid4().hex,
+                                      packed=packed,
+                                      bk=bk,
+                                      timeout=timeout,
+                                      expiry=expiry)
+        self.digests = [] # digest of each chunk in order
+        self.spans = odict() # (start, stop) of first chunk with digest
+        start = 0
+        for chunk in chunkify(packed, self.stack.dedupChunkSize):
+            name = digest(chunk)
+            self.digests.append(name)
+            if name not in self.spans:
+                self.spans[name] = (start, start + len(chunk))
+            start += len(chunk)
+        self.supplied = False # need received and chunks sent
+        self.timer = aiding.StoreTimer(self.stack.store,
+                                       duration=self.stack.DedupTimeout)
+
+    @property
+    def did(self):
+        '''
+        Property is dedup id
+        '''
+        return self.xid
+
+    def offer(self):
+        '''
+        Send offer of chunk digests
+        '''
+        self.send(odict(id=self.did,
+                        bk=self.bk,
+                        size=len(self.packed),
+                        hs=self.digests),
+                  dedup=DedupKind.offer.value)
+        self.stack.incStat('dedup_offer_tx')
+
+    def supply(self, body):
+        '''
+        Send the chunks with digests listed in need message body
+        Raises PacketError if body is invalid
+        '''
+        digests = body.get('hs')
+        if not isinstance(digests, list):
+            raise raeting.PacketError("Invalid dedup need, missing digests")
+        chunks = []
+        for name in digests:
+            span = self.spans.get(name)
+            if span is None:
+                raise raeting.PacketError("Invalid dedup need, unknown digest")
+            chunks.append(self.packed[span[0]:span[1]])
+        self.supplied = True
+        self.timer.restart()
+        sent = sum(len(chunk) for chunk in chunks)
+        self.stack.incStat('dedup_byte_saved', len(self.packed) - sent)
+        if not chunks:
+            self.finish()
+            return
+        self.send(packChunks(self.did, chunks), dedup=DedupKind.chunks.value)
+        self.stack.incStat('dedup_chunk_tx', len(chunks))
+
+    def complete(self, transfer):
+        '''
+        Step transfer, a message transaction or an exchange carrying the step,
+        completed. Done once the chunks are delivered
+        '''
+        if exchanging.stepKind(transfer, 'dd') == DedupKind.chunks:
+            self.finish()
+
+    def fail(self, transfer=None):
+        '''
+        Step transfer failed or exchange timed out when transfer is None
+        So give up and save the packed body to be sent again whole
+        '''
+        self.abandon()
+
+
+class RxDedup(exchanging.RxExchange):
+    '''
+    RAET protocol incoming deduplicated message from remote
+    Takes the offered chunks it can from the stack chunk cache and rebuilds
+    the body once the missing chunks arrive
+    '''
+    Kind = 'dedup'
+
+    def __init__(self, stack, remote, body):
+        '''
+        Setup instance from offer message body
+        Raises PacketError if body is invalid
+        '''
+        super(RxDedup, self).__init__(stack=stack, remote=remote, body=body)
+        self.cache = self.stack.fetchChunkCache()
+        self.chunks = odict() # held chunks keyed by digest
+        self.misseds = OrderedDict() # digests of chunks not cached in offer order
+        for name in self.digests:
+            if name in self.chunks or name in self.misseds:
+                continue
+            chunk = self.cache.get(self.key(name))
+            if chunk is None:
+                self.misseds[name] = None
+                self.stack.incStat('dedup_chunk_miss')
+            else:
+                self.chunks[name] = chunk
+                self.stack.incStat('dedup_chunk_hit')
+        self.timer = aiding.StoreTimer(self.stack.store,
+                                       duration=self.stack.DedupTimeout)
+
+    @property
+    def did(self):
+        '''
+        Property is dedup id
+        '''
+        return self.xid
+
+    def load(self, body):
+        '''
+        Load chunk digests from offer message body
+        '''
+        self.digests = [str(name) for name in body['hs']]
+        if not all(DIGEST_RE.match(name) for name in self.digests):
+            raise ValueError("bad digest")
+
+    def validId(self, xid):
+        '''
+        Returns True if offered dedup id xid is well formed
+        '''
+        return (len(xid) == ID_SIZE)
+
+    def key(self, name):
+        '''
+        Returns cache key of chunk digest name scoped to .remote so one remote
+        cannot learn what another sent
+        '''
+        return "{0}.{1}".format(self.remote.uid, name)
+
+    def need(self):
+        '''
+        Send need of missing chunk digests, empty when none are missing
+        '''
+        self.stack.message(odict(id=self.did, hs=list(self.misseds.keys())),
+                           uid=self.remote.uid,
+                           dedup=DedupKind.need.value)
+        self.stack.incStat('dedup_need_tx')
+
+    def receive(self, chunks):
+        '''
+        Hold and cache received chunks that were missing
+        '''
+        for chunk in chunks:
+            name = digest(chunk)
+            if name not in self.misseds:
+                self.stack.incStat('dedup_chunk_invalid')
+                continue
+            del self.misseds[name]
+            self.chunks[name] = chunk
+            self.cache.put(self.key(name), chunk)
+
+    def complete(self):
+        '''
+        Returns body rebuilt from chunks parsed per .bk
+        Raises PacketError if chunks are missing or body is invalid
+        '''
+        if self.misseds:
+            raise raeting.PacketError("Invalid dedup chunks, missing chunks")
+        return self.unpack(b''.join(self.chunks[name] for name in self.digests))
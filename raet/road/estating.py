@@ -7,7 +7,8 @@ estating.py raet protocol estate classes
 
 import socket
 import uuid
-from collections import deque
+import random
+from collections import deque, OrderedDict
 import sys
 if sys.version_info > (3,):
     long = int
@@ -23,6 +24,8 @@ from .. import raeting
 from ..raeting import TrnsKind
 from .. import nacling
 from .. import lotting
+from .. import serializing
+from . import limiting
 
 from ioflo.base.consoling import getConsole
 console = getConsole()
@@ -76,6 +79,7 @@ class Estate(lotting.Lot):
         self.dyned = dyned
         self.role = role if role is not None else self.name
         self.transactions = odict() # estate transactions keyed by transaction index
+        self.messengers = set() # locally initiated message transactions in .transactions
 
     @property
     def eha(self):
@@ -120,6 +124,8 @@ class Estate(lotting.Lot):
             emsg = "Cannot add transaction at index '{0}', alreadys exists".format(index)
             raise raeting.EstateError(emsg)
         self.transactions[index] = transaction
+        if transaction.kind == TrnsKind.message and not transaction.rmt:
+            self.messengers.add(transaction)
         transaction.remote = self
         console.verbose( "Added transaction to {0} at '{1}'\n".format(self.name, index))
 
@@ -130,6 +136,7 @@ class Estate(lotting.Lot):
         '''
         if index in self.transactions: # fast way
             if not transaction or transaction is self.transactions[index]:
+                self.messengers.discard(self.transactions[index])
                 del self.transactions[index]
                 console.verbose( "Removed transaction from {0} at"
                                  " '{1}'\n".format(self.name, index))
@@ -138,6 +145,7 @@ class Estate(lotting.Lot):
         if transaction: # find transaction slow way
             for i, trans in self.transactions.items():
                 if trans is transaction:
+                    self.messengers.discard(trans)
                     del self.transactions[i]
                     console.concise( "Removed transaction from '{0}' at '{1}',"
                             " instead of at '{2}'\n".format(self.name, i, index))
@@ -197,7 +205,20 @@ class RemoteEstate(Estate):
     .alive = False, dead, recently have not received valid signed packets from remote
 
     .fuid is the far uid of the remote as owned by the farside stack
+
+    .period is the current keep alive period which backs off for stable remotes
+        when the stack is adaptive
+
+    .srtt is the smoothed round trip time, .rttvar its mean deviation and
+    .rto the retransmission timeout derived from them (Jacobson/Karn).
+        All None until the first round trip sample
+
+    .cwnd is the congestion window in segments and .ssthresh the slow start
+        threshold of message transfers when the stack is congestive
     '''
+    RttGain = 0.125 # gain of new sample in smoothed round trip time, alpha
+    RttVarGain = 0.25 # gain of new sample in round trip variation, beta
+    RttVarFactor = 4.0 # multiplier of round trip variation in rto, K
 
     def __init__(self,
                  stack,
@@ -247,20 +268,73 @@ class RemoteEstate(Estate):
         self.pubber = nacling.Publican(pubkey) # correspondent long term key manager
 
         self.rsid = rsid # last sid received from remote when RmtFlag is True
+        self.bcstRsid = 0 # last broadcast sid received from remote
+        self.bcstTids = OrderedDict() # stamps of received broadcast tids keyed by tid
+        self.doneTids = OrderedDict() # stamps of completed received messages keyed by (sid, tid)
+        self.dgRsid = 0 # sid of received datagram window
+        self.dgTid = 0 # highest received datagram tid of .dgRsid
+        self.dgMask = 0 # bit n set when datagram tid .dgTid - n received
+        self.packetSize = 0 # agreed max packet size, 0 means UDP_MAX_PACKET_SIZE
+        self.probeSize = 0 # agreed packet size not yet probed, 0 means none
+        self.parityGroup = None # segments per parity segment, None means stack default
 
         # persistence keep alive heartbeat timer. Initial duration has offset so
         # not synced with other side persistence heatbeet
         # by default do not use offset on main
+        self.period = self.stack.period # current adaptive keep alive period
         if self.stack.main:
-            duration = self.stack.period
+            duration = self.jittered(self.period)
         else:
-            duration = self.stack.period + self.stack.offset
+            duration = self.jittered(self.period) + self.stack.offset
         self.timer = aiding.StoreTimer(store=self.stack.store,
                                        duration=duration)
 
         self.reapTimer = aiding.StoreTimer(self.stack.store,
                                            duration=self.stack.interim)
-        self.messages = deque() # deque of saved stale message body data to remote.uid
+        self.messages = deque() # deque of saved stale message duples (body, expiry) to remote.uid
+        self.spool = None # on disk spool of saved messages when stack spools
+        self.resending = False # True while saved messages are being resent
+        self.resendBucket = None # token bucket pacing resend of saved messages
+
+        self.srtt = None # smoothed round trip time
+        self.rttvar = None # round trip time variation
+        self.rto = None # estimated retransmission timeout, None means no estimate
+
+        self.cwnd = float(self.stack.windowInitial) # congestion window in segments
+        self.ssthresh = float(self.stack.windowMax) # slow start threshold
+        self.shrinkStamp = None # stamp of last loss decrease of .cwnd
+
+        self.coalesceds = deque() # triples (body, timeout, expiry) held for coalescing
+        self.coalescedSize = 0 # packed size of coalesced bodies
+        self.lingerTimer = aiding.StoreTimer(self.stack.store,
+                                             duration=self.stack.linger)
+
+        self.queueds = deque() # message tuples waiting for in flight transactions
+        self.queueHighed = False # True once .queueds reached high watermark
+
+        self.replays = OrderedDict() # duples (digest, stamp) of verified packets keyed by replay key
+        self.replayVerkey = None # verify key of remote when .replays were verified
+        self.rxBucket = None # receive rate limit token bucket when limited
+
+    @property
+    def ha(self):
+        '''
+        property that returns ha, host address duple (host, port), of remote
+        '''
+        return self._ha
+
+    @ha.setter
+    def ha(self, value):
+        '''
+        setter for ha property keeps stack .haRemotes index current
+        '''
+        old = getattr(self, '_ha', None)
+        self._ha = value
+        stack = self.stack
+        if (stack is not None and hasattr(stack, 'haRemotes') and
+                stack.remotes.get(self.uid) is self):
+            stack.unindexRemoteHa(self, old)
+            stack.indexRemoteHa(self)
 
     @property
     def nuid(self):
@@ -311,14 +385,86 @@ class RemoteEstate(Estate):
         '''
         return self.validateSid(new=rsid, old=self.rsid)
 
+    def validBcst(self, sid, tid):
+        '''
+        Returns True if broadcast transaction sid tid from remote is neither
+        from an older broadcast session nor already received
+        A newer broadcast session forgets the tids of the older one
+        '''
+        if not self.validateSid(new=sid, old=self.bcstRsid):
+            return False
+        if sid != self.bcstRsid:
+            self.bcstRsid = sid
+            self.bcstTids.clear()
+        return (tid not in self.bcstTids)
+
+    def receivedBcst(self, tid):
+        '''
+        Remember broadcast tid of .bcstRsid as received forgetting the oldest
+        beyond stack .BcstMemory
+        '''
+        while len(self.bcstTids) >= self.stack.BcstMemory:
+            self.bcstTids.popitem(last=False) # oldest first
+        self.bcstTids[tid] = self.stack.store.stamp
+
+    def validDatagram(self, sid, tid):
+        '''
+        Returns True if datagram sid tid from remote is neither from an older
+        session nor already received nor older than stack .DatagramWindow tids
+        below the highest received
+        '''
+        if sid != self.dgRsid:
+            return self.validateSid(new=sid, old=self.dgRsid)
+        ahead = (tid - self.dgTid) % raeting.SID_WRAP_MODULO
+        if ahead and ahead < raeting.SID_WRAP_DELTA:
+            return True
+        back = (self.dgTid - tid) % raeting.SID_WRAP_MODULO
+        if back >= self.stack.DatagramWindow:
+            return False
+        return not (self.dgMask >> back) & 1
+
+    def receivedDatagram(self, sid, tid):
+        '''
+        Mark datagram sid tid as received sliding the datagram window when
+        tid is the highest. Assumes validDatagram
+        '''
+        if sid != self.dgRsid:
+            self.dgRsid = sid
+            self.dgTid = tid
+            self.dgMask = 1
+            return
+        window = self.stack.DatagramWindow
+        ahead = (tid - self.dgTid) % raeting.SID_WRAP_MODULO
+        if ahead and ahead < raeting.SID_WRAP_DELTA:
+            if ahead < window:
+                self.dgMask = ((self.dgMask << ahead) | 1) & ((1 << window) - 1)
+            else: # whole window slid past
+                self.dgMask = 1
+            self.dgTid = tid
+        else:
+            self.dgMask |= 1 << ((self.dgTid - tid) % raeting.SID_WRAP_MODULO)
+
+    def doneMessage(self, sid, tid):
+        '''
+        Remember received message transaction sid tid as completed forgetting
+        the oldest beyond stack .DoneMemory
+        '''
+        self.doneTids.pop((sid, tid), None)
+        self.doneTids[(sid, tid)] = self.stack.store.stamp
+        while len(self.doneTids) > self.stack.DoneMemory:
+            self.doneTids.popitem(last=False) # oldest first
+
     def refresh(self, alived=True):
         '''
         Restart presence heartbeat timer and conditionally reapTimer
         If alived is None then do not change .alived  but update timer
         If alived is True then set .alived to True and handle implications
         If alived is False the set .alived to False and handle implications
+        and reset adaptive keep alive period
         '''
-        self.timer.restart(duration=self.stack.period)
+        if alived is False:
+            self.period = self.stack.period
+        self.timer.restart(duration=self.jittered(self.period))
         if alived is None:
             return
 
@@ -329,6 +475,107 @@ class RemoteEstate(Estate):
         #otherwise let timer run both before and after are still dead
         self.alived = alived
 
+    def jittered(self, period):
+        '''
+        Returns period shortened by random fraction up to stack .jitter so
+        keep alive timers of many remotes do not expire in lock step
+        '''
+        if self.stack.jitter:
+            period = period * (1.0 - random.random() * self.stack.jitter)
+        return period
+
+    def backoff(self):
+        '''
+        Double adaptive keep alive period of stable remote up to stack .periodMax
+        '''
+        if self.stack.adaptive and self.period < self.stack.periodMax:
+            self.period = min(self.period * 2.0, self.stack.periodMax)
+            self.stack.incStat('alive_backoff')
+
+    def sampleRtt(self, rtt):
+        '''
+        Update round trip time estimates with new sample rtt and derive
+        retransmission timeout .rto bounded by stack .rtoMin and .rtoMax
+        '''
+        rtt = max(0.0, rtt)
+        if self.srtt is None: # first sample
+            self.srtt = rtt
+            self.rttvar = rtt / 2.0
+        else:
+            self.rttvar = ((1.0 - self.RttVarGain) * self.rttvar +
+                            self.RttVarGain * abs(self.srtt - rtt))
+            self.srtt = (1.0 - self.RttGain) * self.srtt + self.RttGain * rtt
+        rto = self.srtt + self.RttVarFactor * self.rttvar
+        self.rto = min(max(rto, self.stack.rtoMin), self.stack.rtoMax)
+        self.stack.incStat('rtt_sample')
+        self.stack.updateStat('rtt_{0}'.format(self.name), self.srtt)
+        self.stack.updateStat('rto_{0}'.format(self.name), self.rto)
+
+    def openWindow(self, acked=1):
+        '''
+        Grow congestion window after acked segments were acknowledged
+        Slow start grows by acked below .ssthresh, that is doubles each round
+        trip, otherwise additive increase of about one segment per round trip
+        '''
+        if not self.stack.congestive or acked < 1:
+            return
+        if self.cwnd < self.ssthresh:
+            self.cwnd += acked
+        else:
+            self.cwnd += float(acked) / self.cwnd
+        self.cwnd = min(self.cwnd, self.stack.windowMax)
+        self.stack.updateStat('cwnd_{0}'.format(self.name), self.cwnd)
+
+    def shrinkWindow(self, timeout=False):
+        '''
+        Multiplicative decrease of congestion window on loss
+        Only once per round trip since a burst of losses is one congestion event
+        Timeout means no feedback at all so restart slow start from one segment
+        '''
+        if not self.stack.congestive:
+            return
+        stamp = self.stack.store.stamp
+        if (not timeout and self.shrinkStamp is not None and
+                (stamp - self.shrinkStamp) < (self.srtt or 0.0)):
+            return
+        self.shrinkStamp = stamp
+        self.ssthresh = max(self.cwnd / 2.0, 2.0)
+        if timeout:
+            self.cwnd = 1.0
+            self.stack.incStat('window_timeout')
+        else:
+            self.cwnd = self.ssthresh
+            self.stack.incStat('window_loss')
+        self.stack.updateStat('cwnd_{0}'.format(self.name), self.cwnd)
+
+    def replayed(self, key, digest):
+        '''
+        Returns stamp when packet with replay key and digest was verified
+        Otherwise None
+        Forgets verified packets once verify key of remote changes
+        '''
+        if self.replayVerkey != self.verfer.keyraw:
+            self.replays.clear()
+            self.replayVerkey = self.verfer.keyraw
+            return None
+        entry = self.replays.get(key)
+        if entry and entry[0] == digest:
+            return entry[1]
+        return None
+
+    def addReplay(self, key, digest):
+        '''
+        Remember digest of packet with replay key verified now
+        Keeps the most recent .stack.ReplayWindow packets
+        '''
+        if self.replayVerkey != self.verfer.keyraw:
+            self.replays.clear()
+            self.replayVerkey = self.verfer.keyraw
+        self.replays.pop(key, None)
+        self.replays[key] = (digest, self.stack.store.stamp)
+        while len(self.replays) > self.stack.ReplayWindow:
+            self.replays.popitem(last=False) # oldest first
+
     def manage(self, cascade=False, immediate=False):
         '''
         Perform time based processing of keep alive heatbeat
@@ -337,6 +584,8 @@ class RemoteEstate(Estate):
             if immediate or self.timer.expired:
                 # alive transaction restarts self.timer
                 self.stack.alive(uid=self.uid, cascade=cascade)
+            if self.probeSize and self.allowed and not self.probeInProcess():
+                self.stack.alive(uid=self.uid, probe=self.probeSize)
             if self.stack.interim >  0.0 and self.reapTimer.expired:
                 self.reap()
 
@@ -383,7 +632,8 @@ class RemoteEstate(Estate):
         for index, transaction in self.transactions.items():
             sid = index[3]
             rf = index[0] # correspondent
-            if rf and not self.validRsid(sid):
+            bf = index[5] # broadcast has own sids
+            if rf and not bf and not self.validRsid(sid):
                 transaction.nack()
                 self.removeTransaction(index)
                 emsg = ("Stack {0}: Stale correspondent {1} from remote {1} at {2}"
@@ -437,26 +687,110 @@ class RemoteEstate(Estate):
     def saveMessage(self, messenger):
         '''
         Save copy of body data from stale initiated messenger onto .messages deque
-        for retransmitting later after new session is established
+        or disk spool for retransmitting later after new session is established
         messenger is instance of Messenger compatible transaction
         '''
-        self.messages.append(odict(messenger.tray.body))
+        if messenger.stream: # stream chunk or resumable step resent by its owner
+            return
+        if messenger.tray.data.get('dd') or messenger.tray.data.get('rk'):
+            return # need step, the exchange sender saves the body itself
+        if messenger.tray.data.get('mc'): # split coalesced messages
+            bodies = messenger.tray.body['ms']
+        else:
+            bodies = [messenger.tray.body]
+        for body in bodies:
+            if not isinstance(body, serializing.Packed):
+                body = odict(body)
+            self.saveBody(body, expiry=messenger.expiry)
         emsg = ("Stack {0}: Saved stale message with remote {1}"
                                                 "\n".format(self.stack.name,
                                                             self.name))
         console.concise(emsg)
 
+    def fetchSpool(self):
+        '''
+        Returns disk spool of saved messages creating it from keep if needed
+        Returns None if stack does not spool to disk
+        '''
+        if self.spool is None and self.stack.spoolSize:
+            self.spool = self.stack.keep.createSpool(self.name,
+                                                     size=self.stack.spoolSize,
+                                                     count=self.stack.spoolCount,
+                                                     store=self.stack.store)
+        return self.spool
+
+    def saveBody(self, body, expiry=None):
+        '''
+        Save body with expiry stamp evicting oldest saved messages over the
+        stack spool caps
+        '''
+        spool = self.fetchSpool()
+        if spool is not None:
+            stored, evicted = spool.push(body, expiry=expiry)
+            if not stored:
+                self.stack.incStat('spool_dropped')
+        else:
+            stored, evicted = (True, 0)
+            while self.stack.spoolCount and len(self.messages) >= self.stack.spoolCount:
+                self.messages.popleft()
+                evicted += 1
+            self.messages.append((body, expiry))
+        if evicted:
+            self.stack.incStat('spool_evicted', evicted)
+        if stored:
+            self.stack.incStat('spool_saved')
+
+    def savedCount(self):
+        '''
+        Returns number of saved messages
+        '''
+        spool = self.fetchSpool()
+        return (len(self.messages) + (len(spool) if spool is not None else 0))
+
     def sendSavedMessages(self):
         '''
-        Message is Messenger compatible transaction
-        Save stale initiated message for retransmitting later after new session is established
+        Start resending saved stale messages now that new session is established
+        paced by stack .spoolRate
         '''
-        while self.messages:
-            body = self.messages.popleft()
-            self.stack.message(body, uid=self.uid)
+        self.resending = True
+        if self.stack.spoolRate > 0.0:
+            self.resendBucket = limiting.TokenBucket(store=self.stack.store,
+                                                     rate=self.stack.spoolRate)
+        self.resendSaved()
+
+    def resendSaved(self):
+        '''
+        Resend saved messages oldest first while resend bucket allows
+        '''
+        spool = self.fetchSpool()
+        while self.messages or spool:
+            if self.resendBucket is not None and not self.resendBucket.take():
+                return
+            if self.messages:
+                body, expiry = self.messages.popleft()
+            else:
+                body, expiry = spool.pop()
+            if self.stack.expire(expiry, remote=self):
+                continue
+            self.stack.message(body, uid=self.uid, expiry=expiry)
+            self.stack.incStat('spool_resent')
             emsg = ("Stack {0}: Resent saved message with remote {1}"
                                         "\n".format(self.stack.name, self.name))
             console.concise(emsg)
+        self.resending = False
+        self.resendBucket = None
+
+    def clearSaved(self):
+        '''
+        Remove saved messages including disk spool
+        '''
+        self.messages.clear()
+        self.resending = False
+        self.resendBucket = None
+        if self.spool is not None:
+            self.spool.clear()
+        elif self.stack.spoolSize:
+            self.stack.keep.clearSpoolData(self.name)
 
     def allowInProcess(self):
         '''
@@ -466,6 +800,21 @@ class RemoteEstate(Estate):
         return ([t for t in self.transactions.values()
                      if t.kind == TrnsKind.allow])
 
+    def messageInProcess(self):
+        '''
+        Returns list of locally initiated message transactions with this
+        remote that are in process
+        '''
+        return list(self.messengers)
+
+    def probeInProcess(self):
+        '''
+        Returns list of packet size probing alive transactions with this
+        remote that are in process
+        '''
+        return ([t for t in self.transactions.values()
+                     if t.kind == TrnsKind.alive and getattr(t, 'probe', 0)])
+
     def joinInProcess(self):
         '''
         Returns  list of transactions for all join transaction with this remote
@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+'''
+exchanging.py raet protocol message exchange base classes
+
+Deduplicated and resumable messages send a large packed body as an exchange
+of steps each its own message transaction. The sender packs the body once and
+offers it, the receiver answers with what it needs and the sender supplies
+it. Received parts are held in a part store in memory or on disk.
+'''
+# pylint: skip-file
+# pylint: disable=W0611
+
+# Import python libs
+import os
+from collections import Mapping, OrderedDict
+
+# Import ioflo libs
+from ioflo.base.odicting import odict
+
+from ioflo.base.consoling import getConsole
+console = getConsole()
+
+# Import raet libs
+from ..abiding import *  # import globals
+from .. import raeting, serializing
+
+
+def stepKind(transfer, field):
+    '''
+    Returns step kind value in head field of transfer that is a message
+    transaction or an exchange carrying a step, 0 when none
+    '''
+    if isinstance(transfer, TxExchange):
+        return transfer.carries.get(field, 0)
+    return transfer.tray.data.get(field, 0)
+
+
+class PartStore(object):
+    '''
+    Parts of message bodies keyed by key with at most .size bytes when .size
+    is not None. Least recently used parts are evicted first
+    Parts are held in memory or as files in .dirpath when given
+    Existing part files in .dirpath are loaded oldest first
+    '''
+    Ext = '.part'
+
+    def __init__(self, size=None, dirpath=''):
+        '''
+        Setup instance
+
+        size is max bytes of stored parts, None means no limit
+        dirpath is directory of part files, empty means in memory
+        '''
+        self.size = max(0, int(size)) if size is not None else None
+        self.dirpath = dirpath
+        self.entries = OrderedDict() # part or its length when on disk keyed by key
+        self.total = 0 # bytes stored
+        if self.dirpath:
+            if not os.path.exists(self.dirpath):
+                os.makedirs(self.dirpath)
+            paths = []
+            for name in os.listdir(self.dirpath):
+                root, ext = os.path.splitext(name)
+                key = self.keyed(root) if ext == self.Ext else None
+                if key is not None:
+                    paths.append((os.path.join(self.dirpath, name), key))
+            for path, key in sorted(paths, key=lambda p: os.path.getmtime(p[0])):
+                self.entries[key] = os.path.getsize(path)
+                self.total += self.entries[key]
+            self.trim()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def keyed(self, root):
+        '''
+        Returns key of part file named root or None when not a part file
+        '''
+        return root
+
+    def keys(self):
+        '''
+        Returns list of keys of stored parts
+        '''
+        return list(self.entries.keys())
+
+    def path(self, key):
+        '''
+        Returns file path of part with key
+        '''
+        return os.path.join(self.dirpath, "{0}{1}".format(key, self.Ext))
+
+    def length(self, key):
+        '''
+        Returns length of part with key or None if not stored
+        '''
+        entry = self.entries.get(key)
+        if entry is None or self.dirpath:
+            return entry
+        return len(entry)
+
+    def get(self, key):
+        '''
+        Returns part with key marking it most recently used
+        Returns None if not stored
+        '''
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return None
+        self.entries[key] = entry
+        if not self.dirpath:
+            return entry
+        try:
+            with open(self.path(key), 'rb') as f:
+                return f.read()
+        except (IOError, OSError):
+            self.discard(key)
+            return None
+
+    def put(self, key, part):
+        '''
+        Store part with key evicting least recently used parts over .size
+        Parts bigger than .size are not stored
+        '''
+        if key in self.entries:
+            self.get(key)
+            return
+        if self.size is not None and len(part) > self.size:
+            return
+        if self.dirpath:
+            path = self.path(key)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(part)
+            os.rename(path + '.tmp', path)
+            self.entries[key] = len(part)
+        else:
+            self.entries[key] = part
+        self.total += len(part)
+        self.trim()
+
+    def trim(self):
+        '''
+        Evict least recently used parts until at most .size bytes
+        '''
+        if self.size is None:
+            return
+        while self.total > self.size:
+            self.discard(next(iter(self.entries))) # oldest first
+
+    def discard(self, key):
+        '''
+        Remove part with key if stored
+        '''
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        if self.dirpath:
+            self.total -= entry
+            if os.path.exists(self.path(key)):
+                os.remove(self.path(key))
+        else:
+            self.total -= len(entry)
+
+    def clear(self):
+        '''
+        Remove all parts
+        '''
+        for key in self.keys():
+            self.discard(key)
+
+
+class TxExchange(object):
+    '''
+    RAET protocol outgoing message exchange of packed body to remote at .uid
+    Step message transactions report back as their .stream
+    An exchange carrying a step of its .owner exchange reports back to it
+    Otherwise when the exchange gives up the packed body is sent again whole
+    right away while the remote is allowed or saved with the remote until then
+    '''
+    Kind = 'exchange' # stat and log name
+
+    def __init__(self, stack, uid, xid, packed, bk, timeout=None, expiry=None,
+                 owner=None, carries=None):
+        '''
+        Setup instance
+
+        xid is exchange id
+        packed is message body packed for body kind bk
+        timeout is passed to each message transaction of the exchange
+        expiry is stamp when message is dropped, None means never
+        owner is exchange notified of outcome when this one carries its step
+        carries is mapping of head step kind fields of the carried step
+        '''
+        self.stack = stack
+        self.uid = uid
+        self.xid = xid
+        self.packed = packed
+        self.bk = bk
+        self.timeout = timeout
+        self.expiry = expiry
+        self.owner = owner
+        self.carries = odict(carries or {})
+        self.carrier = None # exchange carrying a step of this one
+        if self.owner is not None:
+            self.owner.carrier = self
+        self.done = False
+        self.failed = False
+        self.expired = False # expiry counted
+
+    def expire(self, remote=None):
+        '''
+        Returns True if message has expired counting it once against remote
+        '''
+        if not self.expired:
+            self.expired = self.stack.expire(self.expiry, remote=remote, uid=self.uid)
+        return self.expired
+
+    def send(self, body, index=-1, **kwa):
+        '''
+        Send step body as message transaction reporting back to this exchange
+        index is order index of step, -1 means none
+        kwa are the step kind of the message such as dedup or resume
+        '''
+        self.stack.message(body,
+                           uid=self.uid,
+                           timeout=self.timeout,
+                           stream=self,
+                           index=index,
+                           expiry=self.expiry,
+                           **kwa)
+
+    def finish(self):
+        '''
+        Mark message delivered and notify .owner
+        '''
+        if self.done or self.failed:
+            return
+        self.done = True
+        self.stack.incStat('{0}_tx_complete'.format(self.Kind))
+        console.concise("Stack {0}. Done {1} message {2} at {3}\n".format(
+                self.stack.name, self.Kind, self.xid, self.stack.store.stamp))
+        if self.owner is not None:
+            owner, self.owner = self.owner, None
+            owner.complete(self)
+
+    def abandon(self):
+        '''
+        Give up exchange. Notify .owner Otherwise unless expired send packed
+        body again whole now when remote is allowed else save it with remote
+        '''
+        if self.done or self.failed:
+            return
+        self.failed = True
+        self.stack.incStat('{0}_tx_failure'.format(self.Kind))
+        console.terse("Stack {0}. Failed {1} message {2}\n".format(
+                self.stack.name, self.Kind, self.xid))
+        if self.owner is not None:
+            owner, self.owner = self.owner, None
+            owner.fail(self)
+            return
+        remote = self.stack.remotes.get(self.uid)
+        if not remote or self.expire(remote=remote):
+            return
+        body = serializing.Packed(self.packed)
+        if remote.allowed:
+            self.stack.incStat('{0}_tx_resent'.format(self.Kind))
+            self.stack.message(body, uid=self.uid, expiry=self.expiry)
+        else:
+            remote.saveBody(body, expiry=self.expiry)
+
+
+class RxExchange(object):
+    '''
+    RAET protocol incoming message exchange from remote set up from offer
+    message body with id, body kind and size of the packed body
+    '''
+    Kind = 'exchange' # stat and log name
+
+    def __init__(self, stack, remote, body):
+        '''
+        Setup instance from offer message body
+        Raises PacketError if body is invalid
+        '''
+        if not isinstance(body, Mapping):
+            raise raeting.PacketError("Invalid {0} offer, not a mapping".format(
+                    self.Kind))
+        try:
+            self.xid = str(body['id'])
+            self.bk = int(body['bk'])
+            self.size = int(body['size'])
+            self.load(body)
+        except (KeyError, TypeError, ValueError, UnicodeError) as ex:
+            raise raeting.PacketError("Invalid {0} offer. {1}".format(self.Kind, ex))
+        if not self.validId(self.xid):
+            raise raeting.PacketError("Invalid {0} offer, bad id".format(self.Kind))
+        if not 0 <= self.size <= raeting.MAX_MESSAGE_SIZE:
+            raise raeting.PacketError("Invalid {0} offer, bad size".format(self.Kind))
+        self.stack = stack
+        self.remote = remote
+
+    def load(self, body):
+        '''
+        Load fields other than id, bk and size from offer message body
+        '''
+        pass
+
+    def validId(self, xid):
+        '''
+        Returns True if offered exchange id xid is well formed
+        '''
+        return bool(xid)
+
+    def unpack(self, packed):
+        '''
+        Returns body parsed from rebuilt packed body per .bk
+        Raises PacketError if body is invalid
+        '''
+        if len(packed) != self.size:
+            raise raeting.PacketError("Invalid {0} body, bad size".format(self.Kind))
+        serializer = serializing.BodySerializers.get(self.bk)
+        if serializer is None:
+            raise raeting.PacketError("Invalid {0} body kind '{1}'".format(
+                    self.Kind, self.bk))
+        try:
+            body = serializer.parse(packed)
+        except Exception as ex:
+            raise raeting.PacketError("Invalid {0} body. {1}".format(self.Kind, ex))
+        self.stack.incStat('{0}_rx_complete'.format(self.Kind))
+        return body
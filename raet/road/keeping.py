@@ -7,6 +7,9 @@ keeping.py raet protocol keep classes
 
 # Import python libs
 import os
+import time
+import shutil
+import struct
 from collections import deque
 
 try:
@@ -14,6 +17,11 @@ try:
 except ImportError:
     import json
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
 # Import ioflo libs
 from ioflo.base.odicting import odict
 from ioflo.base import aiding
@@ -24,6 +32,9 @@ from .. import raeting
 from ..raeting import AutoMode, Acceptance
 from .. import nacling
 from .. import keeping
+from .. import serializing
+from . import deduping
+from . import resuming
 
 from ioflo.base.consoling import getConsole
 console = getConsole()
@@ -44,6 +55,8 @@ class RoadKeep(keeping.Keep):
             role/
                 role.role.ext
                 role.role.ext
+            spool/
+                name.spool
     '''
     LocalFields = ['name', 'uid', 'ha', 'iha', 'natted', 'fqdn', 'dyned', 'sid',
                    'puid', 'aha', 'role', 'sighex','prihex']
@@ -480,6 +493,252 @@ class RoadKeep(keeping.Keep):
         remote.acceptance = Acceptance.accepted.value
         self.dumpRemoteRole(remote)
 
+    def createSpool(self, name, size=0, count=0, store=None):
+        '''
+        Returns MessageSpool of saved messages to remote with name
+        store is ioflo store whose stamps time message expiry
+        '''
+        spooldirpath = os.path.join(self.dirpath, 'spool')
+        if not os.path.exists(spooldirpath):
+            os.makedirs(spooldirpath)
+        return MessageSpool(filepath=os.path.join(spooldirpath,
+                                                  "{0}.spool".format(name)),
+                            size=size,
+                            count=count,
+                            store=store)
+
+    def createChunkCache(self, size):
+        '''
+        Returns ChunkCache of received dedup chunks kept on disk
+        '''
+        return deduping.ChunkCache(size=size,
+                                   dirpath=os.path.join(self.dirpath, 'chunks'))
+
+    def createPieceStore(self, key):
+        '''
+        Returns PieceStore of received pieces of resumable message with key
+        kept on disk
+        '''
+        return resuming.PieceStore(dirpath=os.path.join(self.dirpath, 'resumes', key))
+
+    def clearResumeData(self, age=None):
+        '''
+        Remove the kept pieces of resumable messages
+        age is min seconds since last modified of removed pieces, None means all
+        '''
+        resumedirpath = os.path.join(self.dirpath, 'resumes')
+        if not os.path.exists(resumedirpath):
+            return
+        for name in os.listdir(resumedirpath):
+            path = os.path.join(resumedirpath, name)
+            if age is None or time.time() - os.path.getmtime(path) >= age:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def clearSpoolData(self, name):
+        '''
+        Remove the spool file of remote with name
+        '''
+        filepath = os.path.join(self.dirpath, 'spool', "{0}.spool".format(name))
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+    def clearAllSpoolData(self):
+        '''
+        Remove all the spool files
+        '''
+        spooldirpath = os.path.join(self.dirpath, 'spool')
+        if not os.path.exists(spooldirpath):
+            return
+        for filename in os.listdir(spooldirpath):
+            root, ext = os.path.splitext(filename)
+            if ext != '.spool':
+                continue
+            os.remove(os.path.join(spooldirpath, filename))
+
+
+class MessageSpool(object):
+    '''
+    RAET protocol bounded on disk spool of saved message bodies to one remote
+    Records are appended to .filepath oldest first as a header of body kind,
+    body length and expiry followed by the serialized body
+    Expiry is kept as wall clock time since store stamps start over when the
+    stack restarts
+    Removed records are marked dead in place by their kind until compacted
+    Only record offsets and lengths are held in memory
+    '''
+    Header = struct.Struct('!cId') # body kind, body length, expiry or -1.0
+    Dead = b'x' # body kind of removed record
+    Compact = 65536 # min dead head bytes before the file is compacted
+
+    def __init__(self, filepath, size=0, count=0, store=None):
+        '''
+        Setup instance
+
+        filepath is spool file, existing records are loaded
+        size is max record bytes, 0 means no limit
+        count is max records, 0 means no limit
+        store is ioflo store whose stamps time expiry, None means expiry is
+        kept as given
+        '''
+        self.filepath = filepath
+        self.size = size
+        self.count = count
+        self.store = store
+        self.records = deque() # duples (offset, length) of records oldest first
+        self.bytes = 0 # total bytes of records
+        self.end = 0 # file offset after last record
+        self.load()
+
+    def __len__(self):
+        return len(self.records)
+
+    def load(self):
+        '''
+        Load record offsets from existing spool file
+        Truncates any partial record at the tail
+        '''
+        self.records.clear()
+        self.bytes = 0
+        self.end = 0
+        if not os.path.exists(self.filepath):
+            return
+        with open(self.filepath, 'r+b') as f:
+            while True:
+                head = f.read(self.Header.size)
+                if len(head) < self.Header.size:
+                    break
+                kind, length, expiry = self.Header.unpack(head)
+                if len(f.read(length)) < length:
+                    break
+                if kind != self.Dead:
+                    self.records.append((self.end, self.Header.size + length))
+                    self.bytes += self.Header.size + length
+                self.end += self.Header.size + length
+            f.truncate(self.end)
+
+    def dump(self, body):
+        '''
+        Returns duple (kind, serialized body) compactly serialized
+        Already serialized body is kept as is
+        '''
+        if isinstance(body, serializing.Packed):
+            return (b'p', bytes(body))
+        if msgpack:
+            return (b'm', msgpack.dumps(body, encoding='utf-8'))
+        return (b'j', ns2b(json.dumps(body,
+                                      separators=(',', ':'),
+                                      encoding='utf-8')))
+
+    def parse(self, kind, data):
+        '''
+        Returns body deserialized from data of kind
+        '''
+        if kind == b'p':
+            return serializing.Packed(data)
+        if kind == b'm':
+            if not msgpack:
+                raise raeting.KeepError("Invalid spool record needs msgpack installed")
+            return msgpack.loads(data, object_pairs_hook=odict, encoding='utf-8')
+        return json.loads(data.decode(encoding='utf-8'),
+                          object_pairs_hook=odict,
+                          encoding='utf-8')
+
+    def push(self, body, expiry=None):
+        '''
+        Append record of body with expiry stamp, None means never
+        Evicts oldest records to stay within .size and .count
+        Returns duple (stored, evicted) where stored is False if body alone
+        is bigger than .size and evicted is number of records evicted
+        '''
+        kind, data = self.dump(body)
+        length = self.Header.size + len(data)
+        if self.size and length > self.size:
+            return (False, 0)
+        evicted = 0
+        while self.records and ((self.size and self.bytes + length > self.size) or
+                                (self.count and len(self.records) >= self.count)):
+            self.drop()
+            evicted += 1
+        if expiry is None:
+            expiry = -1.0
+        elif self.store is not None: # store stamp to wall clock
+            expiry = max(0.0, time.time() + expiry - self.store.stamp)
+        head = self.Header.pack(kind, len(data), expiry)
+        with open(self.filepath, 'ab') as f:
+            f.write(head)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.records.append((self.end, length))
+        self.end += length
+        self.bytes += length
+        return (True, evicted)
+
+    def pop(self):
+        '''
+        Remove oldest record and return duple (body, expiry)
+        Raises IndexError if empty
+        '''
+        offset, length = self.records[0]
+        with open(self.filepath, 'rb') as f:
+            f.seek(offset)
+            kind, size, expiry = self.Header.unpack(f.read(self.Header.size))
+            data = f.read(size)
+        self.drop()
+        if expiry < 0.0:
+            expiry = None
+        elif self.store is not None: # wall clock to store stamp
+            expiry = self.store.stamp + expiry - time.time()
+        return (self.parse(kind, data), expiry)
+
+    def drop(self):
+        '''
+        Remove oldest record without reading it
+        Compacts or removes the file once enough of it is dead
+        '''
+        offset, length = self.records.popleft()
+        self.bytes -= length
+        if not self.records:
+            self.clear()
+            return
+        with open(self.filepath, 'r+b') as f:
+            f.seek(offset)
+            f.write(self.Dead)
+        dead = self.records[0][0]
+        if dead >= self.Compact and dead > self.bytes:
+            self.compact()
+
+    def compact(self):
+        '''
+        Rewrite spool file with only its records
+        '''
+        start = self.records[0][0]
+        temppath = "{0}.tmp".format(self.filepath)
+        with open(self.filepath, 'rb') as f:
+            f.seek(start)
+            with open(temppath, 'wb') as t:
+                while True:
+                    data = f.read(65536)
+                    if not data:
+                        break
+                    t.write(data)
+                t.flush()
+                os.fsync(t.fileno())
+        os.rename(temppath, self.filepath)
+        self.records = deque((offset - start, length) for offset, length in self.records)
+        self.end -= start
+
+    def clear(self):
+        '''
+        Remove all records and the spool file
+        '''
+        self.records.clear()
+        self.bytes = 0
+        self.end = 0
+        if os.path.exists(self.filepath):
+            os.remove(self.filepath)
+
+
 def clearAllKeep(dirpath):
     '''
     Convenience function to clear all road keep data in dirpath
@@ -489,4 +748,5 @@ def clearAllKeep(dirpath):
     road.clearLocalRoleData()
     road.clearAllRemoteData()
     road.clearAllRemoteRoleData()
+    road.clearAllSpoolData()
 
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+'''
+limiting.py raet protocol rate limiting classes
+
+Token buckets timed by store time so a flood from one source or remote is
+shed cheaply before it costs parsing, verification or replies.
+'''
+# pylint: skip-file
+# pylint: disable=W0611
+
+# Import python libs
+from collections import OrderedDict
+
+# Import ioflo libs
+from ioflo.base.consoling import getConsole
+console = getConsole()
+
+# Import raet libs
+from ..abiding import *  # import globals
+from .. import raeting
+
+
+class TokenBucket(object):
+    '''
+    Token bucket that refills at .rate tokens per second up to .size tokens
+    '''
+    def __init__(self, store, rate, size=0):
+        '''
+        Setup instance
+
+        store is ioflo store whose stamp times refills
+        rate is tokens per second
+        size is max tokens, 0 means one second worth of rate
+        '''
+        self.store = store
+        self.rate = float(rate)
+        self.size = float(max(1.0, size or self.rate))
+        self.tokens = self.size # starts full
+        self.stamp = self.store.stamp
+
+    def take(self, count=1):
+        '''
+        Returns True if count tokens were available and takes them
+        Otherwise returns False
+        '''
+        stamp = self.store.stamp
+        if stamp != self.stamp:
+            elapsed = max(0.0, stamp - self.stamp)
+            self.tokens = min(self.size, self.tokens + elapsed * self.rate)
+            self.stamp = stamp
+        if self.tokens < count:
+            return False
+        self.tokens -= count
+        return True
+
+
+class BucketMap(object):
+    '''
+    Token buckets keyed by source with at most .limit buckets
+    Least recently used bucket is forgotten first so spoofed sources cannot
+    grow memory nor push out the bucket of an active flooder
+    '''
+    def __init__(self, store, rate, size=0, limit=4096):
+        '''
+        Setup instance
+
+        store is ioflo store whose stamp times refills
+        rate is tokens per second of each bucket
+        size is max tokens of each bucket
+        limit is max number of buckets
+        '''
+        self.store = store
+        self.rate = rate
+        self.size = size
+        self.limit = max(1, int(limit))
+        self.buckets = OrderedDict() # least recently used first
+
+    def __len__(self):
+        return len(self.buckets)
+
+    def take(self, key, count=1):
+        '''
+        Returns True if count tokens were available in bucket for key
+        Creates bucket for key if none and marks it most recently used
+        '''
+        bucket = self.buckets.pop(key, None)
+        if bucket is None:
+            while len(self.buckets) >= self.limit:
+                self.buckets.popitem(last=False) # least recently used first
+            bucket = TokenBucket(store=self.store, rate=self.rate, size=self.size)
+        self.buckets[key] = bucket
+        return bucket.take(count)
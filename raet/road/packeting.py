@@ -6,17 +6,19 @@ packeting module provides classes for Raet packets
 '''
 
 # Import python libs
+import base64
+import binascii
+import hashlib
+import mmap
+import struct
+import tempfile
+import zlib
 from collections import Mapping, deque
 try:
     import simplejson as json
 except ImportError:
     import json
 
-try:
-    import msgpack
-except ImportError:
-    mspack = None
-
 # Import ioflo libs
 from ioflo.base.odicting import odict
 from ioflo.base.aiding import packByte, unpackByte
@@ -27,7 +29,9 @@ console = getConsole()
 # Import raet libs
 from ..abiding import *  # import globals
 from .. import raeting
-from ..raeting import PcktKind, TailSize, CoatKind, FootSize, FootKind, BodyKind, HeadKind
+from .. import serializing
+from ..raeting import (PcktKind, TailSize, CoatKind, FootSize, FootKind,
+                       BodyKind, HeadKind, ZipKind)
 
 class Part(object):
     '''
@@ -265,6 +269,41 @@ class Body(Part):
             data = odict()
         self.data = data
 
+def packBody(data, bk):
+    '''
+    Returns packed bytes of body data per serializer registered for body kind bk
+    '''
+    serializer = serializing.BodySerializers.get(bk)
+    if serializer is None:
+        return b''
+    return serializer.pack(data)
+
+def zipBody(packed, zk):
+    '''
+    Returns compressed packed body bytes per zip kind zk
+    '''
+    if zk == ZipKind.zlib:
+        return zlib.compress(packed)
+    return packed
+
+def unzipBody(packed, zk, limit=raeting.MAX_MESSAGE_SIZE):
+    '''
+    Returns decompressed packed body bytes per zip kind zk
+    Raises PacketError if corrupt or decompressed size exceeds limit
+    '''
+    if zk == ZipKind.zlib:
+        unzipper = zlib.decompressobj()
+        try:
+            unpacked = unzipper.decompress(packed, limit)
+        except zlib.error as ex:
+            emsg = "Packet body decompression failed. {0}".format(ex)
+            raise raeting.PacketError(emsg)
+        if unzipper.unconsumed_tail:
+            emsg = "Decompressed packet body exceeds max of {0}".format(limit)
+            raise raeting.PacketError(emsg)
+        return unpacked
+    return packed
+
 class TxBody(Body):
     '''
     RAET protocol tx packet body class
@@ -273,22 +312,31 @@ class TxBody(Body):
         '''
         Composes .packed, which is the packed form of this part
         '''
-        self.packed = b''
-        bk = self.packet.data['bk']
-        if bk == BodyKind.json:
-            if self.data:
-                self.packed = ns2b(json.dumps(self.data,
-                                              separators=(',', ':'),
-                                              encoding='utf-8'))
-        elif bk == BodyKind.msgpack:
-            if self.data:
-                if not msgpack:
-                    emsg = "Msgpack not installed."
-                    raise raeting.PacketError(emsg)
-                self.packed = msgpack.dumps(self.data,
-                                            encoding='utf-8')
-        elif bk == BodyKind.raw:
-            self.packed = self.data # data is already formatted string
+        self.packed = packBody(self.data, self.packet.data['bk'])
+        if self.packet.data['zk']:
+            self.zip()
+
+    def zip(self):
+        '''
+        Compress .packed per packet zip kind
+        Clears zip kind instead if .packed is below stack .ZipThreshold or
+        does not shrink
+        '''
+        data = self.packet.data
+        stack = self.packet.stack
+        threshold = stack.ZipThreshold if stack else 0
+        if len(self.packed) >= threshold:
+            zips = getattr(self.data, 'zips', None) # cache of shared packed body
+            if zips is not None:
+                if data['zk'] not in zips:
+                    zips[data['zk']] = zipBody(self.packed, data['zk'])
+                packed = zips[data['zk']]
+            else:
+                packed = zipBody(self.packed, data['zk'])
+            if len(packed) < len(self.packed):
+                self.packed = packed
+                return
+        data['zk'] = ZipKind.nada.value
 
 class RxBody(Body):
     '''
@@ -301,38 +349,27 @@ class RxBody(Body):
         '''
         bk = self.packet.data['bk']
 
-        if bk not in list(BodyKind):
+        serializer = serializing.BodySerializers.get(bk)
+        if serializer is None:
             self.packet.data['bk']= BodyKind.unknown.value
             emsg = "Unrecognizable packet body."
             raise raeting.PacketError(emsg)
 
         self.data = odict()
 
-        if bk == BodyKind.json:
-            if self.packed:
-                kit = json.loads(self.packed.decode(encoding='utf-8'),
-                                 object_pairs_hook=odict,
-                                 encoding='utf-8')
-                if not isinstance(kit, Mapping):
-                    emsg = "Packet body not a mapping."
-                    raise raeting.PacketError(emsg)
-                self.data = kit
-        elif bk == BodyKind.msgpack:
-            if self.packed:
-                if not msgpack:
-                    emsg = "Msgpack not installed."
-                    raise raeting.PacketError(emsg)
-                kit = msgpack.loads(self.packed,
-                                    object_pairs_hook=odict,
-                                    encoding='utf-8')
-                if not isinstance(kit, Mapping):
-                    emsg = "Packet body not a mapping."
-                    raise raeting.PacketError(emsg)
-                self.data = kit
-        elif bk == BodyKind.raw:
-            self.data = self.packed # return as bytes
-        elif bk == BodyKind.nada:
-            pass
+        zk = self.packet.data['zk']
+        if zk:
+            if zk not in list(ZipKind):
+                self.packet.data['zk'] = ZipKind.unknown.value
+                emsg = "Unrecognizable packet body compression."
+                raise raeting.PacketError(emsg)
+            self.packed = unzipBody(self.packed, zk)
+
+        kit = serializer.parse(self.packed)
+        if serializer.Mapped and not isinstance(kit, Mapping):
+            emsg = "Packet body not a mapping."
+            raise raeting.PacketError(emsg)
+        self.data = kit
 
 class Coat(Part):
     '''
@@ -472,6 +509,9 @@ class RxFoot(Foot):
                 raise raeting.PacketError(emsg)
 
             signature = self.packed
+            if self.packet.replay(): # exact duplicate of verified packet
+                return
+
             blank = b''.rjust(FootSize.nacl.value, b'\x00')
 
             front = self.packet.packed[:self.packet.size - fl]
@@ -530,15 +570,31 @@ class TxPacket(Packet):
     '''
     RAET Protocol Transmit Packet object
     '''
-    def __init__(self, embody=None, **kwa):
+    def __init__(self, embody=None, limit=None, **kwa):
         '''
         Setup TxPacket instance
+        limit is max packet size overriding the size agreed with the remote
         '''
         super(TxPacket, self).__init__(**kwa)
         self.head = TxHead(packet=self)
         self.body = TxBody(packet=self, data=embody)
         self.coat = TxCoat(packet=self)
         self.foot = TxFoot(packet=self)
+        self.sizeLimit = limit
+
+    @property
+    def limit(self):
+        '''
+        Property is max size of .packed. That is the packet size agreed with
+        the remote sent to if any Otherwise raeting.UDP_MAX_PACKET_SIZE
+        '''
+        if self.sizeLimit:
+            return self.sizeLimit
+        if self.stack:
+            remote = self.stack.remotes.get(self.data['se'])
+            if remote and remote.packetSize:
+                return remote.packetSize
+        return raeting.UDP_MAX_PACKET_SIZE
 
     @property
     def index(self):
@@ -601,9 +657,9 @@ class TxPacket(Packet):
                                self.foot.packed])
 
         self.sign()  # sign updates self.packed
-        if self.size > raeting.UDP_MAX_PACKET_SIZE:
+        if self.size > self.limit:
             emsg = "Packet length of {0}, exceeds max of {1}".format(
-                self.size, raeting.UDP_MAX_PACKET_SIZE)
+                self.size, self.limit)
             raise raeting.PacketError(emsg)
 
     def pack(self):
@@ -611,9 +667,9 @@ class TxPacket(Packet):
         Pack the parts of the packet and then the full packet into .packed
         '''
         self.prepack()
-        if self.size > raeting.UDP_MAX_PACKET_SIZE:
+        if self.size > self.limit:
             emsg = "Packet length of {0}, exceeds max of {1}".format(
-                    self.size, raeting.UDP_MAX_PACKET_SIZE)
+                    self.size, self.limit)
             raise raeting.PacketError(emsg)
         self.sign()
 
@@ -631,6 +687,8 @@ class RxPacket(Packet):
         self.coat = RxCoat(packet=self)
         self.foot = RxFoot(packet=self)
         self.packed = packed or ''
+        self.digest = None # digest of .packed when replay filtered
+        self.replayed = None # stamp original of exact duplicate was verified
 
     @property
     def index(self):
@@ -646,14 +704,43 @@ class RxPacket(Packet):
             re = (data['sh'], data['sp'])
         return ((not cf, le, re, data['si'], data['ti'], data['bf']))
 
+    @property
+    def replayKey(self):
+        '''
+        Property is replay window key tuple (si, ti, sn, pk)
+        '''
+        data = self.data
+        return ((data['si'], data['ti'], data['sn'], data['pk']))
+
+    def replay(self):
+        '''
+        Returns True if .packed is an exact duplicate of a packet already
+        verified from the same remote so verification can be skipped
+        Sets .replayed to the stamp when the original was verified
+        '''
+        if not self.stack or not self.stack.ReplayWindow:
+            return False
+        remote = self.stack.remotes.get(self.data['de'])
+        if not remote:
+            return False
+        self.digest = hashlib.sha256(self.packed).digest()
+        self.replayed = remote.replayed(self.replayKey, self.digest)
+        return (self.replayed is not None)
+
     def verify(self, signature, msg):
         '''
         Return result of verifying msg with signature
+        Remembers digest of verified packet when replay filtered
         '''
         nuid = self.data['de']
         if not nuid in self.stack.remotes:
             return False
-        return (self.stack.remotes[nuid].verfer.verify(signature, msg))
+        remote = self.stack.remotes[nuid]
+        if not remote.verfer.verify(signature, msg):
+            return False
+        if self.digest:
+            remote.addReplay(self.replayKey, self.digest)
+        return True
 
     def decrypt(self, cipher, nonce):
         '''
@@ -682,6 +769,16 @@ class RxPacket(Packet):
         Result is .data
         Raises PacketError exception If failure
         '''
+        self.parseHead(packed=packed)
+        self.parseFoot()
+
+    def parseHead(self, packed=None):
+        '''
+        Parses raw packet head from packed if provided or .packed otherwise
+        Deserializes head and checks version without verifying signature
+        Result is .data
+        Raises PacketError exception If failure
+        '''
         if packed:
             self.packed = packed
         if not self.packed:
@@ -695,6 +792,12 @@ class RxPacket(Packet):
                     "version '{1}'".format(self.data['vn']))
             raise raeting.PacketError(emsg)
 
+    def parseFoot(self):
+        '''
+        Parses foot (signature) if given and verifies signature
+        Assumes head already parsed
+        Raises PacketError exception If failure
+        '''
         self.foot.parse() #foot unpacks itself
 
     def unpackInner(self, packed=None):
@@ -748,11 +851,13 @@ class TxTray(Tray):
     '''
     Manages an outgoing message and ites associated packet(s)
     '''
-    def __init__(self, **kwa):
+    def __init__(self, parity=0, **kwa):
         '''
         Setup instance
+        parity is number of segments per xor parity segment, 0 means none
         '''
         super(TxTray, self).__init__(**kwa)
+        self.parity = parity
         self.packets = []
         self.current = 0 # next  packet to send
         self.last = 0 # last packet sent
@@ -774,27 +879,41 @@ class TxTray(Tray):
                           data=self.data)
 
         packet.prepack()
-        if packet.size <= raeting.UDP_MAX_PACKET_SIZE:
+        self.data['zk'] = packet.data['zk'] # cleared if not compressed
+        if packet.size <= packet.limit:
             packet.sign()
             self.packets.append(packet)
         else:
             self.packed = packet.coat.packed
-            self.packetize(headsize=packet.head.size, footsize=packet.foot.size)
+            self.packetize(headsize=packet.head.size,
+                           footsize=packet.foot.size,
+                           limit=packet.limit)
 
-    def packetize(self, headsize, footsize):
+    def packetize(self, headsize, footsize, limit=None):
         '''
         Create packeted segments from .packed using headsize footsize
+        limit is max packet size, None means raeting.UDP_MAX_PACKET_SIZE
         '''
         extrasize = 0
         if self.data['hk'] == HeadKind.raet:
             extrasize = 27 # extra header size as a result of segmentation
+            if self.parity:
+                extrasize += 8 # parity group field
         elif self.data['hk'] == HeadKind.json:
             extrasize = 36 # extra header size as a result of segmentation
+            if self.parity:
+                extrasize += 11 # parity group field
 
         hotelsize = headsize + extrasize + footsize
-        segsize = raeting.UDP_MAX_PACKET_SIZE - hotelsize
+        segsize = (limit or raeting.UDP_MAX_PACKET_SIZE) - hotelsize
 
         segcount = (self.size // segsize) + (1 if self.size % segsize else 0)
+        groupcount = 0
+        if self.parity:
+            groupcount = (segcount + self.parity - 1) // self.parity
+            if segcount + groupcount > raeting.MAX_SEGMENT_COUNT: # no room
+                groupcount = 0
+        self.data['pg'] = self.parity if groupcount else 0
         for i in range(segcount):
             if i == segcount - 1: #last segment
                 segment = self.packed[i * segsize:]
@@ -813,10 +932,40 @@ class TxTray(Tray):
             packet.sign()
             self.packets.append(packet)
 
+        for g in range(groupcount): # parity segments follow all segments
+            segments = [self.packed[i * segsize: (i+1) * segsize] for i in
+                        range(g * self.parity, min((g + 1) * self.parity, segcount))]
+            parity = xorSegments(segments)
+            packet = TxPacket( stack=self.stack,
+                                data=self.data)
+            packet.data.update(sn=segcount + g, sc=segcount, ml=self.size, sf=True)
+            packet.coat.packed = packet.body.packed = parity
+            packet.foot.pack()
+            packet.head.pack()
+            packet.packed = b''.join([packet.head.packed,
+                                     packet.coat.packed,
+                                     packet.foot.packed])
+            packet.sign()
+            self.packets.append(packet)
+
+
+def xorSegments(segments):
+    '''
+    Returns xor of segments each padded with zeros to the longest
+    '''
+    value = bytearray(max(len(segment) for segment in segments))
+    for segment in segments:
+        for i, byte in enumerate(bytearray(segment)):
+            value[i] ^= byte
+    return bytes(value)
+
 
 class RxTray(Tray):
     '''
     Manages segmentated messages and the associated packets
+    Segments of big messages, or when the stack in memory reassembly budget
+    is used up, are spilled into a memory mapped temporary file at their
+    offset instead of being held in memory
     '''
     def __init__(self, segments=None, **kwa):
         '''
@@ -824,8 +973,20 @@ class RxTray(Tray):
         '''
         super(RxTray, self).__init__(**kwa)
         self.segments = segments if segments is not None else []
+        self.parities = odict() # parity segments of incomplete groups keyed by group
         self.complete = False
         self.highest = 0  # highest segment number received
+        self.count = len([s for s in self.segments if s is not None])
+        self.reserved = 0  # bytes reserved from stack reassembly budget
+        self.file = None  # spill file when spilled
+        self.mmap = None  # memory map of spill file
+
+    @property
+    def spilled(self):
+        '''
+        Property is True if segments are spilled to disk
+        '''
+        return (self.mmap is not None)
 
     def parse(self, packet):
         '''
@@ -845,20 +1006,148 @@ class RxTray(Tray):
             self.complete = True
             return self.body
 
+        if self.complete:  # duplicate segment
+            return self.body
+
         if not self.segments: #get data from first packet received
             self.data.update(packet.data)
             self.segments = [None] * sc
+            self.reserve()
 
         hl = packet.data['hl']
         fl = packet.data['fl']
         segment = packet.packed[hl:packet.size - fl]
 
-        self.segments[sn] = segment
-        if None in self.segments:  # don't have all segments yet
+        pg = self.data['pg']
+        if pg and sn >= sc: # parity segment
+            group = sn - sc
+            if group < (sc + pg - 1) // pg:
+                self.parities[group] = segment
+                self.rebuild(group)
+        else:
+            self.store(sn, segment)
+            if pg:
+                self.rebuild(sn // pg)
+        if self.count < len(self.segments):  # don't have all segments yet
             return None
         self.body = self.desegmentize()
         return self.body
 
+    def store(self, sn, segment):
+        '''
+        Store segment sn in memory or spill mapping
+        '''
+        if self.segments[sn] is None:
+            self.count += 1
+        if self.spilled:
+            self.spill(sn, segment)
+            self.segments[sn] = True
+        else:
+            self.segments[sn] = segment
+
+    def segment(self, sn, size):
+        '''
+        Returns received segment sn where all but the last segment have size
+        '''
+        if not self.spilled:
+            return self.segments[sn]
+        offset = sn * size
+        return self.mmap[offset:min(offset + size, self.data['ml'])]
+
+    def rebuild(self, group):
+        '''
+        Rebuild the one missing segment of parity group from its parity
+        segment and the other segments of the group
+        '''
+        parity = self.parities.get(group)
+        if parity is None:
+            return
+        pg = self.data['pg']
+        sc = len(self.segments)
+        begin = group * pg
+        end = min(begin + pg, sc)
+        misseds = [i for i in range(begin, end) if self.segments[i] is None]
+        if len(misseds) > 1: # wait for more
+            return
+        del self.parities[group]
+        if not misseds: # nothing to rebuild
+            return
+        sn = misseds[0]
+        size = len(parity)
+        segment = xorSegments([parity] + [self.segment(i, size)
+                                          for i in range(begin, end) if i != sn])
+        if sn == sc - 1: # last segment may be short
+            segment = segment[:self.data['ml'] - sn * size]
+        self.store(sn, segment)
+        if self.stack:
+            self.stack.incStat('parity_rebuild')
+
+    @property
+    def pending(self):
+        '''
+        Property is True if parity segments not yet received may still rebuild
+        missing segments, that is the sender has not sent its last parity
+        segment yet
+        '''
+        pg = self.data['pg']
+        if not pg or not self.segments:
+            return False
+        sc = len(self.segments)
+        return (self.highest < sc + (sc + pg - 1) // pg - 1)
+
+    def reserve(self):
+        '''
+        Reserve message length from stack in memory reassembly budget or
+        spill to a memory mapped temporary file when message length is at least
+        stack .SpillSize or the budget is used up
+        '''
+        if not self.stack:
+            return
+        ml = self.data['ml']
+        spillSize = self.stack.SpillSize
+        budget = self.stack.ReassemblyBudget
+        if ml > 0 and ((spillSize and ml >= spillSize) or
+                       (budget and self.stack.reassemblySize + ml > budget)):
+            self.file = tempfile.TemporaryFile(prefix='raet', suffix='.spill')
+            self.file.truncate(ml)
+            self.mmap = mmap.mmap(self.file.fileno(), ml)
+            self.stack.incStat('reassembly_spill')
+        else:
+            self.reserved = ml
+            self.stack.reassemblySize += ml
+
+    def spill(self, sn, segment):
+        '''
+        Write segment sn into spill mapping at its offset
+        All but the last segment have the same size
+        '''
+        ml = self.data['ml']
+        if sn == len(self.segments) - 1:  # last segment
+            offset = ml - len(segment)
+        else:
+            offset = sn * len(segment)
+        if offset < 0 or offset + len(segment) > ml:
+            emsg = "Segment {0} at offset {1} exceeds message length {2}".format(
+                    sn, offset, ml)
+            raise raeting.PacketError(emsg)
+        self.mmap[offset:offset + len(segment)] = segment
+
+    def release(self):
+        '''
+        Release reassembly budget reservation, spill mapping and segments
+        '''
+        if self.reserved and self.stack:
+            self.stack.reassemblySize -= self.reserved
+        self.reserved = 0
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+        if self.file is not None:
+            self.file.close()  # temporary file so removed on close
+            self.file = None
+        self.segments = [None if s is None else True for s in self.segments]
+        self.parities.clear()
+
     def missing(self, begin=None, end=None):
         '''
         return list of missing packet numbers between begin (incl) and end (excl)
@@ -867,28 +1156,122 @@ class RxTray(Tray):
             begin = 0
         if end is None:
             end = self.highest  # don't return trailing empty numbers
+        end = min(end, len(self.segments)) # parity segments are not missed
         return [i for i in xrange(begin, end) if self.segments[i] is None]
 
     def desegmentize(self):
         '''
         Process message packet assumes already parsed outer so verified signature
         and processed header data
+        Decodes from the spill mapping directly when spilled
         '''
         sc = self.data['sc']
-        self.packed = b''.join(self.segments)
         ml = self.data['ml']
-        if sc > 1 and self.size != ml:
-            emsg = ("Full message payload length '{0}' does not equal head field"
-                                          " '{1}'".format(self.size, ml))
-            raise raeting.PacketError(emsg)
-
-        packet = RxPacket(stack = self.stack, data=self.data)
-        packet.coat.packed = self.packed
+        try:
+            if self.spilled:
+                self.packed = self.mmap
+            else:
+                self.packed = b''.join(self.segments)
+            if sc > 1 and self.size != ml:
+                emsg = ("Full message payload length '{0}' does not equal head field"
+                                              " '{1}'".format(self.size, ml))
+                raise raeting.PacketError(emsg)
 
-        packet.coat.parse()
-        packet.body.parse()
+            packet = RxPacket(stack = self.stack, data=self.data)
+            packet.coat.packed = self.packed
+
+            packet.coat.parse()
+            if isinstance(packet.body.packed, mmap.mmap):  # nada coat
+                packet.body.packed = packet.body.packed[:]
+            packet.body.parse()
+        finally:
+            if self.spilled:
+                self.packed = b''
+            self.release()
         self.complete = True
 
         return packet.body.data
 
 
+# bit offsets set in each byte value, used to expand sack bitmaps a byte at a time
+SACK_BITS = [tuple(b for b in range(8) if (v >> b) & 1) for v in range(256)]
+SACK_MAX_SIZE = 480  # max bitmap bytes in one resend body fits UDP_MAX_PACKET_SIZE
+
+def packSack(misseds, size=SACK_MAX_SIZE):
+    '''
+    Returns duple (body, remainders) where body is selective ack resend body
+    odict(base=base, bitmap=bitmap) for as many of the ascending list misseds
+    as fit in a bitmap of size bytes and remainders is list of the rest.
+    base is first missed segment number.
+    bitmap is base64 of bytes whose bit i (lsb first) set means segment
+    base + i is missed.
+    '''
+    if not misseds:
+        return (None, [])
+    base = misseds[0]
+    span = size * 8
+    bitmap = bytearray((min(misseds[-1] - base, span - 1) // 8) + 1)
+    remainders = []
+    for i, m in enumerate(misseds):
+        offset = m - base
+        if offset >= span:
+            remainders = misseds[i:]
+            break
+        bitmap[offset >> 3] |= (1 << (offset & 7))
+    body = odict(base=base, bitmap=base64.b64encode(bytes(bitmap)).decode('ascii'))
+    return (body, remainders)
+
+def unpackSack(body):
+    '''
+    Returns ascending list of missed segment numbers from selective ack
+    resend body as packed by packSack. Expands bitmap a byte at a time and
+    skips bytes with no misseds.
+    Raises PacketError if body is invalid
+    '''
+    try:
+        base = int(body['base'])
+        bitmap = bytearray(base64.b64decode(ns2b(str(body['bitmap']))))
+    except (KeyError, TypeError, ValueError, binascii.Error) as ex:
+        emsg = "Invalid selective ack resend body. {0}".format(ex)
+        raise raeting.PacketError(emsg)
+    if base < 0:
+        emsg = "Invalid selective ack resend base '{0}'".format(base)
+        raise raeting.PacketError(emsg)
+    misseds = []
+    for i, byte in enumerate(bitmap):
+        if byte:
+            offset = base + (i << 3)
+            misseds.extend(offset + b for b in SACK_BITS[byte])
+    return misseds
+
+
+CONTAINED_HEAD = struct.Struct(b'!HB')  # stripped packet length, stripped foot length
+
+def packContained(packed, footsize):
+    '''
+    Returns container body entry of signed packet packed with its signature
+    foot of footsize bytes stripped since the container is signed instead
+    '''
+    size = len(packed) - footsize
+    return (CONTAINED_HEAD.pack(size, footsize) + packed[:size])
+
+def unpackContained(body):
+    '''
+    Returns list of packets in container body as packed by packContained
+    Each stripped foot is restored as blank bytes so the head lengths hold
+    Raises PacketError if body is invalid
+    '''
+    packeds = []
+    offset = 0
+    while offset < len(body):
+        if offset + CONTAINED_HEAD.size > len(body):
+            emsg = "Truncated container entry head at {0}".format(offset)
+            raise raeting.PacketError(emsg)
+        size, footsize = CONTAINED_HEAD.unpack_from(body, offset)
+        offset += CONTAINED_HEAD.size
+        if offset + size > len(body):
+            emsg = "Truncated container entry at {0}".format(offset)
+            raise raeting.PacketError(emsg)
+        packeds.append(body[offset:offset + size] + b''.rjust(footsize, b'\x00'))
+        offset += size
+    return packeds
@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+'''
+resuming.py raet protocol resumable message classes
+
+A large packed message body is sent as pieces each its own message
+transaction under a stable id that is the digest of the body. The receiver
+keeps the pieces it received, in memory or on disk, so when a piece fails
+because of a timeout or a restart of either side the sender offers the body
+again and only sends the pieces still missing. When the resumable message
+gives up the body is saved with the remote to be sent again whole.
+'''
+# pylint: skip-file
+# pylint: disable=W0611
+
+# Import python libs
+import os
+import re
+import shutil
+import hashlib
+from collections import deque
+
+# Import ioflo libs
+from ioflo.base.odicting import odict
+from ioflo.base import aiding
+
+from ioflo.base.consoling import getConsole
+console = getConsole()
+
+# Import raet libs
+from ..abiding import *  # import globals
+from .. import raeting, serializing
+from ..raeting import ResumeKind, DedupKind
+from . import exchanging
+
+ID_RE = re.compile(r'[0-9a-f]{64}\Z')
+ID_SIZE = 64  # hex sha256 resume id leading piece body
+
+
+def resumeId(packed):
+    '''
+    Returns stable resume id of packed body, that is its hex sha256 digest
+    so the same body sent again after a restart resumes
+    '''
+    return hashlib.sha256(packed).hexdigest()
+
+
+def packPiece(rid, piece):
+    '''
+    Returns raw piece body of resume id rid and piece bytes
+    '''
+    return b''.join([ns2b(str(rid)), piece])
+
+
+def unpackPiece(body):
+    '''
+    Returns duple (rid, piece) parsed from raw piece body
+    Raises PacketError if body is truncated
+    '''
+    if not isinstance(body, bytes) or len(body) < ID_SIZE:
+        raise raeting.PacketError("Invalid resume piece, missing id")
+    return (body[:ID_SIZE].decode('ascii', 'replace'), body[ID_SIZE:])
+
+
+class PieceStore(exchanging.PartStore):
+    '''
+    Received pieces of one resumable message keyed by piece index
+    Pieces are held in memory or as files in .dirpath when given
+    '''
+    Ext = '.piece'
+
+    def __init__(self, dirpath=''):
+        '''
+        Setup instance
+
+        dirpath is directory of piece files, empty means in memory
+        Existing piece files in dirpath are loaded
+        '''
+        super(PieceStore, self).__init__(dirpath=dirpath)
+
+    def keyed(self, root):
+        '''
+        Returns piece index of piece file named root or None
+        '''
+        return int(root) if root.isdigit() else None
+
+    def clear(self):
+        '''
+        Remove all pieces and the directory of piece files
+        '''
+        self.entries.clear()
+        self.total = 0
+        if self.dirpath and os.path.exists(self.dirpath):
+            shutil.rmtree(self.dirpath, ignore_errors=True)
+
+
+class TxResume(exchanging.TxExchange):
+    '''
+    RAET protocol outgoing resumable message to remote at .uid
+    Offers the body, sends the pieces the remote needs and offers again to
+    learn the missing pieces whenever a piece message fails
+    Gives up when idle for .stack.ResumeTimeout
+    '''
+    Kind = 'resume'
+
+    def __init__(self, stack, uid, packed, bk, timeout=None, expiry=None,
+                 owner=None, carries=None, rid=None):
+        '''
+        Setup instance
+
+        packed is message body packed for body kind bk
+        timeout is passed to each message transaction of the exchange
+        expiry is stamp when message is dropped, None means never
+        owner is exchange notified of outcome when packed is its step
+        carries is mapping of head step kind fields of that step
+        rid is resume id of packed when already computed
+        '''
+        super(TxResume, self).__init__(stack=stack,
+                                       uid=uid,
+                                       xid=rid or resumeId(packed),
+                                       packed=packed,
+                                       bk=bk,
+                                       timeout=timeout,
+                                       expiry=expiry,
+                                       owner=owner,
+                                       carries=carries)
+        self.pieceSize = max(1, int(self.stack.resumePieceSize))
+        self.count = max(1, (len(packed) + self.pieceSize - 1) // self.pieceSize)
+        self.pendings = deque() # indexes of needed pieces not yet sent
+        self.inflights = set() # indexes of piece messages not yet completed
+        self.offering = False # offer message not yet completed
+        self.waiting = True # waiting for need of offer
+        self.offered = 0 # count of offers
+        self.timer = aiding.StoreTimer(self.stack.store,
+                                       duration=self.stack.ResumeTimeout)
+        self.retryTimer = aiding.StoreTimer(self.stack.store,
+                                            duration=self.stack.ResumeRetry)
+
+    @property
+    def rid(self):
+        '''
+        Property is resume id
+        '''
+        return self.xid
+
+    def offer(self):
+        '''
+        Send offer of body
+        '''
+        body = odict(id=self.rid,
+                     bk=self.bk,
+                     size=len(self.packed),
+                     ps=self.pieceSize)
+        body.update(self.carries)
+        self.offering = True
+        self.waiting = True
+        self.offered += 1
+        self.retryTimer.restart()
+        self.send(body, resume=ResumeKind.offer.value)
+        self.stack.incStat('resume_offer_tx')
+
+    def supply(self, body):
+        '''
+        Queue the pieces with indexes listed in need message body
+        Raises PacketError if body is invalid
+        '''
+        needs = body.get('ns')
+        if (not isinstance(needs, list) or
+                not all(isinstance(n, (int, long)) and 0 <= n < self.count
+                        for n in needs)):
+            raise raeting.PacketError("Invalid resume need, bad piece indexes")
+        needs = sorted(set(needs))
+        self.pendings = deque(n for n in needs if n not in self.inflights)
+        if self.offered > 1:
+            self.stack.incStat('resume_piece_skip', self.count - len(needs))
+        self.waiting = False
+        self.timer.restart()
+        self.service()
+
+    def service(self):
+        '''
+        Send pieces while window allows or offer again when waiting
+        '''
+        if self.done or self.failed:
+            return
+        remote = self.stack.remotes.get(self.uid)
+        if not remote or self.expire(remote=remote):
+            self.fail()
+            return
+        if self.timer.expired:
+            self.stack.incStat('resume_tx_timeout')
+            self.fail()
+            return
+        if self.waiting:
+            if not self.offering and self.retryTimer.expired and remote.allowed:
+                self.offer()
+            return
+        while self.pendings and len(self.inflights) < self.stack.ResumeWindow:
+            index = self.pendings.popleft()
+            start = index * self.pieceSize
+            self.inflights.add(index)
+            self.send(packPiece(self.rid, self.packed[start:start + self.pieceSize]),
+                      index=index,
+                      resume=ResumeKind.piece.value)
+            self.stack.incStat('resume_piece_tx')
+        if not (self.pendings or self.inflights):
+            self.finish()
+
+    def complete(self, messenger):
+        '''
+        Message of messenger completed
+        '''
+        if messenger.tray.data.get('rk') == ResumeKind.offer:
+            self.offering = False
+            return
+        self.inflights.discard(messenger.tray.data.get('oi', 0) - 1)
+        self.timer.restart()
+
+    def fail(self, messenger=None):
+        '''
+        Message of messenger failed so offer again to learn the missing pieces
+        after .stack.ResumeRetry. Otherwise give up and save the packed body
+        to be sent again whole
+        '''
+        if messenger is None:
+            self.abandon()
+            return
+        if messenger.tray.data.get('rk') == ResumeKind.offer:
+            self.offering = False
+        else:
+            self.inflights.discard(messenger.tray.data.get('oi', 0) - 1)
+        if not self.waiting:
+            self.waiting = True
+            self.pendings.clear()
+            self.retryTimer.restart()
+            self.stack.incStat('resume_interrupt')
+
+
+class RxResume(exchanging.RxExchange):
+    '''
+    RAET protocol incoming resumable message from remote
+    Keeps received pieces and rebuilds the body once all have arrived
+    '''
+    Kind = 'resume'
+
+    def __init__(self, stack, remote, body):
+        '''
+        Setup instance from offer message body
+        Raises PacketError if body is invalid
+        '''
+        super(RxResume, self).__init__(stack=stack, remote=remote, body=body)
+        self.count = max(1, (self.size + self.pieceSize - 1) // self.pieceSize)
+        if self.count > raeting.MAX_SEGMENT_COUNT:
+            raise raeting.PacketError("Invalid resume offer, too many pieces")
+        self.pieces = self.stack.fetchPieceStore(self.key())
+        for index in self.pieces.keys():
+            if index >= self.count or self.pieces.length(index) != self.expect(index):
+                self.pieces.discard(index) # not from this offer
+        if self.pieces:
+            self.stack.incStat('resume_piece_kept', len(self.pieces))
+        self.timer = aiding.StoreTimer(self.stack.store,
+                                       duration=self.stack.ResumeTimeout)
+
+    @property
+    def rid(self):
+        '''
+        Property is resume id
+        '''
+        return self.xid
+
+    def load(self, body):
+        '''
+        Load piece size and any carried dedup step kind from offer message body
+        '''
+        self.pieceSize = int(body['ps'])
+        if self.pieceSize < 1:
+            raise ValueError("bad piece size")
+        self.dedup = int(body.get('dd', 0)) # body is this dedup step when not 0
+        if self.dedup not in (0, DedupKind.chunks):
+            raise ValueError("bad dedup kind")
+
+    def validId(self, xid):
+        '''
+        Returns True if offered resume id xid is well formed
+        '''
+        return bool(ID_RE.match(xid))
+
+    def key(self):
+        '''
+        Returns store key of pieces scoped to .remote and piece size
+        '''
+        return "{0}.{1}.{2}".format(self.remote.name, self.rid, self.pieceSize)
+
+    def expect(self, index):
+        '''
+        Returns length of piece with index
+        '''
+        return min(self.pieceSize, self.size - index * self.pieceSize)
+
+    @property
+    def full(self):
+        '''
+        Property is True if all pieces were received
+        '''
+        return (len(self.pieces) >= self.count)
+
+    def misseds(self):
+        '''
+        Returns list of indexes of pieces not yet received
+        '''
+        return [i for i in xrange(self.count) if i not in self.pieces]
+
+    def need(self):
+        '''
+        Send need of missing pieces, empty when none are missing
+        '''
+        self.timer.restart()
+        self.stack.message(odict(id=self.rid, ns=self.misseds()),
+                           uid=self.remote.uid,
+                           resume=ResumeKind.need.value)
+        self.stack.incStat('resume_need_tx')
+
+    def receive(self, index, piece):
+        '''
+        Keep received piece with index
+        Raises PacketError if piece does not fit
+        '''
+        if not 0 <= index < self.count or len(piece) != self.expect(index):
+            raise raeting.PacketError("Invalid resume piece {0}".format(index))
+        self.timer.restart()
+        if index in self.pieces:
+            self.stack.incStat('resume_piece_duplicate')
+            return
+        self.pieces.put(index, piece)
+        self.stack.incStat('resume_piece_rx')
+
+    def complete(self):
+        '''
+        Returns body rebuilt from pieces parsed per .bk and removes pieces
+        Raises PacketError if pieces are missing or body is invalid
+        '''
+        if not self.full:
+            raise raeting.PacketError("Invalid resume pieces, missing pieces")
+        packed = b''.join(self.pieces.get(i) or b'' for i in xrange(self.count))
+        self.pieces.clear()
+        if resumeId(packed) != self.rid:
+            raise raeting.PacketError("Invalid resume pieces, bad digest")
+        return self.unpack(packed)
+
+    def close(self):
+        '''
+        Abandon message and remove kept pieces
+        '''
+        self.pieces.clear()
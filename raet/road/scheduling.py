@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+'''
+scheduling.py raet protocol transmit scheduling classes
+
+Outgoing packets are queued per destination address and served by deficit
+round robin so a long message to one remote does not hold up packets to
+every other remote. Control packets are served ahead of message segments.
+'''
+# pylint: skip-file
+# pylint: disable=W0611
+
+# Import python libs
+from collections import deque
+
+# Import ioflo libs
+from ioflo.base.odicting import odict
+
+from ioflo.base.consoling import getConsole
+console = getConsole()
+
+# Import raet libs
+from ..abiding import *  # import globals
+from .. import raeting
+
+
+class DrrQueue(object):
+    '''
+    Deficit round robin over deques of (duple, stamp) keyed by destination
+    address where duple is (packed, destination address)
+    '''
+    def __init__(self, quantum):
+        '''
+        Setup instance
+
+        quantum is bytes credited to a destination each round
+        '''
+        self.quantum = max(1, int(quantum))
+        self.queues = odict() # deques of (duple, stamp) keyed by destination
+        self.deficits = odict() # byte credit keyed by destination
+        self.actives = deque() # destinations with queued packets in round order
+        self.fresh = True # head of .actives not yet credited this round
+        self.count = 0 # total queued packets
+
+    def __len__(self):
+        return self.count
+
+    def append(self, duple, stamp):
+        '''
+        Queue duple at tail of its destination
+        '''
+        key = duple[1]
+        queue = self.queues.get(key)
+        if queue is None:
+            queue = self.queues[key] = deque()
+            self.deficits[key] = 0
+            self.actives.append(key)
+        queue.append((duple, stamp))
+        self.count += 1
+
+    def appendleft(self, duple, stamp):
+        '''
+        Queue duple at head of its destination
+        '''
+        key = duple[1]
+        queue = self.queues.get(key)
+        if queue is None:
+            queue = self.queues[key] = deque()
+            self.deficits[key] = 0
+            self.actives.appendleft(key)
+            self.fresh = True
+        queue.appendleft((duple, stamp))
+        self.count += 1
+
+    def pushback(self, duple, stamp):
+        '''
+        Return just popped duple to head of its destination refunding its
+        size to the deficit of the destination so it keeps its turn
+        '''
+        key = duple[1]
+        emptied = key not in self.queues
+        self.appendleft(duple, stamp)
+        if emptied: # popped last so served first again with credit for it
+            self.deficits[key] = len(duple[0])
+            self.fresh = False
+        else:
+            self.deficits[key] += len(duple[0])
+
+    def ready(self, skips=None):
+        '''
+        Returns True if any destination not in skips has a queued packet
+        '''
+        if not skips:
+            return (self.count > 0)
+        return any(key not in skips for key in self.actives)
+
+    def popleft(self, skips=None):
+        '''
+        Returns next (duple, stamp) in deficit round robin order
+        skipping destinations in skips
+        Raises IndexError if none
+        '''
+        if not self.ready(skips):
+            raise IndexError("pop from empty queue")
+        while True:
+            key = self.actives[0]
+            if skips and key in skips:
+                self.actives.rotate(-1)
+                self.fresh = True
+                continue
+            if self.fresh:
+                self.deficits[key] += self.quantum
+                self.fresh = False
+            queue = self.queues[key]
+            size = len(queue[0][0][0])
+            if size > self.deficits[key]: # not enough credit this round
+                self.actives.rotate(-1)
+                self.fresh = True
+                continue
+            self.deficits[key] -= size
+            entry = queue.popleft()
+            self.count -= 1
+            if not queue:
+                del self.queues[key]
+                del self.deficits[key]
+                self.actives.popleft()
+                self.fresh = True
+            return entry
+
+    def clear(self):
+        '''
+        Remove all queued packets
+        '''
+        self.queues.clear()
+        self.deficits.clear()
+        self.actives.clear()
+        self.fresh = True
+        self.count = 0
+
+    def depth(self, key):
+        '''
+        Returns number of queued packets to destination key
+        '''
+        queue = self.queues.get(key)
+        return len(queue) if queue else 0
+
+    def __iter__(self):
+        for queue in self.queues.values():
+            for duple, stamp in queue:
+                yield duple
+
+
+class TxScheduler(object):
+    '''
+    Drop in replacement for stack .txes deque of duples
+    (packed, destination address) with a control class served before a bulk
+    class and each class served per destination by deficit round robin
+    Records max sojourn time of packets per destination in .sojourns
+    '''
+    def __init__(self, store, quantum=raeting.UDP_MAX_PACKET_SIZE):
+        '''
+        Setup instance
+
+        store is ioflo store whose stamp times sojourns
+        quantum is bytes credited to each destination per round
+        '''
+        self.store = store
+        self.controls = DrrQueue(quantum=quantum)
+        self.bulks = DrrQueue(quantum=quantum)
+        self.sojourns = odict() # max sojourn since last reset keyed by destination
+        self.popped = None # class of last popped duple
+        self.poppedStamp = None # queued stamp of last popped duple
+
+    def __len__(self):
+        return (len(self.controls) + len(self.bulks))
+
+    def __nonzero__(self):
+        return (len(self) > 0)
+
+    __bool__ = __nonzero__
+
+    def __iter__(self):
+        for duple in self.controls:
+            yield duple
+        for duple in self.bulks:
+            yield duple
+
+    def append(self, duple, control=False):
+        '''
+        Queue duple (packed, destination address)
+        control True means duple is served ahead of bulk duples
+        '''
+        queue = self.controls if control else self.bulks
+        queue.append(duple, self.store.stamp)
+
+    def ready(self, skips=None):
+        '''
+        Returns True if a duple is queued to any destination not in skips
+        '''
+        return (self.controls.ready(skips) or self.bulks.ready(skips))
+
+    def popleft(self, skips=None):
+        '''
+        Returns next duple skipping destinations in skips
+        Raises IndexError if none
+        '''
+        if self.controls.ready(skips):
+            self.popped = self.controls
+        else:
+            self.popped = self.bulks
+        duple, stamp = self.popped.popleft(skips)
+        self.poppedStamp = stamp
+        key = duple[1]
+        sojourn = self.store.stamp - stamp
+        if sojourn > self.sojourns.get(key, 0.0):
+            self.sojourns[key] = sojourn
+        elif key not in self.sojourns:
+            self.sojourns[key] = 0.0
+        return duple
+
+    def pushback(self, duple):
+        '''
+        Return last popped duple to the head of its destination queue
+        such as when its destination blocked
+        '''
+        queue = self.popped if self.popped is not None else self.bulks
+        stamp = self.poppedStamp if self.poppedStamp is not None else self.store.stamp
+        queue.pushback(duple, stamp)
+
+    def clear(self):
+        '''
+        Remove all queued duples
+        '''
+        self.controls.clear()
+        self.bulks.clear()
+
+    def depth(self, key):
+        '''
+        Returns number of duples queued to destination key
+        '''
+        return (self.controls.depth(key) + self.bulks.depth(key))
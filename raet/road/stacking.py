@@ -8,9 +8,10 @@ stacking.py raet protocol stacking classes
 # Import python libs
 import socket
 import os
+import sys
 import errno
 
-from collections import deque,  Mapping
+from collections import deque,  Mapping, OrderedDict
 try:
     import simplejson as json
 except ImportError:
@@ -30,13 +31,19 @@ from ioflo.base import storing
 # Import raet libs
 from ..abiding import *  # import globals
 from .. import raeting
-from ..raeting import PcktKind, TrnsKind, CoatKind, FootKind, BodyKind, HeadKind
+from .. import serializing
+from ..raeting import PcktKind, TrnsKind, CoatKind, FootKind, BodyKind, HeadKind, ZipKind, DedupKind, ResumeKind
 from .. import nacling
 from .. import stacking
 from . import keeping
 from . import packeting
 from . import estating
 from . import transacting
+from . import streaming
+from . import deduping
+from . import resuming
+from . import scheduling
+from . import limiting
 
 from ioflo.base.consoling import getConsole
 console = getConsole()
@@ -78,19 +85,185 @@ class RoadStack(stacking.KeepStack):
         The default offset to the start of period
     interim
         The default timeout to reap a dead remote
+    periodMax
+        The max adaptive keep alive period that the period of a stable remote
+        backs off to. Zero or not greater than period means not adaptive.
+        Bounded to half of interim so a remote gets more than one chance to
+        answer before it is reaped
+    jitter
+        The fraction of the keep alive period that is randomly shaved off
+        each keep alive timer so remote timers do not line up
+    rtoMin
+        The lower bound on the retransmission timeout estimated from round
+        trip time samples with each remote
+    rtoMax
+        The upper bound on the retransmission timeout estimated from round
+        trip time samples with each remote
+    windowInitial
+        The initial congestion window in segments of message transfers with
+        each remote. Zero means no congestion control, only BurstSize applies
+    windowMax
+        The upper bound on the congestion window in segments
+    pacing
+        True means spread each congestion window of segments over the
+        estimated round trip time instead of sending it at once
+    coalesceSize
+        The byte budget for coalescing small messages to the same remote
+        into one message transaction. Zero means no coalescing
+    linger
+        The max time a message is held to coalesce with later messages to
+        the same remote. Zero means only coalesce messages already queued
+    inflightMax
+        The max concurrent outbound message transactions with each remote.
+        Further messages wait in a queue on the remote. Zero means no limit
+    queueHigh
+        The queued message count of a remote at which queueHighCallback is
+        called. Zero means no watermark callbacks
+    queueLow
+        The queued message count of a remote at or below which
+        queueLowCallback is called once the queue has reached queueHigh
+    queueHighCallback
+        Callable with parameter remote called when its queue reaches queueHigh
+    queueLowCallback
+        Callable with parameter remote called when its queue drains to queueLow
+    spoolSize
+        The max bytes of stale messages saved on disk in the keep for each
+        remote until it is allowed again. Zero means saved in memory
+    spoolCount
+        The max saved stale messages for each remote, oldest are evicted
+        first. Zero means no limit
+    spoolRate
+        The saved messages resent per second to a remote once it is allowed
+        again. Zero means all at once
+    bcstHa
+        The IP multicast group (host, port) that broadcast segments are sent
+        to once. None means each segment is sent to every receiving remote
+    packetSize
+        The max packet size in bytes offered to each remote when joining.
+        Each remote uses the smaller of the two offers. Zero means the
+        default raeting.UDP_MAX_PACKET_SIZE with every remote
+    packetProbe
+        True means the offered packetSize is not assumed but probed with
+        padded keep alives sent with IP fragmentation disabled
+    contain
+        True means small control packets such as acks queued to the same
+        remote in one service are sent together in one container packet
+        signed once. Both sides must support container packets
+    parityGroup
+        The number of message segments per xor parity segment so one lost
+        segment of each group is rebuilt by the receiver without a resend.
+        Zero means no parity segments. Overridden per remote by its
+        parityGroup when not None
+    dedupSize
+        The min packed message body bytes sent deduplicated. The receiver is
+        offered the digests of content defined chunks of the body and only
+        chunks missing from its chunk cache are sent. Zero means never.
+        Both sides must support deduplicated messages
+    dedupChunkSize
+        The average bytes of each content defined chunk
+    dedupCacheSize
+        The max bytes of received chunks cached for deduplicated messages
+    dedupDisk
+        True means the chunk cache is kept on disk in the keep instead of
+        in memory so it survives restarts
+    resumeSize
+        The min packed message body bytes sent resumable. The body is sent
+        as pieces each its own message under the digest of the body as id.
+        When a piece fails or either side restarts the body is offered again
+        and only pieces the receiver is missing are sent. Zero means never.
+        The chunks of a deduplicated message are sent resumable the same way.
+        Both sides must support resumable messages
+    resumePieceSize
+        The max bytes of each piece of a resumable message
+    resumeDisk
+        True means received pieces are kept on disk in the keep instead of
+        in memory so a restarted receiver resumes
+    rxRate
+        The max received packets per second from each source address, those
+        over are dropped before parsing. Zero means no limit
+    rxBurst
+        The max burst of received packets from each source address. Zero
+        means one second of rxRate
+    rxSources
+        The max source addresses whose receive rates are remembered, least
+        recently seen are forgotten first
+    remoteRxRate
+        The max received packets per second for each remote from its host
+        address, those over are dropped before verifying. Zero means no limit
+    remoteRxBurst
+        The max burst of received packets for each remote. Zero means one
+        second of remoteRxRate
+    staleRate
+        The max replies per second to stale or unknown transactions. Zero
+        means no limit
     role
         The local estate role identifier for key management
     '''
     Count = 0 # count of Stack instances to give unique stack names
     Hk = HeadKind.raet.value # stack default
     Bk = BodyKind.json.value # stack default
+    Zk = ZipKind.nada.value # stack default message body compression
+    ZipThreshold = 1024 # stack default min packed message body bytes compressed
     Fk = FootKind.nacl.value # stack default
     Ck = CoatKind.nacl.value # stack default
     Bf = False # stack default for bcstflag
     BurstSize = 0  # stack default for max segments in each burst, 0 = no limit
+    TxQuantum = raeting.UDP_MAX_PACKET_SIZE # stack default bytes per destination each transmit round
     Period = 1.0 # stack default for keep alive
     Offset = 0.5 # stack default for keep alive
     Interim = 3600 # stack default for reap timeout
+    PeriodMax = 0.0 # stack default for max adaptive keep alive, 0.0 = not adaptive
+    Jitter = 0.0 # stack default for keep alive jitter fraction of period
+    RtoMin = 0.05 # stack default for min estimated retransmission timeout
+    RtoMax = 8.0 # stack default for max estimated retransmission timeout
+    WindowInitial = 0 # stack default initial congestion window, 0 = no congestion control
+    WindowMax = 1024 # stack default max congestion window in segments
+    Pacing = False # stack default for pacing congestion window over round trip
+    DoneMemory = 256 # stack default completed received message tids remembered per remote
+    CoalesceSize = 0 # stack default byte budget for coalescing, 0 = no coalescing
+    Linger = 0.0 # stack default max hold of message for coalescing
+    StreamChunkSize = 65536 # stack default max bytes per stream chunk message
+    StreamWindow = 4 # stack default max stream chunk messages in flight
+    StreamTimeout = 60.0 # stack default idle timeout of incoming stream
+    StreamReorder = 64 # stack default max chunks of incoming stream held ahead of next
+    StreamEnds = 1024 # stack default ended incoming stream ids remembered
+    StreamSpool = False # stack default deliver incoming streams as temp files
+    SpillSize = 0 # stack default message size reassembled on disk, 0 = never
+    ReassemblyBudget = 0 # stack default max in memory reassembly bytes, 0 = no limit
+    InflightMax = 0 # stack default max message transactions per remote, 0 = no limit
+    QueueHigh = 0 # stack default queued messages high watermark, 0 = none
+    QueueLow = 0 # stack default queued messages low watermark
+    ReplayWindow = 0 # stack default verified packets remembered per remote, 0 = no replay filter
+    ReplayHorizon = 0.0 # stack default age within which exact duplicates are dropped
+    RxRate = 0.0 # stack default packets per second per source address, 0 = no limit
+    RxBurst = 0 # stack default max burst per source address, 0 = one second of RxRate
+    RxSources = 4096 # stack default max rate limited source addresses remembered
+    RemoteRxRate = 0.0 # stack default packets per second per remote, 0 = no limit
+    RemoteRxBurst = 0 # stack default max burst per remote, 0 = one second of RemoteRxRate
+    StaleRate = 0.0 # stack default max stale replies per second, 0 = no limit
+    StaleSuppress = 0.0 # stack default time a stale reply suppresses repeats, 0 = never
+    StaleSuppressSize = 4096 # stack default max suppressed stale replies remembered
+    SpoolSize = 0 # stack default max bytes of saved messages on disk per remote, 0 = in memory
+    SpoolCount = 0 # stack default max saved messages per remote, 0 = no limit
+    SpoolRate = 0.0 # stack default saved messages resent per second, 0 = all at once
+    BcstHa = None # stack default multicast group of broadcasts, None = each remote
+    BcstMemory = 1024 # stack default received broadcast tids remembered per remote
+    DatagramWindow = 64 # stack default datagram tids below highest screened per remote
+    PacketSize = 0 # stack default max packet size offered, 0 = UDP_MAX_PACKET_SIZE
+    PacketProbe = False # stack default for probing agreed packet size
+    Contain = False # stack default for bundling control packets into containers
+    ParityGroup = 0 # stack default segments per parity segment, 0 = no parity
+    DedupSize = 0 # stack default min message bytes sent deduplicated, 0 = never
+    DedupChunkSize = 8192 # stack default average bytes of deduplicated chunks
+    DedupCacheSize = 16777216 # stack default max bytes of cached received chunks
+    DedupDisk = False # stack default for chunk cache on disk in keep
+    DedupTimeout = 60.0 # stack default lifetime of deduplicated message exchange
+    ResumeSize = 0 # stack default min message bytes sent resumable, 0 = never
+    ResumePieceSize = 65536 # stack default max bytes of resumable message pieces
+    ResumeWindow = 4 # stack default max resumable message pieces in flight
+    ResumeRetry = 1.0 # stack default wait before offering interrupted resumable message again
+    ResumeTimeout = 600.0 # stack default idle lifetime of resumable message exchange
+    ResumeDisk = False # stack default for received pieces on disk in keep
     JoinerTimeout = 5.0 # stack default for joiner transaction timeout
     JoinentTimeout = 5.0 # stack default for joinent transaction timeout
 
@@ -115,6 +288,41 @@ class RoadStack(stacking.KeepStack):
                  period=None,
                  offset=None,
                  interim=None,
+                 periodMax=None,
+                 jitter=None,
+                 rtoMin=None,
+                 rtoMax=None,
+                 windowInitial=None,
+                 windowMax=None,
+                 pacing=None,
+                 coalesceSize=None,
+                 linger=None,
+                 inflightMax=None,
+                 queueHigh=None,
+                 queueLow=None,
+                 queueHighCallback=None,
+                 queueLowCallback=None,
+                 spoolSize=None,
+                 spoolCount=None,
+                 spoolRate=None,
+                 bcstHa=None,
+                 packetSize=None,
+                 packetProbe=None,
+                 contain=None,
+                 parityGroup=None,
+                 dedupSize=None,
+                 dedupChunkSize=None,
+                 dedupCacheSize=None,
+                 dedupDisk=None,
+                 resumeSize=None,
+                 resumePieceSize=None,
+                 resumeDisk=None,
+                 rxRate=None,
+                 rxBurst=None,
+                 rxSources=None,
+                 remoteRxRate=None,
+                 remoteRxBurst=None,
+                 staleRate=None,
                  **kwa
                  ):
         '''
@@ -147,6 +355,59 @@ class RoadStack(stacking.KeepStack):
         self.period = period if period is not None else self.Period
         self.offset = offset if offset is not None else self.Offset
         self.interim = interim if interim is not None else self.Interim
+        self.periodMax = periodMax if periodMax is not None else self.PeriodMax
+        if self.interim > 0.0:
+            self.periodMax = min(self.periodMax, self.interim / 2.0)
+        self.jitter = jitter if jitter is not None else self.Jitter
+        self.jitter = max(0.0, min(self.jitter, 1.0))
+        self.rtoMin = rtoMin if rtoMin is not None else self.RtoMin
+        self.rtoMax = rtoMax if rtoMax is not None else self.RtoMax
+        self.rtoMax = max(self.rtoMin, self.rtoMax)
+        self.windowInitial = (windowInitial if windowInitial is not None
+                                            else self.WindowInitial)
+        self.windowMax = windowMax if windowMax is not None else self.WindowMax
+        self.windowMax = max(self.windowInitial, self.windowMax)
+        self.pacing = pacing if pacing is not None else self.Pacing
+        self.coalesceSize = (coalesceSize if coalesceSize is not None
+                                          else self.CoalesceSize)
+        self.linger = linger if linger is not None else self.Linger
+        self.inflightMax = (inflightMax if inflightMax is not None
+                                        else self.InflightMax)
+        self.queueHigh = queueHigh if queueHigh is not None else self.QueueHigh
+        self.queueLow = queueLow if queueLow is not None else self.QueueLow
+        self.queueLow = min(self.queueLow, self.queueHigh)
+        self.queueHighCallback = queueHighCallback
+        self.queueLowCallback = queueLowCallback
+        self.spoolSize = spoolSize if spoolSize is not None else self.SpoolSize
+        self.spoolCount = spoolCount if spoolCount is not None else self.SpoolCount
+        self.spoolRate = spoolRate if spoolRate is not None else self.SpoolRate
+        self.bcstHa = bcstHa if bcstHa is not None else self.BcstHa
+        self.packetSize = packetSize if packetSize is not None else self.PacketSize
+        if self.packetSize:
+            self.packetSize = max(raeting.UDP_MAX_SAFE_PAYLOAD,
+                                  min(self.packetSize, raeting.UDP_MAX_PAYLOAD_SIZE))
+        self.packetProbe = packetProbe if packetProbe is not None else self.PacketProbe
+        self.contain = contain if contain is not None else self.Contain
+        self.parityGroup = parityGroup if parityGroup is not None else self.ParityGroup
+        self.dedupSize = dedupSize if dedupSize is not None else self.DedupSize
+        self.dedupChunkSize = (dedupChunkSize if dedupChunkSize is not None
+                                              else self.DedupChunkSize)
+        self.dedupCacheSize = (dedupCacheSize if dedupCacheSize is not None
+                                              else self.DedupCacheSize)
+        self.dedupDisk = dedupDisk if dedupDisk is not None else self.DedupDisk
+        self.resumeSize = resumeSize if resumeSize is not None else self.ResumeSize
+        self.resumePieceSize = (resumePieceSize if resumePieceSize is not None
+                                                else self.ResumePieceSize)
+        self.resumeDisk = resumeDisk if resumeDisk is not None else self.ResumeDisk
+        self.rxRate = rxRate if rxRate is not None else self.RxRate
+        self.rxBurst = rxBurst if rxBurst is not None else self.RxBurst
+        self.rxSources = rxSources if rxSources is not None else self.RxSources
+        self.remoteRxRate = (remoteRxRate if remoteRxRate is not None
+                                          else self.RemoteRxRate)
+        self.remoteRxBurst = (remoteRxBurst if remoteRxBurst is not None
+                                            else self.RemoteRxBurst)
+        self.staleRate = staleRate if staleRate is not None else self.StaleRate
+        self.haRemotes = odict() # remotes indexed by ha host address
 
         super(RoadStack, self).__init__(puid=puid,
                                         keep=keep,
@@ -162,6 +423,28 @@ class RoadStack(stacking.KeepStack):
         self.aliveds =  odict() # alived remotes keyed by name
         self.reapeds =  odict() # reaped remotes keyed by name
         self.availables = set() # set of available remote names
+        self.txStreams = odict() # outgoing streams keyed by stream id
+        self.rxStreams = odict() # incoming streams keyed by (remote name, stream id)
+        self.rxStreamEnds = OrderedDict() # ended incoming stream keys oldest first
+        self.rxChunks = deque() # delivered stream chunks duples (chunk, remote name)
+        self.txDedups = odict() # outgoing deduplicated messages keyed by dedup id
+        self.rxDedups = odict() # incoming deduplicated messages keyed by (remote name, dedup id)
+        self.chunkCache = None # cache of received dedup chunks, created when needed
+        self.txResumes = odict() # outgoing resumable messages keyed by (uid, resume id)
+        self.rxResumes = odict() # incoming resumable messages keyed by (remote name, resume id)
+        self.resumeCleared = False # True once stale kept pieces were removed
+        self.reassemblySize = 0 # bytes reserved by in memory message reassembly
+        self.rxBuckets = None # receive rate limit token buckets keyed by source address
+        self.staleBucket = None # stale reply rate limit token bucket
+        self.staleReplies = OrderedDict() # stamps of stale replies keyed by (ha, sid, tid, kind)
+        self.broadcasts = odict() # outgoing broadcast transactions keyed by (sid, tid)
+        self.bcstSid = 0 # session id of outgoing broadcasts, 0 means none yet
+        self.containeds = odict() # lists of (packed, footsize) to contain keyed by remote uid
+        # per destination transmit queues with control served first
+        self.txes = scheduling.TxScheduler(store=self.store,
+                                           quantum=max(self.TxQuantum, self.packetSize))
+        if self.packetProbe and self.server:
+            self.dontFragment()
 
     @property
     def ha(self):
@@ -174,6 +457,34 @@ class RoadStack(stacking.KeepStack):
     def ha(self, value):
         self.aha = value
 
+    @property
+    def adaptive(self):
+        '''
+        property that returns True if keep alive period is adaptive
+        '''
+        return (self.periodMax > self.period)
+
+    @property
+    def congestive(self):
+        '''
+        property that returns True if message transfers are congestion controlled
+        '''
+        return (self.windowInitial > 0)
+
+    @property
+    def coalescing(self):
+        '''
+        property that returns True if small messages are coalesced
+        '''
+        return (self.coalesceSize > 0)
+
+    @property
+    def throttling(self):
+        '''
+        property that returns True if message transactions per remote are capped
+        '''
+        return (self.inflightMax > 0)
+
     @property
     def transactions(self):
         '''
@@ -188,10 +499,50 @@ class RoadStack(stacking.KeepStack):
         '''
         Create local listening server for stack
         '''
+        size = max(self.packetSize, raeting.UDP_MAX_PACKET_SIZE)
         server = nonblocking.SocketUdpNb(ha=self.ha,
-                        bufsize=raeting.UDP_MAX_PACKET_SIZE * self.bufcnt)
+                        bufsize=size * self.bufcnt)
         return server
 
+    def dontFragment(self):
+        '''
+        Disable IP fragmentation of sent packets so packets larger than the
+        path MTU are dropped instead of fragmented which makes probing of
+        packet sizes meaningful
+        Returns True if disabled Otherwise False such as when not on linux
+        '''
+        if not sys.platform.startswith('linux'):
+            return False
+        option = getattr(socket, 'IP_MTU_DISCOVER', 10)
+        value = getattr(socket, 'IP_PMTUDISC_DO', 2)
+        try:
+            self.server.ss.setsockopt(socket.IPPROTO_IP, option, value)
+        except (socket.error, AttributeError) as ex:
+            emsg = "Stack '{0}'. Failed disabling fragmentation. {1}\n".format(
+                    self.name, ex)
+            console.terse(emsg)
+            return False
+        return True
+
+    def agreePacketSize(self, remote, size):
+        '''
+        Agree max packet size with remote given size offered by remote
+        Uses smaller of size and .packetSize when both are offered otherwise
+        the default. When probing a larger size it is probed before use
+        '''
+        size = min(size or 0, self.packetSize)
+        if size <= raeting.UDP_MAX_PACKET_SIZE:
+            size = 0
+        remote.packetSize = 0
+        remote.probeSize = 0
+        if not size:
+            return
+        if self.packetProbe:
+            remote.probeSize = size
+        else:
+            remote.packetSize = size
+        self.incStat('packet_size_agreed')
+
     def addRemote(self, remote, dump=False):
         '''
         Add a remote  to .remotes
@@ -200,6 +551,7 @@ class RoadStack(stacking.KeepStack):
         if remote.timer.store is not self.store:
             raise raeting.StackError("Store reference mismatch between remote"
                     " '{0}' and stack '{1}'".format(remote.name, stack.name))
+        self.indexRemoteHa(remote)
         return remote
 
     def removeRemote(self, remote, clear=True):
@@ -208,8 +560,17 @@ class RoadStack(stacking.KeepStack):
         If clear then also remove from disk
         '''
         super(RoadStack, self).removeRemote(remote=remote, clear=clear)
+        self.unindexRemoteHa(remote, remote.ha)
         for transaction in remote.transactions.values():
             transaction.nack()
+        if remote.queueds:
+            self.incStat('message_queue_dropped', len(remote.queueds))
+            remote.queueds.clear()
+        if clear:
+            remote.clearSaved()
+        for key in ('tx_depth_{0}'.format(remote.name),
+                    'tx_sojourn_{0}'.format(remote.name)):
+            self.stats.pop(key, None)
 
     def fetchRemoteByKeys(self, sighex, prihex):
         '''
@@ -223,6 +584,33 @@ class RoadStack(stacking.KeepStack):
 
         return None
 
+    def fetchRemoteByHa(self, ha):
+        '''
+        Search for remote with host address ha
+        Return remote if found Otherwise return None
+        '''
+        return self.haRemotes.get(ha)
+
+    def indexRemoteHa(self, remote):
+        '''
+        Add remote to .haRemotes at its host address unless already taken
+        '''
+        if remote.ha is not None and remote.ha not in self.haRemotes:
+            self.haRemotes[remote.ha] = remote
+
+    def unindexRemoteHa(self, remote, ha):
+        '''
+        Remove remote from .haRemotes at host address ha
+        Index next remote with same host address if any
+        '''
+        if ha is None or self.haRemotes.get(ha) is not remote:
+            return
+        del self.haRemotes[ha]
+        for other in self.remotes.values():
+            if other is not remote and other.ha == ha:
+                self.haRemotes[ha] = other
+                break
+
     def retrieveRemote(self, uid=None):
         '''
         Used when initiating a transaction
@@ -385,6 +773,8 @@ class RoadStack(stacking.KeepStack):
         super(RoadStack, self).clearAllKeeps()
         self.clearLocalRoleKeep()
         self.clearRemoteRoleKeeps()
+        self.keep.clearAllSpoolData()
+        self.keep.clearResumeData()
 
     def manage(self, cascade=False, immediate=False):
         '''
@@ -428,18 +818,237 @@ class RoadStack(stacking.KeepStack):
         raw, sa = self.rxes.popleft()
         console.verbose("{0} received packet\n{1}\n".format(self.name, raw))
 
+        if self.rxRate and self.limitSource(sa): # flooding source so drop unparsed
+            self.incStat('rx_reject_limit')
+            return
+
         packet = packeting.RxPacket(stack=self, packed=raw)
         try:
-            packet.parseOuter()
+            packet.parseHead()
         except raeting.PacketError as ex:
             console.terse(str(ex) + '\n')
             self.incStat('parsing_outer_error')
+            self.incStat('rx_reject_head')
             return
 
         sh, sp = sa
         packet.data.update(sh=sh, sp=sp)
+        if not self.screenRx(packet): # not routable so not worth verifying
+            self.incStat('rx_reject_route')
+            return
+
+        if self.remoteRxRate and self.limitRemote(packet): # flooding remote
+            self.incStat('rx_reject_limit')
+            return
+
+        try:
+            packet.parseFoot()
+        except raeting.PacketError as ex:
+            console.terse(str(ex) + '\n')
+            self.incStat('parsing_outer_error')
+            self.incStat('rx_reject_verify')
+            return
+
+        if packet.replayed is not None: # exact duplicate so verify was skipped
+            if (self.store.stamp - packet.replayed) <= self.ReplayHorizon:
+                self.incStat('replay_duplicate')
+                self.incStat('rx_reject_replay')
+                return
+            self.incStat('replay_verified') # retransmit so process
+
+        if packet.data['pk'] == PcktKind.container:
+            self.processContainer(packet)
+            return
+
         self.processRx(packet)
 
+    def limitSource(self, sa):
+        '''
+        Returns True if source address sa is over its receive rate limit
+        '''
+        if self.rxBuckets is None:
+            self.rxBuckets = limiting.BucketMap(store=self.store,
+                                                rate=self.rxRate,
+                                                size=self.rxBurst,
+                                                limit=self.rxSources)
+        if self.rxBuckets.take(sa):
+            return False
+        self.incStat('rx_limit_source')
+        return True
+
+    def limitRemote(self, packet):
+        '''
+        Returns True if remote destination of header parsed packet is over its
+        receive rate limit
+        Only packets from the host address of the remote are charged since the
+        header is not yet verified and a forged de would otherwise use up the
+        bucket of the remote. Others are left to the per source limit
+        '''
+        remote = self.remotes.get(packet.data['de'], None)
+        if not remote or remote.ha != (packet.data['sh'], packet.data['sp']):
+            return False
+        if remote.rxBucket is None:
+            remote.rxBucket = limiting.TokenBucket(store=self.store,
+                                                   rate=self.remoteRxRate,
+                                                   size=self.remoteRxBurst)
+        if remote.rxBucket.take():
+            return False
+        self.incStat('rx_limit_remote')
+        self.incStat('rx_limit_{0}'.format(remote.name))
+        return True
+
+    def limitStale(self):
+        '''
+        Returns True if stale replies are over their rate limit
+        '''
+        if not self.staleRate:
+            return False
+        if self.staleBucket is None:
+            self.staleBucket = limiting.TokenBucket(store=self.store,
+                                                    rate=self.staleRate)
+        if self.staleBucket.take():
+            return False
+        self.incStat('stale_reply_limit')
+        return True
+
+    def suppressStale(self, packet, kind):
+        '''
+        Returns True if a stale reply of kind was already sent for the
+        transaction of packet within .StaleSuppress so reply is suppressed
+        Otherwise remembers reply and returns False
+        '''
+        if not self.StaleSuppress:
+            return False
+        stamp = self.store.stamp
+        while self.staleReplies: # forget expired oldest first
+            key = next(iter(self.staleReplies))
+            if (stamp - self.staleReplies[key]) < self.StaleSuppress:
+                break
+            del self.staleReplies[key]
+        key = ((packet.data['sh'], packet.data['sp']),
+               packet.data['si'],
+               packet.data['ti'],
+               kind)
+        if key in self.staleReplies:
+            self.incStat('stale_reply_suppressed')
+            return True
+        while len(self.staleReplies) >= self.StaleSuppressSize:
+            self.staleReplies.popitem(last=False) # oldest first
+        self.staleReplies[key] = stamp
+        return False
+
+    def screenRx(self, packet):
+        '''
+        Returns True if header only parsed packet is routable
+        Otherwise returns False so packet is dropped before its signature is
+        verified. Only checks that drop without reply belong here since the
+        header is not yet authenticated
+        '''
+        if packet.data['bf'] and not packet.data['cf']: # broadcast from remote
+            return self.screenBroadcast(packet)
+
+        de = packet.data['de']  # remote nuid
+        se = packet.data['se']  # remote fuid
+        tk = packet.data['tk']
+        pk = packet.data['pk']
+        cf = packet.data['cf']
+        rsid = packet.data['si']
+        sha = (packet.data['sh'],  packet.data['sp'])
+
+        if tk in [TrnsKind.join]: # join transaction
+            if rsid != 0: # join  must use sid == 0
+                emsg = ("Stack '{0}'. Nonzero join sid '{1}' in packet from {2}."
+                       " Dropping...\n".format(self.name, rsid, sha))
+                console.terse(emsg)
+                self.incStat('join_invalid_sid')
+                return False
+
+            if cf and de == 0: # invalid since joiner rxed packet de (nuid) == 0
+                emsg = ("Stack '{0}'. Invalid join correspondence from '{1}',"
+                        " nuid zero . Dropping...\n".format(self.name, sha))
+                console.terse(emsg)
+                self.incStat('join_invalid_nuid')
+                return False
+
+            if not cf and se == 0: # invalid join
+                emsg = ("Stack '{0}'. Invalid join initiatance from '{1}',"
+                        "fuid zero. Dropping...\n".format(self.name, sha))
+                console.terse(emsg)
+                self.incStat('join_invalid_fuid')
+                return False
+            return True
+
+        # not join transaction
+        if rsid == 0: # cannot use sid == 0 on nonjoin transaction
+            emsg = ("Stack '{0}'. Invalid Zero sid '{1}' for transaction {2} packet"
+                   " {3}. Dropping...\n".format(self.name, rsid, tk, pk ))
+            console.terse(emsg)
+            self.incStat('invalid_sid')
+            return False
+
+        if de == 0 or se == 0:
+            emsg = ("Stack '{0}'. Invalid nonjoin from remote '{1}'."
+                    " Zero nuid {2} or fuid {3}. Dropping...\n".format(
+                        self.name, sha, de, se))
+            console.terse(emsg)
+            self.incStat('invalid_uid')
+            return False
+
+        remote = self.remotes.get(de, None)
+        if not remote:
+            emsg = ("Stack '{0}'. Unknown remote destination '{1}'. "
+                    "Dropping...\n".format(self.name, de))
+            console.terse(emsg)
+            self.incStat('unknown_destination_uid')
+            return False
+
+        if cf: # stale nacks to no locally initiated transaction are ignored
+            if (packet.index not in remote.transactions and
+                    pk in [PcktKind.nack,
+                           PcktKind.unjoined,
+                           PcktKind.unallowed,
+                           PcktKind.renew,
+                           PcktKind.refuse,
+                           PcktKind.reject,]):
+                self.incStat('stale_nack_drop')
+                return False
+        elif (not remote.validRsid(rsid) and
+                pk in [PcktKind.nack,
+                       PcktKind.unjoined,
+                       PcktKind.unallowed,
+                       PcktKind.refuse,
+                       PcktKind.reject,]): # stale nacks are not replied to
+            self.incStat('stale_sid')
+            self.incStat('stale_nack_drop')
+            return False
+
+        return True
+
+    def screenBroadcast(self, packet):
+        '''
+        Returns True if header only parsed broadcast packet is a message from
+        an allowed remote matched by source address
+        Fills in the uids the broadcaster left zero as if sent to self alone
+        so it is verified, indexed and parsed like any other packet
+        '''
+        if (packet.data['tk'] != TrnsKind.message or
+                packet.data['ck'] != CoatKind.nada or
+                packet.data['si'] == 0):
+            self.incStat('broadcast_invalid')
+            return False
+
+        sha = (packet.data['sh'],  packet.data['sp'])
+        remote = self.fetchRemoteByHa(sha)
+        if not remote or not remote.allowed:
+            emsg = ("Stack '{0}'. Broadcast from unallowed source '{1}'. "
+                    "Dropping...\n".format(self.name, sha))
+            console.terse(emsg)
+            self.incStat('broadcast_unallowed')
+            return False
+
+        packet.data.update(de=remote.nuid, se=remote.fuid)
+        return True
+
     def processRx(self, packet):
         '''
         Process packet via associated transaction or
@@ -459,10 +1068,6 @@ class RoadStack(stacking.KeepStack):
         console.verbose("{0} received trans kind = '{1}' packet kind = '{2}'"
                         "\n".format(self.name, tkname, pkname))
 
-        bf = packet.data['bf']
-        if bf:
-            return  # broadcast transaction not yet supported
-
         de = packet.data['de']  # remote nuid
         se = packet.data['se']  # remote fuid
         tk = packet.data['tk']
@@ -474,20 +1079,8 @@ class RoadStack(stacking.KeepStack):
 
         if tk in [TrnsKind.join]: # join transaction
             sha = (packet.data['sh'],  packet.data['sp'])
-            if rsid != 0: # join  must use sid == 0
-                emsg = ("Stack '{0}'. Nonzero join sid '{1}' in packet from {2}."
-                       " Dropping...\n".format(self.name, rsid, sha))
-                console.terse(emsg)
-                self.incStat('join_invalid_sid')
-                return
-
+            # screenRx already dropped nonzero sid and zero nuid or fuid
             if cf: # cf = not rf, packet source is joinent, destination (self) is joiner
-                if de == 0: # invalid since joiner rxed packet de (nuid) == 0
-                    emsg = ("Stack '{0}'. Invalid join correspondence from '{1}',"
-                            " nuid zero . Dropping...\n".format(self.name, sha))
-                    console.terse(emsg)
-                    self.incStat('join_invalid_nuid')
-                    return
                 if se == 0: # vacuous join since se (fuid) == 0
                     remote = self.joinees.get(sha, None)  # match remote by rha from .joinees
                     if remote and remote.nuid != de: # prior different
@@ -500,12 +1093,6 @@ class RoadStack(stacking.KeepStack):
                     remote = self.remotes.get(de, None)
 
             else: # (rf = not cf) # source is joiner, destination (self) is joinent
-                if se == 0: # invalid join
-                    emsg = ("Stack '{0}'. Invalid join initiatance from '{1}',"
-                            "fuid zero. Dropping...\n".format(self.name, sha))
-                    console.terse(emsg)
-                    self.incStat('join_invalid_fuid')
-                    return
                 if de == 0: # vacuous join match remote by rha from joinees
                     remote = self.joinees.get(sha, None)
                     if remote and remote.fuid != se: # check if prior is stale
@@ -548,24 +1135,13 @@ class RoadStack(stacking.KeepStack):
                         self.replyStale(packet, remote, renew=True) # nack stale transaction
                         return
 
-        else: # not join transaction
-            if rsid == 0: # cannot use sid == 0 on nonjoin transaction
-                emsg = ("Stack '{0}'. Invalid Zero sid '{1}' for transaction {2} packet"
-                       " {3}. Dropping...\n".format(self.name, rsid, tk, pk ))
-                console.terse(emsg)
-                self.incStat('invalid_sid')
-                return
+        else: # not join transaction, screenRx already dropped zero sid or uids
+            remote = self.remotes.get(de, None)
 
-            if de == 0 or se == 0:
-                emsg = ("Stack '{0}'. Invalid nonjoin from remote '{1}'."
-                        " Zero nuid {2} or fuid {3}. Dropping...\n".format(
-                            self.name, sha, de, se))
-                console.terse(emsg)
-                self.incStat('invalid_uid')
+            if remote and packet.data['bf']: # broadcast has own sids
+                self.processBroadcast(packet, remote)
                 return
 
-            remote = self.remotes.get(de, None)
-
             if remote:
                 if not cf: # packet from remotely initiated transaction
                     if not remote.validRsid(rsid): # invalid rsid
@@ -580,10 +1156,16 @@ class RoadStack(stacking.KeepStack):
                     if rsid != remote.rsid: # updated valid rsid so change remote.rsid
                         remote.rsid = rsid
                         remote.removeStaleCorrespondents()
+                        remote.doneTids.clear()
 
                 if remote.reaped:
                     remote.unreap() # packet a valid packet so remote is not dead
 
+                if self.adaptive and packet.data['fk'] == FootKind.nacl:
+                    # verified signed traffic so suppress keep alive
+                    remote.refresh(alived=True)
+                    self.incStat('alive_traffic_refresh')
+
         if remote:
             trans = remote.transactions.get(packet.index, None)
             if trans:
@@ -603,6 +1185,47 @@ class RoadStack(stacking.KeepStack):
 
         self.correspond(packet, remote) # correspond to new transaction initiated by remote
 
+    def processContainer(self, packet):
+        '''
+        Process each packet in verified container packet in order
+        Contained packets are not verified again since their signatures were
+        stripped when the container was signed. So each must be to and from
+        the same estates as the container
+        '''
+        if not self.parseInner(packet):
+            return
+        try:
+            packeds = packeting.unpackContained(packet.body.data)
+        except raeting.PacketError as ex:
+            console.terse(str(ex) + '\n')
+            self.incStat('parsing_inner_error')
+            return
+        self.incStat('container_rx')
+        for packed in packeds:
+            contained = packeting.RxPacket(stack=self, packed=packed)
+            try:
+                contained.parseHead()
+            except raeting.PacketError as ex:
+                console.terse(str(ex) + '\n')
+                self.incStat('parsing_outer_error')
+                continue
+            contained.data.update(sh=packet.data['sh'], sp=packet.data['sp'])
+            if (contained.data['de'] != packet.data['de'] or
+                    contained.data['se'] != packet.data['se'] or
+                    contained.data['pk'] == PcktKind.container or
+                    contained.data['tk'] == TrnsKind.join or
+                    contained.data['bf']):
+                emsg = ("Stack '{0}'. Invalid contained packet from '{1}'. "
+                        "Dropping...\n".format(self.name, packet.data['de']))
+                console.terse(emsg)
+                self.incStat('container_invalid')
+                continue
+            if not self.screenRx(contained):
+                self.incStat('rx_reject_route')
+                continue
+            self.incStat('container_packet_rx')
+            self.processRx(contained)
+
     def correspond(self, packet, remote):
         '''
         Create correspondent transaction remote and handle packet
@@ -622,16 +1245,57 @@ class RoadStack(stacking.KeepStack):
             self.replyAlive(packet, remote)
             return
 
+        if (packet.data['tk'] == TrnsKind.message and
+                packet.data['pk'] == PcktKind.datagram):
+            self.receiveDatagram(packet, remote)
+            return
+
         if (packet.data['tk'] == TrnsKind.message and
                 packet.data['pk'] == PcktKind.message):
-            if packet.data['af']:  # packet is a stale resend
+            if (packet.data['si'], packet.data['ti']) in remote.doneTids:
+                self.replyDone(packet, remote) # late segment of completed message
+            elif packet.data['af']:  # packet is a stale resend
                 self.replyStale(packet, remote)
+            elif packet.data['pg'] and packet.data['sn'] >= packet.data['sc']:
+                self.incStat('stale_parity') # trailing parity of completed message
             else:
                 self.replyMessage(packet, remote)
             return
 
         self.incStat('stale_packet')
 
+    def processBroadcast(self, packet, remote):
+        '''
+        Process broadcast packet via associated transaction or correspond to
+        new broadcast from remote
+        Packets from correspondents, that is resend requests of missing
+        segments, go to the local Broadcaster
+        '''
+        sid = packet.data['si']
+        tid = packet.data['ti']
+        if packet.data['cf']:
+            broadcaster = self.broadcasts.get((sid, tid), None)
+            if not broadcaster:
+                self.incStat('stale_broadcast')
+                return
+            broadcaster.receive(packet)
+            return
+
+        trans = remote.transactions.get(packet.index, None)
+        if trans:
+            trans.receive(packet)
+            return
+
+        if packet.data['pk'] != PcktKind.message:
+            self.incStat('stale_packet')
+            return
+
+        if not remote.validBcst(sid, tid): # stale or already received
+            self.incStat('broadcast_duplicate')
+            return
+
+        self.replyBroadcast(packet, remote)
+
     def process(self):
         '''
         Call .process or all remotes to allow timer based processing
@@ -641,6 +1305,32 @@ class RoadStack(stacking.KeepStack):
             #transaction.process()
         for remote in self.remotes.values():
             remote.process()
+        for broadcaster in self.broadcasts.values():
+            broadcaster.process()
+        for key, stream in self.rxStreams.items():
+            if stream.ended or stream.failed or stream.timer.expired:
+                if not (stream.ended or stream.failed):
+                    console.terse("Stack {0}. Timed out stream {1} from {2}\n".format(
+                            self.name, stream.sid, stream.source))
+                    self.incStat('stream_rx_timeout')
+                    stream.close()
+                del self.rxStreams[key]
+                self.rxStreamEnds[key] = None # so late chunks do not restart it
+                while len(self.rxStreamEnds) > self.StreamEnds:
+                    self.rxStreamEnds.popitem(last=False)
+        for key, dedup in self.rxDedups.items():
+            if dedup.timer.expired:
+                console.terse("Stack {0}. Timed out dedup message {1} from {2}\n".format(
+                        self.name, dedup.did, dedup.remote.name))
+                self.incStat('dedup_rx_timeout')
+                del self.rxDedups[key]
+        for key, resume in self.rxResumes.items():
+            if resume.timer.expired:
+                console.terse("Stack {0}. Timed out resumable message {1} from {2}\n".format(
+                        self.name, resume.rid, resume.remote.name))
+                self.incStat('resume_rx_timeout')
+                resume.close()
+                del self.rxResumes[key]
 
     def parseInner(self, packet):
         '''
@@ -678,6 +1368,8 @@ class RoadStack(stacking.KeepStack):
             console.terse(emsg)
             self.incStat('invalid_remote_eid')
             return
+        if self.suppressStale(packet, PcktKind.nack.value) or self.limitStale():
+            return
         data = odict(hk=self.Hk, bk=self.Bk)
         staler = transacting.Staler(stack=self,
                                     remote=remote,
@@ -698,6 +1390,9 @@ class RoadStack(stacking.KeepStack):
                                  PcktKind.refuse,
                                  PcktKind.reject,]:
             return # ignore stale nacks
+        kind = PcktKind.renew.value if renew else PcktKind.nack.value
+        if self.suppressStale(packet, kind) or self.limitStale():
+            return
         data = odict(hk=self.Hk, bk=self.Bk)
         stalent = transacting.Stalent(stack=self,
                                       remote=remote,
@@ -706,10 +1401,7 @@ class RoadStack(stacking.KeepStack):
                                       tid=packet.data['ti'],
                                       txData=data,
                                       rxPacket=packet)
-        if renew:
-            stalent.nack(kind=PcktKind.renew.value) # refuse and renew
-        else:
-            stalent.nack()
+        stalent.nack(kind=kind) # renew is refuse and renew
 
     def join(self, uid=None, timeout=None, cascade=False, renewal=False):
         '''
@@ -778,10 +1470,11 @@ class RoadStack(stacking.KeepStack):
                                         rxPacket=packet)
         allowent.hello()
 
-    def alive(self, uid=None, timeout=None, cascade=False):
+    def alive(self, uid=None, timeout=None, cascade=False, probe=0):
         '''
         Initiate alive transaction
         If duid is None then create remote at ha
+        probe is packet size in bytes the alive is padded to for probing
         '''
         remote = self.retrieveRemote(uid=uid)
         if not remote:
@@ -794,7 +1487,8 @@ class RoadStack(stacking.KeepStack):
                                     remote=remote,
                                     timeout=timeout,
                                     txData=data,
-                                    cascade=cascade)
+                                    cascade=cascade,
+                                    probe=probe)
         aliver.alive()
 
     def replyAlive(self, packet, remote):
@@ -811,15 +1505,20 @@ class RoadStack(stacking.KeepStack):
                                       rxPacket=packet)
         alivent.alive()
 
-    def transmit(self, msg, uid=None, timeout=None):
+    def transmit(self, msg, uid=None, timeout=None, deadline=None):
         '''
         Append duple (msg, uid) to .txMsgs deque
         If msg is not mapping then raises exception
         If uid is None then it will default to the first entry in .remotes
         If timeout is None then it will use Messenger default
         timeout of 0 means never timeout of message transaction
+        deadline is max seconds from now until the message is dropped
+        wherever it is waiting or in flight, None means no deadline
+        msg may be serializing.Packed already serialized per .Bk
+        If uid is a list, tuple or set of uids then msg is serialized once and
+        the same packed body is sent to each
         '''
-        if not isinstance(msg, Mapping):
+        if not isinstance(msg, (Mapping, serializing.Packed)):
             emsg = "Invalid msg, not a mapping {0}\n".format(msg)
             console.terse(emsg)
             self.incStat("invalid_transmit_body")
@@ -831,24 +1530,669 @@ class RoadStack(stacking.KeepStack):
                 self.incStat("invalid_destination")
                 return
             uid = self.remotes.values()[0].uid
-        self.txMsgs.append((msg, uid, timeout))
+        if isinstance(uid, (list, tuple, set, frozenset)):
+            self.fanout(msg, uids=uid, timeout=timeout, deadline=deadline)
+            return
+        if deadline is not None:
+            self.txMsgs.append((msg, uid, timeout, self.store.stamp + deadline))
+        else:
+            self.txMsgs.append((msg, uid, timeout))
+
+    def fanout(self, msg, uids, timeout=None, deadline=None):
+        '''
+        Serialize msg once per .Bk and append the packed body for each of uids
+        to .txMsgs so only encryption, segmentation and signing are per remote
+        '''
+        if not isinstance(msg, serializing.Packed):
+            try:
+                msg = serializing.Packed(packeting.packBody(msg, self.Bk))
+            except (raeting.PacketError, TypeError, ValueError) as ex:
+                emsg = "Invalid msg, not serializable {0}\n".format(ex)
+                console.terse(emsg)
+                self.incStat("invalid_transmit_body")
+                return
+        for uid in uids:
+            self.transmit(msg, uid=uid, timeout=timeout, deadline=deadline)
+        self.incStat('message_fanout')
 
     def  _handleOneTxMsg(self):
         '''
         Take one message from .txMsgs deque and handle it
         Assumes there is a message on the deque
         '''
-        # triple (body dict, destination uid, timout)
-        body, uid, timeout = self.txMsgs.popleft()
-        self.message(body, uid=uid, timeout=timeout)
+        # triple (body dict, destination uid, timout) or with expiry stamp
+        entry = self.txMsgs.popleft()
+        body, uid, timeout = entry[:3]
+        expiry = entry[3] if len(entry) > 3 else None
+        if self.expire(expiry, uid=uid):
+            return
+        if self.coalescing:
+            self.coalesce(body, uid=uid, timeout=timeout, expiry=expiry)
+        else:
+            self.message(body, uid=uid, timeout=timeout, expiry=expiry)
         console.verbose("{0} sending\n{1}\n".format(self.name, body))
 
-    def message(self, body, uid=None, timeout=None):
+    def expire(self, expiry, remote=None, uid=None):
+        '''
+        Returns True if message with expiry stamp has expired and counts it
+        against remote or remote at uid
+        expiry None means never expires
+        '''
+        if expiry is None or self.store.stamp < expiry:
+            return False
+        if remote is None:
+            remote = self.retrieveRemote(uid=uid)
+        self.incStat('message_expired')
+        if remote:
+            self.incStat('message_expired_{0}'.format(remote.name))
+        console.concise("Stack {0}. Dropped expired message to {1} at {2}\n".format(
+                self.name, remote.name if remote else uid, self.store.stamp))
+        return True
+
+    def serviceTxMsgs(self):
+        '''
+        Service queued messages of remotes and .txMsgs queue of outgoing
+        messages then flush due coalesced messages
+        '''
+        if self.spoolRate > 0.0:
+            self.serviceSaveds()
+        if self.throttling:
+            self.serviceQueueds()
+        super(RoadStack, self).serviceTxMsgs()
+        if self.coalescing:
+            self.serviceCoalesceds()
+        self.serviceTxStreams()
+        self.serviceTxResumes()
+        self.serviceTxDedups()
+
+    def serviceTxMsgOnce(self):
+        '''
+        Service queued messages of remotes and one message on .txMsgs queue
+        of outgoing messages then flush due coalesced messages
+        '''
+        if self.spoolRate > 0.0:
+            self.serviceSaveds()
+        if self.throttling:
+            self.serviceQueueds()
+        super(RoadStack, self).serviceTxMsgOnce()
+        if self.coalescing:
+            self.serviceCoalesceds()
+
+    def transmitStream(self, source, uid=None, chunkSize=None, window=None,
+                       timeout=None):
+        '''
+        Stream source to remote at uid as ordered chunk messages
+        source is file like with .read or iterable of bytes
+        If uid is None then it will default to the first entry in .remotes
+        chunkSize is max bytes per chunk, None means .StreamChunkSize
+        window is max chunks from the oldest chunk in flight, None means
+        .StreamWindow, at most .StreamReorder
+        Returns stream id or None if no remote
+        '''
+        if uid is None:
+            if not self.remotes:
+                emsg = "No remote to send to\n"
+                console.terse(emsg)
+                self.incStat("invalid_destination")
+                return None
+            uid = self.remotes.values()[0].uid
+        stream = streaming.TxStream(stack=self,
+                                    uid=uid,
+                                    source=source,
+                                    chunkSize=chunkSize,
+                                    window=window,
+                                    timeout=timeout)
+        self.txStreams[stream.sid] = stream
+        return stream.sid
+
+    def serviceTxStreams(self):
+        '''
+        Send chunks of outgoing streams while their windows allow
+        '''
+        for sid, stream in self.txStreams.items():
+            stream.service()
+            if stream.done or stream.failed:
+                del self.txStreams[sid]
+
+    def receiveChunk(self, body, remote, index):
+        '''
+        Process stream chunk message body with index from remote
+        '''
+        sid = body.get('id') if isinstance(body, Mapping) else None
+        if sid is None:
+            console.terse("Stack {0}. Invalid stream chunk from {1}\n".format(
+                    self.name, remote.name))
+            self.incStat('invalid_stream_chunk')
+            return
+        key = (remote.name, sid)
+        if key in self.rxStreamEnds:
+            self.incStat('stream_chunk_stale')
+            return
+        stream = self.rxStreams.get(key)
+        if stream is None:
+            stream = streaming.RxStream(stack=self,
+                                        sid=sid,
+                                        source=remote.name,
+                                        spool=self.StreamSpool)
+            self.rxStreams[key] = stream
+        try:
+            stream.receive(index, body)
+        except raeting.PacketError as ex:
+            console.terse(str(ex) + '\n')
+            self.incStat('invalid_stream_chunk')
+
+    def fetchChunkCache(self):
+        '''
+        Returns cache of received dedup chunks creating it if needed
+        '''
+        if self.chunkCache is None:
+            if self.dedupDisk:
+                self.chunkCache = self.keep.createChunkCache(size=self.dedupCacheSize)
+            else:
+                self.chunkCache = deduping.ChunkCache(size=self.dedupCacheSize)
+        return self.chunkCache
+
+    def packOnce(self, body, bk=None):
+        '''
+        Returns body packed per body kind bk, None means .Bk, so the body of a
+        message exchange is serialized once for all its steps
+        Returns None if body cannot be packed here, the messenger reports it
+        '''
+        serializer = serializing.BodySerializers.get(self.Bk if bk is None else bk)
+        if serializer is None:
+            return None
+        try:
+            packed = serializer.pack(body)
+        except Exception: # Messenger reports invalid body
+            return None
+        if not isinstance(packed, bytes):
+            return None
+        return packed
+
+    def dedupe(self, body, remote, timeout=None, expiry=None):
+        '''
+        Offer body to remote as deduplicated message when its packed size is
+        at least .dedupSize and return None
+        Otherwise return body packed once as serializing.Packed
+        '''
+        packed = self.packOnce(body)
+        if packed is None:
+            return body
+        if len(packed) < self.dedupSize:
+            return serializing.Packed(packed)
+        dedup = deduping.TxDedup(stack=self,
+                                 uid=remote.uid,
+                                 packed=packed,
+                                 bk=self.Bk,
+                                 timeout=timeout,
+                                 expiry=expiry)
+        self.txDedups[dedup.did] = dedup
+        dedup.offer()
+        return None
+
+    def serviceTxDedups(self):
+        '''
+        Remove done outgoing deduplicated messages and give up on those whose
+        need never came or whose remote is gone
+        Supplied chunks in flight fail by their own transfer timeout
+        '''
+        for did, dedup in self.txDedups.items():
+            if dedup.done or dedup.failed:
+                pass
+            elif dedup.uid not in self.remotes:
+                dedup.fail()
+            elif dedup.timer.expired and not dedup.supplied:
+                self.incStat('dedup_tx_timeout')
+                dedup.fail()
+            if dedup.done or dedup.failed:
+                del self.txDedups[did]
+
+    def receiveDedup(self, body, remote, kind):
+        '''
+        Process deduplicated message exchange body of dedup kind from remote
+        '''
+        try:
+            if kind == DedupKind.offer:
+                dedup = deduping.RxDedup(stack=self, remote=remote, body=body)
+                dedup.need()
+                if dedup.misseds:
+                    self.rxDedups[(remote.name, dedup.did)] = dedup
+                else:
+                    self.rxMsgs.append((dedup.complete(), remote.name))
+            elif kind == DedupKind.need:
+                did = body.get('id') if isinstance(body, Mapping) else None
+                dedup = self.txDedups.get(did)
+                if (dedup is None or dedup.uid != remote.uid or
+                        dedup.supplied or dedup.failed):
+                    self.incStat('dedup_need_unknown')
+                    return
+                dedup.supply(body)
+            elif kind == DedupKind.chunks:
+                did, chunks = deduping.unpackChunks(body)
+                dedup = self.rxDedups.get((remote.name, did))
+                if dedup is None:
+                    self.incStat('dedup_chunks_unknown')
+                    return
+                dedup.receive(chunks)
+                if not dedup.misseds:
+                    del self.rxDedups[(remote.name, did)]
+                    self.rxMsgs.append((dedup.complete(), remote.name))
+            else:
+                raise raeting.PacketError("Invalid dedup kind '{0}'".format(kind))
+        except raeting.PacketError as ex:
+            console.terse("Stack {0}. Invalid dedup message from {1}. {2}\n".format(
+                    self.name, remote.name, ex))
+            self.incStat('invalid_dedup')
+
+    def fetchPieceStore(self, key):
+        '''
+        Returns store of received pieces of resumable message with key
+        Stale pieces kept on disk by earlier runs are removed first
+        '''
+        if not self.resumeDisk:
+            return resuming.PieceStore()
+        if not self.resumeCleared:
+            self.keep.clearResumeData(age=self.ResumeTimeout)
+            self.resumeCleared = True
+        return self.keep.createPieceStore(key)
+
+    def resumable(self, body, remote, timeout=None, expiry=None, owner=None,
+                  dedup=0):
+        '''
+        Offer body to remote as resumable message when its packed size is
+        at least .resumeSize and return None
+        Otherwise return body packed once as serializing.Packed
+        The same body already in flight to remote is not sent resumable
+        owner is deduplicated message exchange when body is its raw step of
+        DedupKind value dedup
+        '''
+        packed = self.packOnce(body, bk=BodyKind.raw.value if dedup else None)
+        if packed is None:
+            return body
+        if len(packed) < self.resumeSize:
+            return serializing.Packed(packed)
+        key = (remote.uid, resuming.resumeId(packed))
+        current = self.txResumes.get(key)
+        if current is not None and not (current.done or current.failed):
+            return serializing.Packed(packed)
+        resume = resuming.TxResume(stack=self,
+                                   uid=remote.uid,
+                                   packed=packed,
+                                   bk=BodyKind.raw.value if dedup else self.Bk,
+                                   timeout=timeout,
+                                   expiry=expiry,
+                                   owner=owner,
+                                   carries=odict(dd=dedup) if dedup else None,
+                                   rid=key[1])
+        self.txResumes[key] = resume
+        resume.offer()
+        return None
+
+    def serviceTxResumes(self):
+        '''
+        Send pieces of outgoing resumable messages while their windows allow
+        and offer interrupted ones again
+        '''
+        for key, resume in self.txResumes.items():
+            resume.service()
+            if ((resume.done or resume.failed) and
+                    self.txResumes.get(key) is resume): # not yet sent again
+                del self.txResumes[key]
+
+    def receiveResume(self, body, remote, kind, index=0):
+        '''
+        Process resumable message exchange body of resume kind from remote
+        index is piece index of piece body
+        '''
+        try:
+            if kind == ResumeKind.offer:
+                rid = body.get('id') if isinstance(body, Mapping) else None
+                key = (remote.name, rid)
+                resume = self.rxResumes.get(key) # offered again
+                if resume is None:
+                    resume = resuming.RxResume(stack=self, remote=remote, body=body)
+                    key = (remote.name, resume.rid)
+                    self.rxResumes[key] = resume
+                resume.need()
+                if resume.full: # all kept from before
+                    del self.rxResumes[key]
+                    self.deliverResume(resume)
+            elif kind == ResumeKind.need:
+                rid = body.get('id') if isinstance(body, Mapping) else None
+                resume = self.txResumes.get((remote.uid, rid))
+                if resume is None:
+                    self.incStat('resume_need_unknown')
+                    return
+                resume.supply(body)
+            elif kind == ResumeKind.piece:
+                rid, piece = resuming.unpackPiece(body)
+                key = (remote.name, rid)
+                resume = self.rxResumes.get(key)
+                if resume is None:
+                    self.incStat('resume_piece_unknown')
+                    return
+                resume.receive(index, piece)
+                if resume.full:
+                    del self.rxResumes[key]
+                    self.deliverResume(resume)
+            else:
+                raise raeting.PacketError("Invalid resume kind '{0}'".format(kind))
+        except raeting.PacketError as ex:
+            console.terse("Stack {0}. Invalid resumable message from {1}. {2}\n".format(
+                    self.name, remote.name, ex))
+            self.incStat('invalid_resume')
+
+    def deliverResume(self, resume):
+        '''
+        Deliver body of completed incoming resumable message to .rxMsgs or
+        to its deduplicated message exchange when it carries a dedup step
+        Raises PacketError if body is invalid
+        '''
+        body = resume.complete()
+        if resume.dedup:
+            self.receiveDedup(body, resume.remote, resume.dedup)
+        else:
+            self.rxMsgs.append((body, resume.remote.name))
+
+    def coalesce(self, body, uid=None, timeout=None, expiry=None):
+        '''
+        Add message body to coalesced messages of remote at uid
+        Flushes first if body would exceed .coalesceSize byte budget
+        Bodies at least as big as the budget are sent on their own
+        expiry is stamp when message is dropped, None means never
+        '''
+        remote = self.retrieveRemote(uid=uid)
+        if not remote:
+            self.message(body, uid=uid, timeout=timeout) # reports invalid uid
+            return
+        if isinstance(body, serializing.Packed):
+            size = self.coalesceSize # already serialized so send on its own
+        else:
+            try:
+                size = len(packeting.packBody(body, self.Bk))
+            except (raeting.PacketError, TypeError, ValueError) as ex:
+                size = self.coalesceSize # not coalescable so send on its own
+
+        if remote.coalesceds and (remote.coalescedSize + size) > self.coalesceSize:
+            self.flushCoalesceds(remote)
+        if size >= self.coalesceSize:
+            self.message(body, uid=remote.uid, timeout=timeout, expiry=expiry)
+            return
+        if not remote.coalesceds:
+            remote.lingerTimer.restart(duration=self.linger)
+        remote.coalesceds.append((body, timeout, expiry))
+        remote.coalescedSize += size
+
+    def serviceCoalesceds(self):
+        '''
+        Flush coalesced messages of each remote whose linger has expired
+        '''
+        for remote in self.remotes.values():
+            if remote.coalesceds and remote.lingerTimer.expired:
+                self.flushCoalesceds(remote)
+
+    def flushCoalesceds(self, remote):
+        '''
+        Send coalesced messages of remote in one message transaction
+        '''
+        coalesceds = [(body, timeout, expiry)
+                      for body, timeout, expiry in remote.coalesceds
+                      if not self.expire(expiry, remote=remote)]
+        remote.coalesceds = deque()
+        remote.coalescedSize = 0
+        if not coalesceds:
+            return
+        if len(coalesceds) == 1:
+            body, timeout, expiry = coalesceds[0]
+            self.message(body, uid=remote.uid, timeout=timeout, expiry=expiry)
+            return
+        timeouts = set(timeout for body, timeout, expiry in coalesceds)
+        timeout = timeouts.pop() if len(timeouts) == 1 else None
+        expiries = [expiry for body, timeout, expiry in coalesceds]
+        expiry = None if None in expiries else max(expiries) # latest of any
+        body = odict(ms=[body for body, timeout, expiry in coalesceds])
+        self.message(body, uid=remote.uid, timeout=timeout, count=len(coalesceds),
+                     expiry=expiry)
+        self.incStat('message_coalesced_tx', len(coalesceds))
+
+    def tx(self, packed, duid, control=False, contain=None):
+        '''
+        Queue duple of (packed, da) on stack .txes scheduler
+        Where da is the ip destination (host,port) address associated with
+        the remote identified by duid
+        control True means packet is served ahead of message segments
+        contain is signature foot size of control packet packed when it may be
+        sent in a container packet, None means never contained
+        '''
+        if duid not in self.remotes:
+            msg = "Invalid destination remote id '{0}'".format(duid)
+            raise raeting.StackError(msg)
+        if self.contain and control and contain is not None:
+            self.containeds.setdefault(duid, []).append((packed, contain))
+            return
+        self.txes.append((packed, self.remotes[duid].ha), control=control)
+
+    def serviceContaineds(self):
+        '''
+        Queue control packets held for containers. Packets to the same remote
+        are packed into as few container packets as fit its packet size
+        A packet alone or too big for a container is queued as is
+        '''
+        containeds = self.containeds
+        self.containeds = odict()
+        for uid, entries in containeds.items():
+            remote = self.remotes.get(uid)
+            if not remote:
+                continue
+            if len(entries) < 2 or not remote.fuid or not remote.sid:
+                for packed, footsize in entries:
+                    self.txes.append((packed, remote.ha), control=True)
+                continue
+            limit = remote.packetSize or raeting.UDP_MAX_PACKET_SIZE
+            limit -= self.containerSize(remote) # room left for entries
+            batch = []
+            size = 0
+            for packed, footsize in entries:
+                entry = len(packed) - footsize + packeting.CONTAINED_HEAD.size
+                if batch and size + entry > limit:
+                    self.container(remote, batch)
+                    batch = []
+                    size = 0
+                batch.append((packed, footsize))
+                size += entry
+            self.container(remote, batch)
+
+    def containerSize(self, remote):
+        '''
+        Returns size of empty container packet to remote with room for the
+        body length field to grow
+        Sized from prepacked head and blank foot so nothing is signed
+        '''
+        packet = self.containerPacket(remote, [])
+        try:
+            packet.prepack()
+        except raeting.PacketError:
+            return 8
+        return (packet.size + 8)
+
+    def containerPacket(self, remote, batch):
+        '''
+        Returns unpacked container packet to remote of batch list of
+        (packed, footsize)
+        '''
+        body = serializing.Packed(b''.join(packeting.packContained(packed, footsize)
+                                           for packed, footsize in batch))
+        data = odict(hk=self.Hk,
+                     bk=BodyKind.raw.value,
+                     fk=self.Fk,
+                     ck=CoatKind.nada.value,
+                     se=remote.nuid,
+                     de=remote.fuid,
+                     si=remote.sid)
+        return packeting.TxPacket(stack=self,
+                                  kind=PcktKind.container.value,
+                                  embody=body,
+                                  data=data)
+
+    def container(self, remote, batch, queue=True):
+        '''
+        Returns container packet to remote of batch list of (packed, footsize)
+        and queues it if queue. A batch of one is queued as is
+        Returns None if container not packed in which case batch is queued as is
+        '''
+        if queue and len(batch) < 2:
+            for packed, footsize in batch:
+                self.txes.append((packed, remote.ha), control=True)
+            return None
+        packet = self.containerPacket(remote, batch)
+        try:
+            packet.pack()
+        except raeting.PacketError as ex:
+            console.terse(str(ex) + '\n')
+            self.incStat("packing_error")
+            packet = None
+        if queue:
+            if packet:
+                self.txes.append((packet.packed, remote.ha), control=True)
+                self.incStat('container_tx')
+                self.incStat('container_packet_tx', len(batch))
+            else:
+                for packed, footsize in batch:
+                    self.txes.append((packed, remote.ha), control=True)
+        return packet
+
+    def _handleOneTx(self, laters, blocks):
+        '''
+        Handle next packet on .txes scheduler skipping destinations in blocks
+        Assumes there is a packet to a destination not in blocks
+        laters is not used since a blocked packet goes back to the head of
+        its destination queue
+        blocks is list of destinations that already blocked on this service
+        '''
+        tx, ta = self.txes.popleft(skips=blocks)
+        if not self._sendOneTx(tx, ta):
+            self.txes.pushback((tx, ta))
+            blocks.append(ta)
+
+    def serviceTxes(self):
+        '''
+        Service the .txes scheduler to send packets through server
+        A blocked destination is skipped for the rest of this service so
+        packets to other destinations still go out
+        '''
+        if self.containeds:
+            self.serviceContaineds()
+        if self.server:
+            blocks = []
+            while self.txes.ready(skips=blocks):
+                self._handleOneTx(None, blocks)
+            self.updateTxStats(blocks)
+
+    def serviceTxOnce(self):
+        '''
+        Service one packet on the .txes scheduler to send through server
+        '''
+        if self.containeds:
+            self.serviceContaineds()
+        super(RoadStack, self).serviceTxOnce()
+
+    def updateTxStats(self, blocks=None):
+        '''
+        Update depth and max sojourn stats of each remote destination queue
+        serviced since last update or in blocks keyed by remote name
+        Other destinations such as vacuous joiners are not tracked
+        '''
+        keys = list(self.txes.sojourns.keys())
+        keys.extend(ta for ta in (blocks or []) if ta not in self.txes.sojourns)
+        for ta in keys:
+            remote = self.fetchRemoteByHa(ta)
+            if not remote:
+                continue
+            self.updateStat('tx_depth_{0}'.format(remote.name), self.txes.depth(ta))
+            self.updateStat('tx_sojourn_{0}'.format(remote.name),
+                            self.txes.sojourns.get(ta, 0.0))
+        self.txes.sojourns.clear()
+
+    def serviceSaveds(self):
+        '''
+        Continue paced resend of saved messages of each allowed remote
+        '''
+        for remote in self.remotes.values():
+            if remote.resending and remote.allowed:
+                remote.resendSaved()
+
+    def serviceQueueds(self):
+        '''
+        Start queued messages of each remote while below .inflightMax
+        Calls .queueLowCallback when queue drains to .queueLow
+        '''
+        for remote in self.remotes.values():
+            if not remote.queueds:
+                continue
+            inflight = len(remote.messengers)
+            while remote.queueds and inflight < self.inflightMax:
+                (body, timeout, count, stream, index,
+                 expiry, dedup, resume) = remote.queueds.popleft()
+                if self.expire(expiry, remote=remote):
+                    continue
+                self.message(body,
+                             uid=remote.uid,
+                             timeout=timeout,
+                             count=count,
+                             stream=stream,
+                             index=index,
+                             expiry=expiry,
+                             dedup=dedup,
+                             resume=resume,
+                             queue=False)
+                inflight += 1
+            self.updateStat('queue_{0}'.format(remote.name), len(remote.queueds))
+            if remote.queueHighed and len(remote.queueds) <= self.queueLow:
+                remote.queueHighed = False
+                self.incStat('message_queue_low')
+                console.concise("Stack {0}. Queue low for {1} at {2}\n".format(
+                        self.name, remote.name, self.store.stamp))
+                if self.queueLowCallback:
+                    self.queueLowCallback(remote)
+
+    def enqueue(self, remote, body, timeout=None, count=0, stream=None, index=0,
+                expiry=None, dedup=0, resume=0):
+        '''
+        Hold message on queue of remote until an in flight message completes
+        Calls .queueHighCallback when queue reaches .queueHigh
+        '''
+        remote.queueds.append((body, timeout, count, stream, index, expiry,
+                               dedup, resume))
+        depth = len(remote.queueds)
+        self.incStat('message_queued')
+        self.updateStat('queue_{0}'.format(remote.name), depth)
+        if depth > self.stats.get('message_queue_max', 0):
+            self.updateStat('message_queue_max', depth)
+        if self.queueHigh and not remote.queueHighed and depth >= self.queueHigh:
+            remote.queueHighed = True
+            self.incStat('message_queue_high')
+            console.concise("Stack {0}. Queue high for {1} at {2}\n".format(
+                    self.name, remote.name, self.store.stamp))
+            if self.queueHighCallback:
+                self.queueHighCallback(remote)
+
+    def message(self, body, uid=None, timeout=None, count=0, stream=None, index=0,
+                expiry=None, dedup=0, resume=0, queue=True):
         '''
         Initiate message transaction to remote at duid
         If uid is None then create remote at ha
         If timeout is None then use Messenger default
         If timeout is 0 then never timeout
+        count is number of coalesced messages in body list .ms, 0 means
+        body is one message
+        stream is TxStream when body is its chunk at index
+        expiry is stamp when message is dropped even if in flight, None means never
+        dedup is DedupKind value when body is a step of a deduplicated message
+        exchange, 0 means body may be deduplicated per .dedupSize
+        resume is ResumeKind value when body is a step of a resumable message
+        exchange, 0 means body may be sent resumable per .resumeSize
+        If queue and .inflightMax message transactions are in flight to remote
+        then the message waits on the queue of the remote instead
         '''
         remote = self.retrieveRemote(uid=uid)
         if not remote:
@@ -856,15 +2200,218 @@ class RoadStack(stacking.KeepStack):
             console.terse(emsg)
             self.incStat('invalid_remote_uid')
             return
-        data = odict(hk=self.Hk, bk=self.Bk, fk=self.Fk, ck=self.Ck)
+        if self.expire(expiry, remote=remote):
+            return
+        if (queue and self.throttling and
+                (remote.queueds or
+                 len(remote.messengers) >= self.inflightMax)):
+            self.enqueue(remote, body, timeout=timeout, count=count,
+                         stream=stream, index=index, expiry=expiry, dedup=dedup,
+                         resume=resume)
+            return
+        if self.dedupSize and not (count or stream or dedup or resume):
+            body = self.dedupe(body, remote, timeout=timeout, expiry=expiry)
+            if body is None:
+                return
+        if (self.resumeSize and not (count or resume) and
+                (not (stream or dedup) or dedup == DedupKind.chunks)):
+            body = self.resumable(body, remote, timeout=timeout, expiry=expiry,
+                                  owner=stream, dedup=dedup)
+            if body is None:
+                return
+        data = odict(hk=self.Hk, bk=self.Bk, zk=self.Zk, fk=self.Fk, ck=self.Ck)
+        if count:
+            data.update(mc=count)
+        if stream:
+            data.update(oi=index + 1) # order index 0 means not a stream chunk
+        if dedup:
+            data.update(dd=dedup)
+            if dedup == DedupKind.chunks:
+                data.update(bk=BodyKind.raw.value)
+        if resume:
+            data.update(rk=resume)
+            if resume == ResumeKind.piece:
+                data.update(bk=BodyKind.raw.value)
         messenger = transacting.Messenger(stack=self,
                                           remote=remote,
                                           timeout=timeout,
                                           txData=data,
                                           bcst=self.Bf,
-                                          burst=self.BurstSize)
+                                          burst=self.BurstSize,
+                                          stream=stream,
+                                          expiry=expiry)
         messenger.message(body)
 
+    def replyDone(self, packet, remote):
+        '''
+        Correspond to late segment of completed message transaction
+        Segments the initiator waits on get the done ack again in case it was
+        lost, at most once per redo period. Others are dropped instead of
+        restarting the message
+        '''
+        self.incStat('stale_segment')
+        if not (packet.data['wf'] or packet.data['af']):
+            return
+        key = (packet.data['si'], packet.data['ti'])
+        if (self.store.stamp - remote.doneTids[key] <
+                transacting.Messengent.RedoTimeoutMin):
+            return
+        remote.doneTids[key] = self.store.stamp
+        data = odict(hk=self.Hk, bk=self.Bk, fk=self.Fk, ck=self.Ck)
+        messengent = transacting.Messengent(stack=self,
+                                            remote=remote,
+                                            bcst=packet.data['bf'],
+                                            sid=packet.data['si'],
+                                            tid=packet.data['ti'],
+                                            txData=data,
+                                            rxPacket=packet)
+        messengent.done() # not added so nothing to remove
+
+    def broadcast(self, msg, uids=None, timeout=None):
+        '''
+        Initiate broadcast message transaction that sends msg once signed but
+        not encrypted to the allowed remotes with uids or to all allowed
+        remotes when uids is None
+        Segments go to multicast group .bcstHa when set Otherwise the same
+        packets go to each remote. Receivers do not ack. Segments they nack
+        as missing are resent until timeout
+        If timeout is None then use Broadcaster default
+        msg may be serializing.Packed already serialized per .Bk
+        '''
+        if not isinstance(msg, (Mapping, serializing.Packed)):
+            emsg = "Invalid msg, not a mapping {0}\n".format(msg)
+            console.terse(emsg)
+            self.incStat("invalid_transmit_body")
+            return
+        if uids is None:
+            uids = self.remotes.keys()
+        remotes = [self.remotes[uid] for uid in uids
+                   if uid in self.remotes and self.remotes[uid].allowed]
+        if not remotes:
+            emsg = "No allowed remote to broadcast to\n"
+            console.terse(emsg)
+            self.incStat("invalid_destination")
+            return
+        if not self.bcstSid: # newer session than any prior run of this stack
+            self.bcstSid = self.local.nextSid()
+            self.dumpLocal()
+        data = odict(hk=self.Hk, bk=self.Bk, zk=self.Zk, fk=self.Fk,
+                     ck=CoatKind.nada.value)
+        broadcaster = transacting.Broadcaster(stack=self,
+                                              remotes=remotes,
+                                              ha=self.bcstHa,
+                                              timeout=timeout,
+                                              txData=data)
+        broadcaster.message(msg)
+
+    def datagram(self, msg, uid=None, encrypt=True):
+        '''
+        Send msg to allowed remote at uid as one signed datagram packet
+        without a transaction. There is no ack, no resend and no transaction
+        state kept so a lost datagram is lost. For high rate messages such as
+        telemetry where a late copy is useless
+        If uid is None then send to the first entry in .remotes
+        encrypt False means the body is signed but not encrypted
+        msg may be serializing.Packed already serialized per .Bk
+        Returns True if queued Otherwise False such as when packed msg does
+        not fit in one packet
+        '''
+        if not isinstance(msg, (Mapping, serializing.Packed)):
+            emsg = "Invalid msg, not a mapping {0}\n".format(msg)
+            console.terse(emsg)
+            self.incStat("invalid_transmit_body")
+            return False
+        if uid is None and self.remotes:
+            uid = self.remotes.values()[0].uid
+        remote = self.remotes.get(uid, None)
+        if not remote:
+            emsg = "Invalid remote destination estate id '{0}'\n".format(uid)
+            console.terse(emsg)
+            self.incStat('invalid_remote_uid')
+            return False
+        if not remote.allowed:
+            emsg = "Stack {0}. Datagram must be allowed with {1} first\n".format(
+                    self.name, remote.name)
+            console.terse(emsg)
+            self.incStat('unallowed_remote')
+            return False
+        data = odict(hk=self.Hk,
+                     bk=self.Bk,
+                     zk=self.Zk,
+                     fk=self.Fk,
+                     ck=self.Ck if encrypt else CoatKind.nada.value,
+                     se=remote.nuid,
+                     de=remote.fuid,
+                     si=remote.sid,
+                     ti=remote.nextTid()) # own tid so never matches a transaction
+        packet = packeting.TxPacket(stack=self,
+                                    kind=PcktKind.datagram.value,
+                                    embody=msg,
+                                    data=data)
+        try:
+            packet.pack()
+        except raeting.PacketError as ex:
+            console.terse(str(ex) + '\n')
+            self.incStat("packing_error")
+            return False
+        self.txes.append((packet.packed, remote.ha))
+        self.incStat('datagram_tx')
+        return True
+
+    def receiveDatagram(self, packet, remote):
+        '''
+        Deliver body of datagram packet from remote to .rxMsgs
+        Nothing is sent back. Datagrams from unallowed remotes and duplicates
+        are dropped. Duplicates are screened with the remote's own small
+        datagram window so datagrams never evict completed message tids
+        A datagram older than the window is dropped as a possible duplicate
+        '''
+        if not remote.allowed:
+            self.incStat('unallowed_datagram_attempt')
+            return
+        sid = packet.data['si']
+        tid = packet.data['ti']
+        if not remote.validDatagram(sid, tid):
+            self.incStat('datagram_duplicate')
+            return
+        if not self.parseInner(packet):
+            return
+        remote.receivedDatagram(sid, tid)
+        self.rxMsgs.append((packet.body.data, remote.name))
+        self.incStat('datagram_rx')
+
+    def replyBroadcast(self, packet, remote):
+        '''
+        Correspond to new Broadcast transaction
+        '''
+        data = odict(hk=self.Hk, bk=self.Bk, fk=self.Fk, ck=self.Ck)
+        broadcastent = transacting.Broadcastent(stack=self,
+                                                remote=remote,
+                                                sid=packet.data['si'],
+                                                tid=packet.data['ti'],
+                                                txData=data,
+                                                rxPacket=packet)
+        broadcastent.message()
+
+    def joinGroup(self, host, interface='0.0.0.0'):
+        '''
+        Join IP multicast group host on interface so broadcasts sent to the
+        group at the port of this stack are received
+        Returns True if joined Otherwise False
+        '''
+        request = socket.inet_aton(host) + socket.inet_aton(interface)
+        try:
+            self.server.ss.setsockopt(socket.IPPROTO_IP,
+                                      socket.IP_ADD_MEMBERSHIP,
+                                      request)
+        except (socket.error, AttributeError) as ex:
+            emsg = "Stack '{0}'. Failed joining group '{1}'. {2}\n".format(
+                    self.name, host, ex)
+            console.terse(emsg)
+            self.incStat('join_group_failure')
+            return False
+        return True
+
     def replyMessage(self, packet, remote):
         '''
         Correspond to new Message transaction
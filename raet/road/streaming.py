@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+'''
+streaming.py raet protocol streaming classes
+
+A stream is sent as an ordered sequence of chunk messages each its own
+message transaction. At most a window of chunks is in flight or read ahead
+so memory stays bounded regardless of stream size on both sides.
+'''
+# pylint: skip-file
+# pylint: disable=W0611
+
+# Import python libs
+import os
+import uuid
+import base64
+import binascii
+import tempfile
+from collections import Mapping
+
+# Import ioflo libs
+from ioflo.base.odicting import odict
+from ioflo.base import aiding
+
+from ioflo.base.consoling import getConsole
+console = getConsole()
+
+# Import raet libs
+from ..abiding import *  # import globals
+from .. import raeting
+
+
+def iterChunks(source, size):
+    '''
+    Generator of byte chunks of at most size from source which is either
+    file like with .read or an iterable of bytes or str
+    '''
+    if hasattr(source, 'read'):
+        while True:
+            chunk = source.read(size)
+            if not chunk:
+                break
+            yield ns2b(chunk)
+    else:
+        for chunk in source:
+            chunk = ns2b(chunk)
+            for i in range(0, len(chunk), size):
+                yield chunk[i:i + size]
+
+
+class TxStream(object):
+    '''
+    RAET protocol outgoing stream of chunks to remote at .uid
+    Reads ahead one chunk so the last chunk can be flagged as the end
+    '''
+    def __init__(self, stack, uid, source, sid=None, chunkSize=None,
+                 window=None, timeout=None):
+        '''
+        Setup instance
+
+        source is file like or iterable of bytes
+        sid is stream id, generated if None
+        chunkSize is max bytes per chunk message
+        window is max chunks from the oldest chunk in flight, at most
+            stack .StreamReorder so the receiver holds them out of order
+        timeout is passed to each chunk message transaction
+        '''
+        self.stack = stack
+        self.uid = uid
+        self.sid = sid if sid is not None else uuid.uuid4().hex
+        self.chunkSize = max(1, int(chunkSize or self.stack.StreamChunkSize))
+        self.window = max(1, min(int(window or self.stack.StreamWindow),
+                                 self.stack.StreamReorder))
+        self.timeout = timeout
+        self.chunks = iterChunks(source, self.chunkSize)
+        self.index = 0  # index of next chunk to send
+        self.inflights = set()  # indexes of chunk messages not yet completed
+        self.pending = self.readAhead()
+        self.sent = False  # end chunk sent
+        self.done = False  # all chunks completed
+        self.failed = False
+
+    def readAhead(self):
+        '''
+        Returns next chunk from source or None if exhausted
+        '''
+        try:
+            return next(self.chunks)
+        except StopIteration:
+            return None
+
+    def service(self):
+        '''
+        Send chunk messages while window from oldest chunk in flight allows
+        '''
+        while (not (self.sent or self.failed) and
+                (not self.inflights or
+                 self.index - min(self.inflights) < self.window)):
+            remote = self.stack.retrieveRemote(uid=self.uid)
+            if not remote:
+                emsg = "Invalid stream destination estate id '{0}'\n".format(self.uid)
+                console.terse(emsg)
+                self.fail()
+                return
+            chunk = self.pending if self.pending is not None else b''
+            self.pending = self.readAhead()
+            end = self.pending is None
+            body = odict(id=self.sid,
+                         end=end,
+                         data=base64.b64encode(chunk).decode('ascii'))
+            self.inflights.add(self.index)
+            self.stack.message(body,
+                               uid=self.uid,
+                               timeout=self.timeout,
+                               stream=self,
+                               index=self.index)
+            self.index += 1
+            self.stack.incStat('stream_chunk_tx')
+            if end:
+                self.sent = True
+
+    def complete(self, messenger):
+        '''
+        Chunk message of messenger completed
+        '''
+        self.inflights.discard(messenger.tray.data.get('oi', 0) - 1)
+        if self.sent and not self.inflights and not self.failed:
+            self.done = True
+            self.stack.incStat('stream_tx_complete')
+            console.concise("Stack {0}. Done stream {1} of {2} chunks at {3}\n".format(
+                    self.stack.name, self.sid, self.index, self.stack.store.stamp))
+
+    def fail(self, messenger=None):
+        '''
+        Chunk message failed so abandon stream
+        '''
+        if messenger:
+            self.inflights.discard(messenger.tray.data.get('oi', 0) - 1)
+        if not self.failed:
+            self.failed = True
+            self.stack.incStat('stream_tx_failure')
+            console.terse("Stack {0}. Failed stream {1} at chunk {2}\n".format(
+                    self.stack.name, self.sid, self.index))
+
+
+class RxStream(object):
+    '''
+    RAET protocol incoming stream of chunks from remote named .source
+    Delivers contiguous chunks in order onto stack .rxChunks or, when spooled,
+    into a temporary file delivered once the end chunk arrives
+    '''
+    def __init__(self, stack, sid, source, spool=False):
+        '''
+        Setup instance
+        '''
+        self.stack = stack
+        self.sid = sid
+        self.source = source  # remote name
+        self.next = 0  # index of next chunk to deliver
+        self.chunks = odict()  # out of order chunks keyed by index
+        self.size = 0  # bytes delivered
+        self.ended = False
+        self.failed = False
+        self.timer = aiding.StoreTimer(self.stack.store,
+                                       duration=self.stack.StreamTimeout)
+        self.path = None
+        self.file = None
+        if spool:
+            fd, self.path = tempfile.mkstemp(prefix='raet', suffix='.stream')
+            self.file = os.fdopen(fd, 'wb')
+
+    def receive(self, index, body):
+        '''
+        Process chunk message body with index
+        Raises PacketError if body is invalid
+        '''
+        if not isinstance(body, Mapping):
+            raise raeting.PacketError("Invalid stream chunk, not a mapping")
+        try:
+            data = base64.b64decode(ns2b(str(body['data'])))
+            end = bool(body['end'])
+        except (KeyError, TypeError, ValueError, binascii.Error) as ex:
+            raise raeting.PacketError("Invalid stream chunk. {0}".format(ex))
+
+        self.timer.restart()
+        if index < self.next or index in self.chunks:
+            self.stack.incStat('stream_chunk_duplicate')
+            return
+        if index - self.next >= self.stack.StreamReorder: # beyond sender window
+            console.terse("Stack {0}. Failed stream {1} from {2} chunk {3} too far "
+                          "ahead\n".format(self.stack.name, self.sid, self.source, index))
+            self.stack.incStat('stream_chunk_ahead')
+            self.failed = True
+            self.close()
+            return
+        self.chunks[index] = (data, end)
+        while self.next in self.chunks:
+            data, end = self.chunks.pop(self.next)
+            self.deliver(self.next, data, end)
+            self.next += 1
+            if end:
+                self.ended = True
+                break
+
+    def deliver(self, index, data, end):
+        '''
+        Deliver contiguous chunk
+        '''
+        self.size += len(data)
+        if self.file:
+            self.file.write(data)
+            if end:
+                self.file.close()
+                self.file = None
+                self.stack.rxChunks.append((odict(id=self.sid,
+                                                  path=self.path,
+                                                  size=self.size,
+                                                  end=True), self.source))
+        else:
+            self.stack.rxChunks.append((odict(id=self.sid,
+                                              index=index,
+                                              data=data,
+                                              end=end), self.source))
+        self.stack.incStat('stream_chunk_rx')
+        if end:
+            self.stack.incStat('stream_rx_complete')
+
+    def close(self):
+        '''
+        Abandon stream and remove partial spool file
+        '''
+        self.chunks.clear()
+        if self.file:
+            self.file.close()
+            self.file = None
+            if self.path and os.path.exists(self.path):
+                os.remove(self.path)
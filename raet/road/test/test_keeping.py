@@ -2096,6 +2096,119 @@ class BasicTestCase(unittest.TestCase):
             stack.server.close()
             stack.clearAllKeeps()
 
+    def testMessageSpool(self):
+        '''
+        Test saved messages spooled on disk bounded and resent paced after restart
+        '''
+        console.terse("{0}\n".format(self.testMessageSpool.__doc__))
+        data = self.createRoadData(name='main',
+                                   base=self.base,
+                                   auto=raeting.AutoMode.once.value)
+        mainDirpath = data['dirpath']
+        keeping.clearAllKeep(data['dirpath'])
+        main = self.createRoadStack(data=data,
+                                    main=True,
+                                    ha=None)
+
+        data = self.createRoadData(name='other',
+                                   base=self.base,
+                                   auto=raeting.AutoMode.once.value)
+        otherDirpath = data['dirpath']
+        keeping.clearAllKeep(data['dirpath'])
+        other = self.createRoadStack(data=data,
+                                     main=None,
+                                     ha=("", raeting.RAET_TEST_PORT))
+
+        console.terse("\nSpool bounded by count and size *********\n")
+        spool = other.keep.createSpool('spare', size=1024, count=3)
+        self.assertEqual(len(spool), 0)
+        for i in range(5):
+            self.assertEqual(spool.push(odict(who="Green", index=i)),
+                             (True, 1 if i >= 3 else 0))
+        self.assertEqual(len(spool), 3)
+        self.assertEqual(spool.push(odict(data="x" * 1024)), (False, 0))
+        self.assertEqual(spool.push(odict(who="Green", index=5), expiry=2.5),
+                         (True, 1))
+        spool = other.keep.createSpool('spare', size=1024, count=3) # reload
+        self.assertEqual(len(spool), 3)
+        self.assertLess(spool.bytes, os.path.getsize(spool.filepath))
+        self.assertEqual(spool.pop(), (odict(who="Green", index=3), None))
+        spool.Compact = 1 # compact on next drop
+        self.assertEqual(spool.pop(), (odict(who="Green", index=4), None))
+        self.assertEqual(spool.bytes, os.path.getsize(spool.filepath))
+        self.assertEqual(spool.pop(), (odict(who="Green", index=5), 2.5))
+        self.assertFalse(os.path.exists(spool.filepath))
+        self.assertRaises(IndexError, spool.pop)
+
+        console.terse("\nSpooled expiry survives restart of store stamps *********\n")
+        spool = other.keep.createSpool('spare', store=self.store)
+        spool.push(odict(who="Green", index=6), expiry=self.store.stamp + 10.0)
+        store = storing.Store(stamp=1000.0)  # restarted stack stamps start over
+        spool = other.keep.createSpool('spare', store=store) # reload
+        body, expiry = spool.pop()
+        self.assertEqual(body, odict(who="Green", index=6))
+        self.assertAlmostEqual(expiry, 1010.0, delta=1.0)
+
+        self.join(other, main)
+        self.allow(other, main)
+        for stack in [main, other]:
+            remote = stack.remotes.values()[0]
+            self.assertIs(remote.allowed, True)
+
+        console.terse("\nSaved messages survive restart *********\n")
+        main.server.close()
+        other.server.close()
+        other = stacking.RoadStack(dirpath=otherDirpath,
+                                   store=self.store,
+                                   auto=raeting.AutoMode.once.value,
+                                   spoolSize=4096,
+                                   spoolRate=2.0)
+        remote = other.remotes.values()[0]
+        msgs = [odict(who="Green", index=i) for i in range(6)]
+        for msg in msgs:
+            remote.saveBody(msg)
+        self.assertEqual(remote.savedCount(), len(msgs))
+        self.assertEqual(len(remote.messages), 0)
+        self.assertEqual(other.stats['spool_saved'], len(msgs))
+        other.server.close()
+
+        main = stacking.RoadStack(dirpath=mainDirpath,
+                                  store=self.store,
+                                  main=True,
+                                  auto=raeting.AutoMode.once.value)
+        other = stacking.RoadStack(dirpath=otherDirpath,
+                                   store=self.store,
+                                   auto=raeting.AutoMode.once.value,
+                                   spoolSize=4096,
+                                   spoolRate=2.0)
+        remote = other.remotes.values()[0]
+        self.assertEqual(remote.savedCount(), len(msgs))
+
+        console.terse("\nSaved messages resent paced once allowed *********\n")
+        self.join(other, main)
+        self.allow(other, main)
+        self.assertIs(remote.allowed, True)
+        self.assertIs(remote.resending, True)
+        self.assertEqual(other.stats['spool_resent'], 2) # one second burst
+        self.timer.restart(duration=3.0)
+        while not self.timer.expired:
+            other.serviceAll()
+            main.serviceAll()
+            self.store.advanceStamp(0.1)
+        self.assertIs(remote.resending, False)
+        self.assertEqual(remote.savedCount(), 0)
+        self.assertEqual(other.stats['spool_resent'], len(msgs))
+        self.assertEqual(len(main.rxMsgs), len(msgs))
+        for msg in msgs:
+            receivedMsg, source = main.rxMsgs.popleft()
+            self.assertDictEqual(msg, receivedMsg)
+
+        for stack in [main, other]:
+            stack.server.close()
+            stack.clearAllKeeps()
+        self.assertFalse(os.path.exists(remote.spool.filepath))
+
+
 def runOne(test):
     '''
     Unittest Runner
@@ -2120,7 +2233,8 @@ def runSome():
              'testLostOtherKeepLocal',
              'testLostMainKeep',
              'testLostMainKeepLocal',
-             'testLostBothKeepLocal',]
+             'testLostBothKeepLocal',
+             'testMessageSpool',]
 
     tests.extend(map(BasicTestCase, names))
 
@@ -12,7 +12,9 @@ else:
     import unittest
 
 import os
+import io
 import time
+import base64
 import tempfile
 import shutil
 from collections import deque
@@ -25,8 +27,8 @@ console = getConsole()
 
 # Import raet libs
 from raet.abiding import *  # import globals
-from raet import raeting, nacling
-from raet.road import estating, keeping, stacking, packeting, transacting
+from raet import raeting, nacling, serializing
+from raet.road import estating, keeping, stacking, packeting, transacting, deduping
 
 if sys.platform == 'win32':
     TEMPDIR = 'c:/temp'
@@ -92,7 +94,24 @@ class BasicTestCase(unittest.TestCase):
                         role=None,
                         kind=None,
                         period=None,
-                        offset=None,):
+                        offset=None,
+                        windowInitial=None,
+                        pacing=None,
+                        coalesceSize=None,
+                        linger=None,
+                        inflightMax=None,
+                        queueHigh=None,
+                        queueLow=None,
+                        packetSize=None,
+                        packetProbe=None,
+                        contain=None,
+                        parityGroup=None,
+                        dedupSize=None,
+                        dedupChunkSize=None,
+                        dedupDisk=None,
+                        resumeSize=None,
+                        resumePieceSize=None,
+                        resumeDisk=None,):
         '''
         Creates stack and local estate from data with
         and overrides with parameters
@@ -112,7 +131,24 @@ class BasicTestCase(unittest.TestCase):
                                    kind=kind if kind is not None else data['kind'],
                                    dirpath=data['dirpath'],
                                    period=period,
-                                   offset=offset,)
+                                   offset=offset,
+                                   windowInitial=windowInitial,
+                                   pacing=pacing,
+                                   coalesceSize=coalesceSize,
+                                   linger=linger,
+                                   inflightMax=inflightMax,
+                                   queueHigh=queueHigh,
+                                   queueLow=queueLow,
+                                   packetSize=packetSize,
+                                   packetProbe=packetProbe,
+                                   contain=contain,
+                                   parityGroup=parityGroup,
+                                   dedupSize=dedupSize,
+                                   dedupChunkSize=dedupChunkSize,
+                                   dedupDisk=dedupDisk,
+                                   resumeSize=resumeSize,
+                                   resumePieceSize=resumePieceSize,
+                                   resumeDisk=resumeDisk,)
 
         return stack
 
@@ -1546,7 +1582,7 @@ class BasicTestCase(unittest.TestCase):
         # Messenger: resend last segment without AF
         self.serviceStack(alpha, duration=0.5)  # transmit
         self.assertIn('redo_segment', alpha.stats)
-        # Messengent: create new transaction and request missed segments, all but the last one
+        # Messengent: late segment of completed message gets done ack again
         self.serviceStacks((beta, alpha))
 
         for stack in [alpha, beta]:
@@ -1555,7 +1591,9 @@ class BasicTestCase(unittest.TestCase):
         self.assertEqual(len(alpha.txMsgs), 0)
         self.assertEqual(len(alpha.txes), 0)
         self.assertEqual(len(beta.rxes), 0)
-        #self.assertEqual(len(beta.rxMsgs), 1)
+        self.assertEqual(beta.stats['stale_segment'], 1)
+        self.assertNotIn('message_resend_tx', beta.stats)
+        self.assertEqual(len(beta.rxMsgs), 1)
         receivedMsg, source = beta.rxMsgs.popleft()
         self.assertDictEqual(sentMsg, receivedMsg)
 
@@ -1564,6 +1602,1370 @@ class BasicTestCase(unittest.TestCase):
             stack.server.close()
             stack.clearAllKeeps()
 
+    def testMessageRttEstimate(self):
+        '''
+        Test round trip time estimation drives redo timeouts of new transactions
+        '''
+        console.terse("{0}\n".format(self.testMessageRttEstimate.__doc__))
+
+        alphaData = self.createRoadData(name='alpha',
+                                        base=self.base,
+                                        auto=raeting.AutoMode.once.value)
+        keeping.clearAllKeep(alphaData['dirpath'])
+        alpha = self.createRoadStack(data=alphaData,
+                                     main=True,
+                                     auto=alphaData['auto'],
+                                     ha=None)
+
+        betaData = self.createRoadData(name='beta',
+                                       base=self.base,
+                                       auto=raeting.AutoMode.once.value)
+        keeping.clearAllKeep(betaData['dirpath'])
+        beta = self.createRoadStack(data=betaData,
+                                    main=True,
+                                    auto=betaData['auto'],
+                                    ha=("", raeting.RAET_TEST_PORT))
+
+        console.terse("\nJoin *********\n")
+        self.join(alpha, beta)
+        console.terse("\nAllow *********\n")
+        self.allow(alpha, beta)
+
+        remote = alpha.remotes.values()[0]
+        self.assertIs(remote.allowed, True)
+        self.assertIs(remote.srtt, None)  # no message or alive yet
+        self.assertIs(remote.rto, None)
+        messenger = transacting.Messenger(stack=alpha, remote=remote)
+        self.assertEqual(messenger.redoTimeoutMin, transacting.Messenger.RedoTimeoutMin)
+        self.assertEqual(messenger.redoTimeoutMax, transacting.Messenger.RedoTimeoutMax)
+
+        console.terse("\nMessage Alpha to Beta *********\n")
+        bloat = "".join([str(i).rjust(100, " ") for i in range(30)])
+        sentMsg = odict(who="Green", data=bloat)
+        self.message([sentMsg], alpha, beta, duration=5.0)
+
+        for stack in [alpha, beta]:
+            self.assertEqual(len(stack.transactions), 0)
+        receivedMsg, source = beta.rxMsgs.popleft()
+        self.assertDictEqual(sentMsg, receivedMsg)
+
+        self.assertIsNot(remote.srtt, None)
+        self.assertIn('rtt_sample', alpha.stats)
+        self.assertEqual(alpha.stats['rtt_beta'], remote.srtt)
+        self.assertEqual(alpha.stats['rto_beta'], remote.rto)
+        self.assertTrue(alpha.rtoMin <= remote.rto <= alpha.rtoMax)
+        self.assertGreaterEqual(remote.rto, remote.srtt)
+
+        messenger = transacting.Messenger(stack=alpha, remote=remote)
+        self.assertEqual(messenger.redoTimeoutMin, remote.rto)
+        self.assertEqual(messenger.redoTimeoutMax,
+                         max(transacting.Messenger.RedoTimeoutMax, 2.0 * remote.rto))
+        messenger = transacting.Messenger(stack=alpha, remote=remote,
+                                          redoTimeoutMin=0.3)  # explicit wins
+        self.assertEqual(messenger.redoTimeoutMin, 0.3)
+
+        # estimate follows samples and is bounded
+        srtt = remote.srtt
+        for i in range(50):
+            remote.sampleRtt(srtt + 2.0)
+        self.assertGreater(remote.srtt, srtt + 1.5)
+        for i in range(50):
+            remote.sampleRtt(100.0)
+        self.assertEqual(remote.rto, alpha.rtoMax)
+        for i in range(100):
+            remote.sampleRtt(0.0)
+        self.assertEqual(remote.rto, alpha.rtoMin)
+
+        # Karn's algorithm no sample after retransmission
+        count = alpha.stats['rtt_sample']
+        messenger.stampRtt()
+        messenger.rttStamp = None  # as on redo
+        messenger.sampleRtt()
+        self.assertEqual(alpha.stats['rtt_sample'], count)
+        messenger.stampRtt()
+        messenger.sampleRtt()
+        self.assertEqual(alpha.stats['rtt_sample'], count + 1)
+
+        for stack in [alpha, beta]:
+            stack.server.close()
+            stack.clearAllKeeps()
+
+    def testMessageCongestionWindow(self):
+        '''
+        Test message with congestion window, slow start, loss and pacing
+        '''
+        console.terse("{0}\n".format(self.testMessageCongestionWindow.__doc__))
+
+        alphaData = self.createRoadData(name='alpha',
+                                        base=self.base,
+                                        auto=raeting.AutoMode.once.value)
+        keeping.clearAllKeep(alphaData['dirpath'])
+        alpha = self.createRoadStack(data=alphaData,
+                                     main=True,
+                                     auto=alphaData['auto'],
+                                     ha=None,
+                                     windowInitial=2,
+                                     pacing=True)
+
+        betaData = self.createRoadData(name='beta',
+                                       base=self.base,
+                                       auto=raeting.AutoMode.once.value)
+        keeping.clearAllKeep(betaData['dirpath'])
+        beta = self.createRoadStack(data=betaData,
+                                    main=True,
+                                    auto=betaData['auto'],
+                                    ha=("", raeting.RAET_TEST_PORT),
+                                    windowInitial=2)
+
+        self.assertIs(alpha.congestive, True)
+        self.assertIs(alpha.pacing, True)
+
+        console.terse("\nJoin *********\n")
+        self.join(alpha, beta)
+        console.terse("\nAllow *********\n")
+        self.allow(alpha, beta)
+        for stack in [alpha, beta]:
+            remote = stack.remotes.values()[0]
+            self.assertIs(remote.allowed, True)
+            self.assertEqual(remote.cwnd, 2.0)
+            self.assertEqual(remote.ssthresh, stack.windowMax)
+
+        bloat = "".join([str(i).rjust(100, " ") for i in range(300)])
+        sentMsg = odict(who="Green", data=bloat)
+
+        console.terse("\nMessage Alpha to Beta slow start *********\n")
+        remote = alpha.remotes.values()[0]
+        self.message([sentMsg], alpha, beta, duration=10.0)
+
+        for stack in [alpha, beta]:
+            self.assertEqual(len(stack.transactions), 0)
+        receivedMsg, source = beta.rxMsgs.popleft()
+        self.assertDictEqual(sentMsg, receivedMsg)
+        self.assertGreater(remote.cwnd, 8.0)  # doubled each round trip
+        self.assertEqual(alpha.stats['cwnd_beta'], remote.cwnd)
+        self.assertNotIn('window_loss', alpha.stats)
+        self.assertIn('message_paced_tx', alpha.stats)
+
+        console.terse("\nMessage with drops Beta to Alpha *********\n")
+        remote = beta.remotes.values()[0]
+        drops = [0, 1, 1, 0, 0, 0, 0, 0, 1]
+        dropage = [list(drops), list(drops)]
+        beta.transmit(sentMsg)
+        self.serviceStacksWithDrops([beta, alpha], dropage=dropage, duration=10.0)
+
+        for stack in [alpha, beta]:
+            self.assertEqual(len(stack.transactions), 0)
+        receivedMsg, source = alpha.rxMsgs.popleft()
+        self.assertDictEqual(sentMsg, receivedMsg)
+        self.assertIn('window_timeout', beta.stats)  # dropped wait flagged segments
+        self.assertLess(remote.ssthresh, beta.windowMax)  # left slow start
+        self.assertGreaterEqual(remote.cwnd, 2.0)
+
+        console.terse("\nWindow arithmetic *********\n")
+        remote.cwnd = 10.0
+        remote.ssthresh = 8.0
+        remote.openWindow(10)  # congestion avoidance about one per window
+        self.assertEqual(remote.cwnd, 11.0)
+        remote.shrinkWindow()
+        self.assertEqual(remote.ssthresh, 5.5)
+        self.assertEqual(remote.cwnd, 5.5)
+        remote.shrinkWindow(timeout=True)
+        self.assertEqual(remote.cwnd, 1.0)
+        remote.openWindow(1)  # slow start
+        self.assertEqual(remote.cwnd, 2.0)
+
+        for stack in [alpha, beta]:
+            stack.server.close()
+            stack.clearAllKeeps()
+
+    def testMessageCoalesce(self):
+        '''
+        Test small messages to same remote coalesced into one transaction
+        '''
+        console.terse("{0}\n".format(self.testMessageCoalesce.__doc__))
+
+        alphaData = self.createRoadData(name='alpha',
+                                        base=self.base,
+                                        auto=raeting.AutoMode.once.value)
+        keeping.clearAllKeep(alphaData['dirpath'])
+        alpha = self.createRoadStack(data=alphaData,
+                                     main=True,
+                                     auto=alphaData['auto'],
+                                     ha=None,
+                                     coalesceSize=2048,
+                                     linger=0.5)
+
+        betaData = self.createRoadData(name='beta',
+                                       base=self.base,
+                                       auto=raeting.AutoMode.once.value)
+        keeping.clearAllKeep(betaData['dirpath'])
+        beta = self.createRoadStack(data=betaData,
+                                    main=True,
+                                    auto=betaData['auto'],
+                                    ha=("", raeting.RAET_TEST_PORT))
+
+        self.assertIs(alpha.coalescing, True)
+        self.assertIs(beta.coalescing, False)
+
+        console.terse("\nJoin *********\n")
+        self.join(alpha, beta)
+        console.terse("\nAllow *********\n")
+        self.allow(alpha, beta)
+        remote = alpha.remotes.values()[0]
+        self.assertIs(remote.allowed, True)
+
+        console.terse("\nMessage Alpha to Beta lingers *********\n")
+        msgs = [odict(who="Green", index=i, data="x" * 100) for i in range(25)]
+        for msg in msgs:
+            alpha.transmit(msg)
+        alpha.serviceTxMsgs()
+        self.assertEqual(len(alpha.txMsgs), 0)
+        self.assertEqual(len(alpha.transactions), 1)  # first budget full flushed
+        self.assertEqual(len(remote.coalesceds), 25 - alpha.stats['message_coalesced_tx'])
+        self.assertGreater(len(remote.coalesceds), 1)
+
+        self.serviceStacks([alpha, beta], duration=2.0)
+        self.assertGreater(len(remote.coalesceds), 1)  # still lingering
+        self.assertTrue(remote.lingerTimer.remaining > 0.0)
+        self.store.advanceStamp(remote.lingerTimer.remaining)
+        self.serviceStacks([alpha, beta], duration=2.0)
+        for stack in [alpha, beta]:
+            self.assertEqual(len(stack.transactions), 0)
+        self.assertEqual(len(remote.coalesceds), 0)  # linger expired so flushed
+        self.assertEqual(alpha.stats['message_coalesced_tx'], 25)
+        self.assertEqual(beta.stats['message_coalesced_rx'], 25)
+        self.assertEqual(beta.stats['messagent_correspond_complete'], 2)
+        self.assertEqual(len(beta.rxMsgs), 25)
+        for msg in msgs:
+            receivedMsg, source = beta.rxMsgs.popleft()
+            self.assertEqual(source, 'alpha')
+            self.assertDictEqual(msg, receivedMsg)
+
+        console.terse("\nMessage Alpha to Beta big and small in order *********\n")
+        bloat = "".join([str(i).rjust(100, " ") for i in range(30)])
+        msgs = [odict(who="Green", index=0),
+                odict(who="Green", index=1, data=bloat),  # over budget alone
+                odict(who="Green", index=2), ]
+        for msg in msgs:
+            alpha.transmit(msg)
+        self.serviceStacks([alpha, beta], duration=2.0)
+        self.store.advanceStamp(alpha.linger)
+        self.serviceStacks([alpha, beta], duration=2.0)
+        for stack in [alpha, beta]:
+            self.assertEqual(len(stack.transactions), 0)
+        self.assertEqual(len(beta.rxMsgs), 3)
+        for msg in msgs:
+            receivedMsg, source = beta.rxMsgs.popleft()
+            self.assertDictEqual(msg, receivedMsg)
+        self.assertEqual(alpha.stats['message_coalesced_tx'], 25)  # none coalesced
+
+        console.terse("\nMessage Beta to Alpha not coalesced *********\n")
+        msgs = [odict(who="Red", index=i) for i in range(3)]
+        for msg in msgs:
+            beta.transmit(msg)
+        self.serviceStacks([alpha, beta], duration=2.0)
+        self.assertEqual(alpha.stats['messagent_correspond_complete'], 3)
+        self.assertNotIn('message_coalesced_rx', alpha.stats)
+        for msg in msgs:
+            receivedMsg, source = alpha.rxMsgs.popleft()
+            self.assertDictEqual(msg, receivedMsg)
+
+        for stack in [alpha, beta]:
+            stack.server.close()
+            stack.clearAllKeeps()
+
+    def testMessageStream(self):
+        '''
+        Test streaming file like and iterable sources with bounded chunks in flight
+        '''
+        console.terse("{0}\n".format(self.testMessageStream.__doc__))
+
+        alphaData = self.createRoadData(name='alpha',
+                                        base=self.base,
+                                        auto=raeting.AutoMode.once.value)
+        keeping.clearAllKeep(alphaData['dirpath'])
+        alpha = self.createRoadStack(data=alphaData,
+                                     main=True,
+                                     auto=alphaData['auto'],
+                                     ha=None)
+
+        betaData = self.createRoadData(name='beta',
+                                       base=self.base,
+                                       auto=raeting.AutoMode.once.value)
+        keeping.clearAllKeep(betaData['dirpath'])
+        beta = self.createRoadStack(data=betaData,
+                                    main=True,
+                                    auto=betaData['auto'],
+                                    ha=("", raeting.RAET_TEST_PORT))
+
+        console.terse("\nJoin *********\n")
+        self.join(alpha, beta)
+        console.terse("\nAllow *********\n")
+        self.allow(alpha, beta)
+
+        console.terse("\nStream file Alpha to Beta *********\n")
+        stuff = os.urandom(100000)
+        sid = alpha.transmitStream(io.BytesIO(stuff), chunkSize=8192, window=2)
+        self.assertIn(sid, alpha.txStreams)
+        self.timer.restart(duration=20.0)
+        while not self.timer.expired:
+            for stack in [alpha, beta]:
+                stack.serviceAll()
+                self.assertLessEqual(len(alpha.transactions), 2)  # window
+            if not alpha.txStreams and not alpha.transactions:
+                break
+            self.store.advanceStamp(0.1)
+            time.sleep(0.05)
+        self.serviceStacks([alpha, beta])
+
+        self.assertEqual(len(alpha.txStreams), 0)
+        self.assertEqual(alpha.stats['stream_chunk_tx'], 13)
+        self.assertEqual(alpha.stats['stream_tx_complete'], 1)
+        self.assertEqual(beta.stats['stream_rx_complete'], 1)
+        self.assertEqual(len(beta.rxMsgs), 0)
+        self.assertEqual(len(beta.rxChunks), 13)
+        received = []
+        for i in range(13):
+            chunk, source = beta.rxChunks.popleft()
+            self.assertEqual(source, 'alpha')
+            self.assertEqual(chunk['id'], sid)
+            self.assertEqual(chunk['index'], i)
+            self.assertIs(chunk['end'], i == 12)
+            received.append(chunk['data'])
+        self.assertEqual(b"".join(received), stuff)
+        beta.process()
+        self.assertEqual(len(beta.rxStreams), 0)
+
+        console.terse("\nLate and far ahead chunks dropped *********\n")
+        remote = beta.remotes.values()[0]
+        late = odict(id=sid, end=False, data=base64.b64encode(b"late").decode('ascii'))
+        beta.receiveChunk(late, remote, 3)
+        self.assertEqual(beta.stats['stream_chunk_stale'], 1)
+        self.assertEqual(len(beta.rxStreams), 0) # not restarted
+        ahead = odict(id="ahead", end=False, data=late['data'])
+        beta.receiveChunk(ahead, remote, 1)
+        self.assertEqual(len(beta.rxStreams[('alpha', "ahead")].chunks), 1)
+        beta.receiveChunk(ahead, remote, beta.StreamReorder)
+        self.assertEqual(beta.stats['stream_chunk_ahead'], 1)
+        self.assertEqual(len(beta.rxStreams[('alpha', "ahead")].chunks), 0)
+        beta.process()
+        self.assertEqual(len(beta.rxStreams), 0)
+        beta.receiveChunk(ahead, remote, 0)
+        self.assertEqual(beta.stats['stream_chunk_stale'], 2)
+        self.assertEqual(len(beta.rxChunks), 0)
+
+        console.terse("\nStream iterable Beta to Alpha spooled *********\n")
+        alpha.StreamSpool = True
+        parts = [os.urandom(5000) for i in range(10)]
+        sid = beta.transmitStream(iter(parts), chunkSize=12000)
+        self.serviceStacks([alpha, beta], duration=10.0)
+        self.serviceStacks([alpha, beta], duration=10.0)
+        self.assertEqual(beta.stats['stream_chunk_tx'], 10)
+        self.assertEqual(len(alpha.rxChunks), 1)
+        chunk, source = alpha.rxChunks.popleft()
+        self.assertEqual(chunk['id'], sid)
+        self.assertIs(chunk['end'], True)
+        self.assertEqual(chunk['size'], 50000)
+        with open(chunk['path'], 'rb') as f:
+            self.assertEqual(f.read(), b"".join(parts))
+        os.remove(chunk['path'])
+
+        console.terse("\nStream empty *********\n")
+        sid = beta.transmitStream([])
+        self.serviceStacks([alpha, beta], duration=5.0)
+        self.serviceStacks([alpha, beta], duration=5.0)
+        chunk, source = alpha.rxChunks.popleft()
+        self.assertEqual(chunk['size'], 0)
+        os.remove(chunk['path'])
+
+        for stack in [alpha, beta]:
+            stack.server.close()
+            stack.clearAllKeeps()
+
+    def testMessageInflightQueue(self):
+        '''
+        Test message transactions per remote capped with queue watermarks
+        '''
+        console.terse("{0}\n".format(self.testMessageInflightQueue.__doc__))
+
+        alphaData = self.createRoadData(name='alpha',
+                                        base=self.base,
+                                        auto=raeting.AutoMode.once.value)
+        keeping.clearAllKeep(alphaData['dirpath'])
+        alpha = self.createRoadStack(data=alphaData,
+                                     main=True,
+                                     auto=alphaData['auto'],
+                                     ha=None,
+                                     inflightMax=2,
+                                     queueHigh=4,
+                                     queueLow=1)
+
+        betaData = self.createRoadData(name='beta',
+                                       base=self.base,
+                                       auto=raeting.AutoMode.once.value)
+        keeping.clearAllKeep(betaData['dirpath'])
+        beta = self.createRoadStack(data=betaData,
+                                    main=True,
+                                    auto=betaData['auto'],
+                                    ha=("", raeting.RAET_TEST_PORT))
+
+        self.assertIs(alpha.throttling, True)
+        self.assertIs(beta.throttling, False)
+        highs = []
+        lows = []
+        alpha.queueHighCallback = highs.append
+        alpha.queueLowCallback = lows.append
+
+        console.terse("\nJoin *********\n")
+        self.join(alpha, beta)
+        console.terse("\nAllow *********\n")
+        self.allow(alpha, beta)
+        remote = alpha.remotes.values()[0]
+        self.assertIs(remote.allowed, True)
+
+        console.terse("\nMessage Alpha to Beta capped *********\n")
+        msgs = [odict(who="Green", index=i) for i in range(10)]
+        for msg in msgs:
+            alpha.transmit(msg)
+        alpha.serviceTxMsgs()
+        self.assertEqual(len(alpha.txMsgs), 0)
+        self.assertEqual(len(alpha.transactions), 2)
+        self.assertEqual(len(remote.messengers), 2)
+        self.assertEqual(len(remote.queueds), 8)
+        self.assertIs(remote.queueHighed, True)
+        self.assertEqual(highs, [remote])
+        self.assertEqual(lows, [])
+        self.assertEqual(alpha.stats['message_queued'], 8)
+        self.assertEqual(alpha.stats['message_queue_max'], 8)
+        self.assertEqual(alpha.stats['queue_beta'], 8)
+
+        self.serviceStacks([alpha, beta], duration=10.0)
+        for stack in [alpha, beta]:
+            self.assertEqual(len(stack.transactions), 0)
+        self.assertEqual(len(remote.messengers), 0)
+        self.assertEqual(len(remote.queueds), 0)
+        self.assertIs(remote.queueHighed, False)
+        self.assertEqual(highs, [remote])
+        self.assertEqual(lows, [remote])
+        self.assertEqual(alpha.stats['message_queue_high'], 1)
+        self.assertEqual(alpha.stats['message_queue_low'], 1)
+        self.assertEqual(alpha.stats['queue_beta'], 0)
+        self.assertEqual(len(beta.rxMsgs), len(msgs))
+        for msg in msgs:
+            receivedMsg, source = beta.rxMsgs.popleft()
+            self.assertEqual(source, 'alpha')
+            self.assertDictEqual(msg, receivedMsg)
+
+        console.terse("\nMessage Beta to Alpha not capped *********\n")
+        msgs = [odict(who="Red", index=i) for i in range(5)]
+        for msg in msgs:
+            beta.transmit(msg)
+        beta.serviceTxMsgs()
+        self.assertEqual(len(beta.transactions), 5)
+        self.assertEqual(len(beta.remotes.values()[0].messengers), 5)
+        self.assertEqual(len(alpha.remotes.values()[0].messengers), 0)
+        self.serviceStacks([alpha, beta], duration=2.0)
+        self.assertEqual(len(alpha.rxMsgs), len(msgs))
+        self.assertNotIn('message_queued', beta.stats)
+
+        for stack in [alpha, beta]:
+            stack.server.close()
+            stack.clearAllKeeps()
+
+    def testMessageReplayFilter(self):
+        '''
+        Test exact duplicate packets dropped or not reverified by replay filter
+        '''
+        console.terse("{0}\n".format(self.testMessageReplayFilter.__doc__))
+
+        alphaData = self.createRoadData(name='alpha',
+                                        base=self.base,
+                                        auto=raeting.AutoMode.once.value)
+        keeping.clearAllKeep(alphaData['dirpath'])
+        alpha = self.createRoadStack(data=alphaData,
+                                     main=True,
+                                     auto=alphaData['auto'],
+                                     ha=None)
+
+        betaData = self.createRoadData(name='beta',
+                                       base=self.base,
+                                       auto=raeting.AutoMode.once.value)
+        keeping.clearAllKeep(betaData['dirpath'])
+        beta = self.createRoadStack(data=betaData,
+                                    main=True,
+                                    auto=betaData['auto'],
+                                    ha=("", raeting.RAET_TEST_PORT))
+
+        console.terse("\nJoin *********\n")
+        self.join(alpha, beta)
+        console.terse("\nAllow *********\n")
+        self.allow(alpha, beta)
+        remote = beta.remotes.values()[0]
+        self.assertIs(remote.allowed, True)
+        beta.ReplayWindow = 64
+        beta.clearStats()
+
+        console.terse("\nMessage Alpha to Beta network duplicated *********\n")
+        bloat = "".join([str(i).rjust(100, " ") for i in range(30)])
+        sentMsg = odict(who="Green", data=bloat)
+        alpha.transmit(sentMsg)
+        self.serviceStack(alpha, duration=0.1)  # send segments
+        beta.serviceReceives()
+        raws = [raw for raw, sa in beta.rxes]
+        self.assertGreater(len(raws), 1)
+        self.dupReceives(beta)
+        self.assertEqual(len(beta.rxes), 2 * len(raws))
+        self.serviceStacks([alpha, beta])
+        for stack in [alpha, beta]:
+            self.assertEqual(len(stack.transactions), 0)
+        self.assertEqual(beta.stats['replay_duplicate'], len(raws))
+        self.assertEqual(beta.stats['messagent_correspond_complete'], 1)
+        self.assertEqual(len(remote.replays), len(raws))
+        self.assertEqual(len(beta.rxMsgs), 1)
+        receivedMsg, source = beta.rxMsgs.popleft()
+        self.assertDictEqual(sentMsg, receivedMsg)
+
+        console.terse("\nLate retransmit not verified again *********\n")
+        self.store.advanceStamp(1.0)
+        beta.rxes.append((raws[0], alpha.local.ha))
+        beta.serviceRxes()
+        self.assertEqual(beta.stats['replay_verified'], 1)
+        self.assertEqual(beta.stats['replay_duplicate'], len(raws))
+        keys = remote.replays.keys()
+        beta.ReplayWindow = 2
+        remote.addReplay(keys[0], remote.replays[keys[0]][0]) # now newest
+        self.assertEqual(remote.replays.keys(), [keys[-1], keys[0]]) # oldest forgotten
+        beta.ReplayWindow = 64
+
+        console.terse("\nSpoofed duplicate header still verified *********\n")
+        raw = raws[1]
+        spoof = raw[:-65] + chr(ord(raw[-65]) ^ 0x01) + raw[-64:]
+        beta.rxes.append((spoof, alpha.local.ha))
+        beta.serviceRxes()
+        self.assertEqual(beta.stats['parsing_outer_error'], 1)
+        self.assertEqual(beta.stats['replay_verified'], 1)
+
+        console.terse("\nNew verify key forgets verified packets *********\n")
+        remote.verfer = nacling.Verifier(nacling.Signer().verhex)
+        beta.rxes.append((raws[0], alpha.local.ha))
+        beta.serviceRxes()
+        self.assertEqual(beta.stats['parsing_outer_error'], 2)
+        self.assertEqual(len(remote.replays), 0)
+        self.serviceStacks([alpha, beta])
+
+        for stack in [alpha, beta]:
+            stack.server.close()
+            stack.clearAllKeeps()
+
+    def testMessageDeadline(self):
+        '''
+        Test messages past their deadline dropped while waiting or in flight
+        '''
+        console.terse("{0}\n".format(self.testMessageDeadline.__doc__))
+
+        alphaData = self.createRoadData(name='alpha',
+                                        base=self.base,
+                                        auto=raeting.AutoMode.once.value)
+        keeping.clearAllKeep(alphaData['dirpath'])
+        alpha = self.createRoadStack(data=alphaData,
+                                     main=True,
+                                     auto=alphaData['auto'],
+                                     ha=None,
+                                     inflightMax=1)
+
+        betaData = self.createRoadData(name='beta',
+                                       base=self.base,
+                                       auto=raeting.AutoMode.once.value)
+        keeping.clearAllKeep(betaData['dirpath'])
+        beta = self.createRoadStack(data=betaData,
+                                    main=True,
+                                    auto=betaData['auto'],
+                                    ha=("", raeting.RAET_TEST_PORT))
+
+        console.terse("\nJoin *********\n")
+        self.join(alpha, beta)
+        console.terse("\nAllow *********\n")
+        self.allow(alpha, beta)
+        remote = alpha.remotes.values()[0]
+        self.assertIs(remote.allowed, True)
+        alpha.clearStats()
+
+        console.terse("\nMessage expired before sent *********\n")
+        alpha.transmit(odict(who="Green", index=0), deadline=0.5)
+        self.assertEqual(len(alpha.txMsgs[0]), 4)
+        self.store.advanceStamp(1.0)
+        alpha.serviceTxMsgs()
+        self.assertEqual(len(alpha.txMsgs), 0)
+        self.assertEqual(len(alpha.transactions), 0)
+        self.assertEqual(alpha.stats['message_expired'], 1)
+        self.assertEqual(alpha.stats['message_expired_beta'], 1)
+
+        console.terse("\nMessage expired in flight and queued *********\n")
+        bloat = "".join([str(i).rjust(100, " ") for i in range(30)])
+        alpha.transmit(odict(who="Green", data=bloat), deadline=0.1)
+        alpha.transmit(odict(who="Green", index=1), deadline=0.1)
+        alpha.transmit(odict(who="Green", index=2))
+        alpha.serviceTxMsgs()
+        self.assertEqual(len(alpha.transactions), 1)
+        self.assertEqual(len(remote.queueds), 2)
+        alpha.txes.clear()  # segments lost
+        self.serviceStacks([alpha, beta], duration=2.0)
+        for stack in [alpha, beta]:
+            self.assertEqual(len(stack.transactions), 0)
+        self.assertEqual(len(remote.queueds), 0)
+        self.assertEqual(alpha.stats['message_expired'], 3)
+        self.assertEqual(alpha.stats['message_expired_beta'], 3)
+        self.assertEqual(len(beta.rxMsgs), 1)
+        receivedMsg, source = beta.rxMsgs.popleft()
+        self.assertDictEqual(receivedMsg, odict(who="Green", index=2))
+
+        console.terse("\nSaved message expired before resent *********\n")
+        remote.messages.append((odict(who="Green", index=3), self.store.stamp))
+        remote.messages.append((odict(who="Green", index=4), None))
+        remote.sendSavedMessages()
+        self.assertEqual(len(remote.messages), 0)
+        self.assertEqual(alpha.stats['message_expired'], 4)
+        self.serviceStacks([alpha, beta], duration=2.0)
+        self.assertEqual(len(beta.rxMsgs), 1)
+        receivedMsg, source = beta.rxMsgs.popleft()
+        self.assertDictEqual(receivedMsg, odict(who="Green", index=4))
+
+        for stack in [alpha, beta]:
+            stack.server.close()
+            stack.clearAllKeeps()
+
+    def testMessageFanout(self):
+        '''
+        Test message to many remotes serialized once and compressed once
+        '''
+        console.terse("{0}\n".format(self.testMessageFanout.__doc__))
+
+        class CountingSerializer(serializing.JsonSerializer):
+            dumps = 0
+            def dump(self, data):
+                CountingSerializer.dumps += 1
+                return super(CountingSerializer, self).dump(data)
+
+        stacks = []
+        for i, name in enumerate(['alpha', 'beta', 'gamma']):
+            data = self.createRoadData(name=name,
+                                       base=self.base,
+                                       auto=raeting.AutoMode.once.value)
+            keeping.clearAllKeep(data['dirpath'])
+            stacks.append(self.createRoadStack(data=data,
+                                               main=True,
+                                               auto=data['auto'],
+                                               ha=("", raeting.RAET_TEST_PORT + i)))
+        alpha, beta, gamma = stacks
+
+        for stack in [beta, gamma]:
+            self.join(stack, alpha)
+            self.allow(stack, alpha)
+        self.assertEqual(len(alpha.remotes), 2)
+        for remote in alpha.remotes.values():
+            self.assertIs(remote.allowed, True)
+
+        bk = raeting.BodyKind.json.value
+        serializer = serializing.BodySerializers[bk]
+        serializing.registerBody(bk, CountingSerializer())
+        try:
+            console.terse("\nMessage Alpha to Beta and Gamma *********\n")
+            alpha.Zk = raeting.ZipKind.zlib.value
+            bloat = "".join([str(i).rjust(100, " ") for i in range(30)])
+            msg = odict(who="Green", data=bloat)
+            uids = [remote.uid for remote in alpha.remotes.values()]
+            alpha.transmit(msg, uid=uids)
+            self.assertEqual(CountingSerializer.dumps, 1)
+            self.assertEqual(len(alpha.txMsgs), 2)
+            packed = alpha.txMsgs[0][0]
+            self.assertIsInstance(packed, serializing.Packed)
+            self.assertIs(alpha.txMsgs[1][0], packed)
+            self.assertEqual(alpha.stats['message_fanout'], 1)
+            self.serviceStacks(stacks, duration=2.0)
+            for stack in stacks:
+                self.assertEqual(len(stack.transactions), 0)
+            self.assertEqual(CountingSerializer.dumps, 1)
+            self.assertEqual(packed.zips.keys(), [raeting.ZipKind.zlib.value])
+            for stack in [beta, gamma]:
+                self.assertEqual(len(stack.rxMsgs), 1)
+                receivedMsg, source = stack.rxMsgs.popleft()
+                self.assertEqual(source, 'alpha')
+                self.assertDictEqual(msg, receivedMsg)
+
+            console.terse("\nUnserializable fan out rejected *********\n")
+            alpha.transmit(odict(who=object()), uid=uids)
+            self.assertEqual(len(alpha.txMsgs), 0)
+            self.assertEqual(alpha.stats['invalid_transmit_body'], 1)
+        finally:
+            serializing.registerBody(bk, serializer)
+
+        for stack in stacks:
+            stack.server.close()
+            stack.clearAllKeeps()
+
+    def testBroadcast(self):
+        '''
+        Test broadcast message to many remotes without acks and with nack repair
+        '''
+        console.terse("{0}\n".format(self.testBroadcast.__doc__))
+
+        stacks = []
+        for i, name in enumerate(['alpha', 'beta', 'gamma']):
+            data = self.createRoadData(name=name,
+                                       base=self.base,
+                                       auto=raeting.AutoMode.once.value)
+            keeping.clearAllKeep(data['dirpath'])
+            stacks.append(self.createRoadStack(data=data,
+                                               main=True,
+                                               auto=data['auto'],
+                                               ha=("", raeting.RAET_TEST_PORT + i)))
+        alpha, beta, gamma = stacks
+
+        for stack in [beta, gamma]:
+            self.join(stack, alpha)
+            self.allow(stack, alpha)
+        self.assertEqual(len(alpha.remotes), 2)
+        for remote in alpha.remotes.values():
+            self.assertIs(alpha.fetchRemoteByHa(remote.ha), remote)
+        remote = alpha.nameRemotes['beta']
+        ha = remote.ha
+        remote.ha = ('127.0.0.1', raeting.RAET_TEST_PORT + 9) # index follows ha
+        self.assertIsNone(alpha.fetchRemoteByHa(ha))
+        self.assertIs(alpha.fetchRemoteByHa(remote.ha), remote)
+        remote.ha = ha
+        self.assertEqual(len(alpha.haRemotes), 2)
+
+        console.terse("\nBroadcast Alpha to Beta and Gamma *********\n")
+        bloat = "".join([str(i).rjust(100, " ") for i in range(40)])
+        msg = odict(who="Green", data=bloat)
+        alpha.broadcast(msg, timeout=2.0)
+        self.assertEqual(len(alpha.broadcasts), 1)
+        broadcaster = alpha.broadcasts.values()[0]
+        count = len(broadcaster.tray.packets)
+        self.assertTrue(count > 2)
+        self.assertEqual(len(alpha.txes), 2 * count)
+        self.assertEqual(alpha.stats['broadcast_segment_tx'], count)
+        self.assertNotEqual(alpha.bcstSid, 0)
+
+        # lose two segments to gamma
+        remote = alpha.nameRemotes['gamma']
+        duples = []
+        while alpha.txes:
+            duples.append(alpha.txes.popleft())
+        losses = [duple for duple in duples if duple[1] == remote.ha][1:3]
+        for duple in duples:
+            if duple not in losses:
+                alpha.txes.append(duple)
+
+        start = broadcaster.timer.start
+        self.serviceStacks(stacks, duration=3.0)
+        self.assertGreater(broadcaster.timer.start, start) # restarted by repair
+        for stack in [beta, gamma]:
+            self.assertEqual(len(stack.transactions), 0)
+            self.assertEqual(len(stack.rxMsgs), 1)
+            receivedMsg, source = stack.rxMsgs.popleft()
+            self.assertEqual(source, 'alpha')
+            self.assertDictEqual(msg, receivedMsg)
+            self.assertEqual(stack.stats['broadcast_correspond_complete'], 1)
+            self.assertNotIn('message_complete_ack', stack.stats)
+        self.assertNotIn('broadcast_resend_tx', beta.stats)
+        self.assertEqual(gamma.stats['broadcast_resend_tx'], 1)
+        self.assertEqual(alpha.stats['broadcast_repair_tx'], 2)
+
+        console.terse("\nDuplicate Broadcast Dropped *********\n")
+        for packet in broadcaster.tray.packets[:1]:
+            alpha.txes.append((packet.packed, alpha.nameRemotes['beta'].ha))
+        self.serviceStacks(stacks, duration=0.5)
+        self.assertEqual(len(beta.rxMsgs), 0)
+        self.assertEqual(beta.stats['broadcast_duplicate'], 1)
+
+        self.store.advanceStamp(2.0) # broadcaster done repairing
+        alpha.serviceAll()
+        self.assertEqual(len(alpha.broadcasts), 0)
+
+        for stack in stacks:
+            stack.server.close()
+            stack.clearAllKeeps()
+
+    def testPacketSize(self):
+        '''
+        Test packet size agreed in join used to segment and probed when asked
+        '''
+        console.terse("{0}\n".format(self.testPacketSize.__doc__))
+
+        stacks = []
+        for i, (name, size, probe) in enumerate([('alpha', 8192, False),
+                                                 ('beta', 4096, False),
+                                                 ('gamma', 4096, True)]):
+            data = self.createRoadData(name=name,
+                                       base=self.base,
+                                       auto=raeting.AutoMode.once.value)
+            keeping.clearAllKeep(data['dirpath'])
+            stacks.append(self.createRoadStack(data=data,
+                                               main=True,
+                                               auto=data['auto'],
+                                               ha=("", raeting.RAET_TEST_PORT + i),
+                                               packetSize=size,
+                                               packetProbe=probe))
+        alpha, beta, gamma = stacks
+
+        for stack in [beta, gamma]:
+            self.join(stack, alpha)
+            self.allow(stack, alpha)
+            self.assertEqual(stack.stats['packet_size_agreed'], 1)
+
+        remote = beta.remotes.values()[0]
+        self.assertEqual(remote.packetSize, 4096)
+        self.assertEqual(remote.probeSize, 0)
+        for remote in alpha.remotes.values():
+            self.assertEqual(remote.packetSize, 4096)
+
+        console.terse("\nMessage Beta to Alpha *********\n")
+        sizes = []
+        send = beta.server.send
+        def sendSized(tx, ta):
+            sizes.append(len(tx))
+            return send(tx, ta)
+        beta.server.send = sendSized
+        bloat = "".join([str(i).rjust(100, " ") for i in range(400)])
+        msg = odict(who="Green", data=bloat)
+        beta.transmit(msg)
+        self.serviceStacks([alpha, beta], duration=2.0)
+        self.assertEqual(len(alpha.rxMsgs), 1)
+        receivedMsg, source = alpha.rxMsgs.popleft()
+        self.assertDictEqual(msg, receivedMsg)
+        self.assertTrue(max(sizes) <= 4096)
+        self.assertTrue(max(sizes) > raeting.UDP_MAX_PACKET_SIZE)
+        self.assertTrue(len(sizes) < len(bloat) // raeting.UDP_MAX_PACKET_SIZE)
+
+        console.terse("\nProbe Gamma to Alpha *********\n")
+        remote = gamma.remotes.values()[0]
+        self.assertEqual(remote.packetSize, 0)
+        self.assertEqual(remote.probeSize, 4096)
+        gamma.alive(uid=remote.uid, probe=remote.probeSize)
+        self.assertEqual(len(remote.probeInProcess()), 1)
+        self.serviceStacks([alpha, gamma], duration=1.0)
+        self.assertEqual(remote.packetSize, 4096)
+        self.assertEqual(remote.probeSize, 0)
+        self.assertEqual(gamma.stats['packet_probe_complete'], 1)
+
+        for stack in stacks:
+            stack.server.close()
+            stack.clearAllKeeps()
+
+
+    def testContainer(self):
+        '''
+        Test small control packets to same remote sent in signed containers
+        '''
+        console.terse("{0}\n".format(self.testContainer.__doc__))
+
+        stacks = []
+        for i, name in enumerate(['alpha', 'beta']):
+            data = self.createRoadData(name=name,
+                                       base=self.base,
+                                       auto=raeting.AutoMode.once.value)
+            keeping.clearAllKeep(data['dirpath'])
+            stacks.append(self.createRoadStack(data=data,
+                                               main=True,
+                                               auto=data['auto'],
+                                               ha=("", raeting.RAET_TEST_PORT + i),
+                                               contain=True))
+        alpha, beta = stacks
+
+        self.join(beta, alpha)
+        self.allow(beta, alpha)
+        remote = beta.remotes.values()[0]
+        self.assertIs(remote.allowed, True)
+
+        console.terse("\nMessages Beta to Alpha *********\n")
+        for stack in stacks:
+            stack.clearStats()
+        msgs = [odict(who="Green", index=i) for i in range(5)]
+        for msg in msgs:
+            beta.transmit(msg)
+        self.serviceStacks(stacks, duration=2.0)
+        for stack in stacks:
+            self.assertEqual(len(stack.transactions), 0)
+        self.assertEqual(len(alpha.rxMsgs), len(msgs))
+        for msg in msgs:
+            receivedMsg, source = alpha.rxMsgs.popleft()
+            self.assertEqual(source, 'beta')
+            self.assertDictEqual(msg, receivedMsg)
+        self.assertEqual(alpha.stats['container_tx'], 1)
+        self.assertEqual(alpha.stats['container_packet_tx'], len(msgs))
+        self.assertEqual(beta.stats['container_rx'], 1)
+        self.assertEqual(beta.stats['container_packet_rx'], len(msgs))
+        self.assertEqual(beta.stats.get('container_invalid', 0), 0)
+
+        console.terse("\nTampered container dropped *********\n")
+        remote = alpha.remotes.values()[0]
+        packet = alpha.container(remote, [], queue=False) # signed empty container
+        self.assertEqual(alpha.containerSize(remote), packet.size + 8)
+        packet = alpha.container(remote, [(b'stuff', 0), (b'other', 0)], queue=False)
+        self.assertEqual(packeting.unpackContained(packet.body.packed),
+                         [b'stuff', b'other'])
+        raw = packet.packed.replace(b'stuff', b'stiff')
+        beta.rxes.append((raw, ('127.0.0.1', alpha.local.ha[1])))
+        beta.serviceRxes()
+        self.assertEqual(beta.stats['rx_reject_verify'], 1)
+        self.assertEqual(beta.stats['container_rx'], 1)
+
+        for stack in stacks:
+            stack.server.close()
+            stack.clearAllKeeps()
+
+
+    def testMessageParity(self):
+        '''
+        Test message segments lost one per parity group rebuilt without resend
+        '''
+        console.terse("{0}\n".format(self.testMessageParity.__doc__))
+
+        stacks = []
+        for i, (name, parity) in enumerate([('alpha', 4), ('beta', None)]):
+            data = self.createRoadData(name=name,
+                                       base=self.base,
+                                       auto=raeting.AutoMode.once.value)
+            keeping.clearAllKeep(data['dirpath'])
+            stacks.append(self.createRoadStack(data=data,
+                                               main=True,
+                                               auto=data['auto'],
+                                               ha=("", raeting.RAET_TEST_PORT + i),
+                                               parityGroup=parity))
+        alpha, beta = stacks
+
+        self.join(beta, alpha)
+        self.allow(beta, alpha)
+        for stack in stacks:
+            stack.clearStats()
+
+        bloat = "".join([str(i).rjust(100, " ") for i in range(300)])
+        msg = odict(who="Green", data=bloat)
+
+        console.terse("\nMessage with drops Alpha to Beta *********\n")
+        alpha.transmit(msg)
+        drops = [0, 1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1] # one per group of 4
+        self.serviceStacksWithDrops(stacks, dropage=[drops, []], duration=10.0)
+        for stack in stacks:
+            self.assertEqual(len(stack.transactions), 0)
+        self.assertEqual(len(beta.rxMsgs), 1)
+        receivedMsg, source = beta.rxMsgs.popleft()
+        self.assertDictEqual(msg, receivedMsg)
+        self.assertEqual(beta.stats['parity_rebuild'], 3)
+        self.assertEqual(beta.stats.get('message_resend_tx', 0), 0)
+
+        console.terse("\nMessage with drops Beta to Alpha no parity *********\n")
+        remote = beta.remotes.values()[0]
+        self.assertIs(remote.parityGroup, None)
+        self.assertEqual(beta.parityGroup, 0)
+        beta.transmit(msg)
+        self.serviceStacksWithDrops(stacks, dropage=[[], list(drops)], duration=10.0)
+        self.assertEqual(len(alpha.rxMsgs), 1)
+        receivedMsg, source = alpha.rxMsgs.popleft()
+        self.assertDictEqual(msg, receivedMsg)
+        self.assertEqual(alpha.stats.get('parity_rebuild', 0), 0)
+        self.assertGreater(alpha.stats['message_resend_tx'], 0)
+
+        for stack in stacks:
+            stack.server.close()
+            stack.clearAllKeeps()
+
+    def testMessageDedup(self):
+        '''
+        Test repeated large message bodies only send chunks missing from cache
+        '''
+        console.terse("{0}\n".format(self.testMessageDedup.__doc__))
+
+        stacks = []
+        for i, (name, disk) in enumerate([('alpha', False), ('beta', True)]):
+            data = self.createRoadData(name=name,
+                                       base=self.base,
+                                       auto=raeting.AutoMode.once.value)
+            keeping.clearAllKeep(data['dirpath'])
+            stacks.append(self.createRoadStack(data=data,
+                                               main=True,
+                                               auto=data['auto'],
+                                               ha=("", raeting.RAET_TEST_PORT + i),
+                                               dedupSize=4096,
+                                               dedupChunkSize=1024,
+                                               dedupDisk=disk))
+        alpha, beta = stacks
+
+        self.join(beta, alpha)
+        self.allow(beta, alpha)
+        for stack in stacks:
+            stack.clearStats()
+
+        bloat = "".join([str(i * 7919 % 10007).rjust(16, "x") for i in range(2000)])
+        msg = odict(who="Green", data=bloat)
+
+        console.terse("\nFirst dedup message Alpha to Beta *********\n")
+        alpha.transmit(msg)
+        self.serviceStacks(stacks, duration=3.0)
+        self.assertEqual(len(beta.rxMsgs), 1)
+        receivedMsg, source = beta.rxMsgs.popleft()
+        self.assertDictEqual(msg, receivedMsg)
+        self.assertEqual(alpha.stats['dedup_offer_tx'], 1)
+        self.assertEqual(alpha.stats['dedup_tx_complete'], 1)
+        self.assertEqual(beta.stats['dedup_rx_complete'], 1)
+        misses = beta.stats['dedup_chunk_miss']
+        self.assertEqual(alpha.stats['dedup_chunk_tx'], misses)
+        self.assertEqual(beta.stats.get('dedup_chunk_hit', 0), 0)
+        self.assertEqual(len(alpha.txDedups), 0)
+        self.assertEqual(len(beta.rxDedups), 0)
+        cache = beta.chunkCache
+        self.assertEqual(len(cache), misses)
+        self.assertTrue(cache.dirpath)
+
+        console.terse("\nRepeated dedup message Alpha to Beta *********\n")
+        alpha.transmit(msg)
+        self.serviceStacks(stacks, duration=3.0)
+        self.assertEqual(len(beta.rxMsgs), 1)
+        receivedMsg, source = beta.rxMsgs.popleft()
+        self.assertDictEqual(msg, receivedMsg)
+        self.assertEqual(beta.stats['dedup_chunk_hit'], misses)
+        self.assertEqual(beta.stats['dedup_chunk_miss'], misses)
+        self.assertEqual(alpha.stats['dedup_chunk_tx'], misses)
+        self.assertEqual(alpha.stats['dedup_tx_complete'], 2)
+
+        console.terse("\nEdited dedup message Alpha to Beta *********\n")
+        edited = odict(who="Green", data=bloat[:9000] + "edit" + bloat[9000:])
+        alpha.transmit(edited)
+        self.serviceStacks(stacks, duration=3.0)
+        self.assertEqual(len(beta.rxMsgs), 1)
+        receivedMsg, source = beta.rxMsgs.popleft()
+        self.assertDictEqual(edited, receivedMsg)
+        self.assertLess(alpha.stats['dedup_chunk_tx'] - misses, 4)
+        self.assertGreater(beta.stats['dedup_chunk_hit'], misses)
+
+        console.terse("\nSmall message Alpha to Beta not deduped *********\n")
+        alpha.transmit(odict(who="Green", data="small"))
+        self.serviceStacks(stacks, duration=3.0)
+        self.assertEqual(len(beta.rxMsgs), 1)
+        beta.rxMsgs.popleft()
+        self.assertEqual(alpha.stats['dedup_offer_tx'], 3)
+
+        def serviceUntilChunks():
+            sent = alpha.stats['dedup_chunk_tx']
+            self.timer.restart(duration=3.0)
+            while not self.timer.expired:
+                alpha.serviceAll()
+                if alpha.stats['dedup_chunk_tx'] > sent: # chunks sent not received
+                    break
+                beta.serviceAll()
+                self.store.advanceStamp(0.05)
+                time.sleep(0.05)
+
+        console.terse("\nSlow dedup chunks not timed out *********\n")
+        remote = alpha.remotes.values()[0]
+        alpha.DedupTimeout = 0.2
+        slow = odict(who="Green", data=bloat[1::2] + bloat[::2])
+        alpha.transmit(slow)
+        serviceUntilChunks()
+        self.timer.restart(duration=0.5)
+        while not self.timer.expired: # chunks not yet acked
+            alpha.serviceAll()
+            self.store.advanceStamp(0.1)
+            time.sleep(0.1)
+        self.serviceStacks(stacks, duration=3.0)
+        self.serviceStacks(stacks, duration=1.0)
+        self.assertEqual(len(beta.rxMsgs), 1)
+        receivedMsg, source = beta.rxMsgs.popleft()
+        self.assertDictEqual(slow, receivedMsg)
+        self.assertNotIn('dedup_tx_timeout', alpha.stats)
+        self.assertNotIn('dedup_tx_failure', alpha.stats)
+        self.assertEqual(alpha.stats['dedup_tx_complete'], 4)
+        self.assertEqual(remote.savedCount(), 0)
+        alpha.DedupTimeout = stacking.RoadStack.DedupTimeout
+
+        console.terse("\nTimed out dedup offer sent again once *********\n")
+        alpha.DedupTimeout = 0.2
+        again = odict(who="Green", data=bloat[2:] + bloat[:2])
+        alpha.transmit(again)
+        self.timer.restart(duration=3.0)
+        while not self.timer.expired and not alpha.stats.get('dedup_tx_timeout'):
+            alpha.serviceAll() # need not yet answered
+            self.store.advanceStamp(0.1)
+            time.sleep(0.1)
+        alpha.DedupTimeout = stacking.RoadStack.DedupTimeout
+        self.assertEqual(alpha.stats['dedup_tx_timeout'], 1)
+        self.assertEqual(alpha.stats['dedup_tx_resent'], 1)
+        self.assertEqual(remote.savedCount(), 0)
+        self.assertEqual(len(alpha.txDedups), 1) # offered again
+        for dedup in alpha.txDedups.values():
+            dedup.timer.restart(duration=alpha.DedupTimeout)
+        self.serviceStacks(stacks, duration=3.0)
+        self.serviceStacks(stacks, duration=1.0)
+        self.assertEqual(len(beta.rxMsgs), 1)
+        receivedMsg, source = beta.rxMsgs.popleft()
+        self.assertDictEqual(again, receivedMsg)
+        self.serviceStacks(stacks, duration=1.0)
+        self.assertEqual(len(beta.rxMsgs), 0) # exactly once
+
+        console.terse("\nLost dedup chunks sent again as whole message *********\n")
+        reverse = odict(who="Green", data=bloat[::-1])
+        alpha.transmit(reverse, timeout=0.5)
+        serviceUntilChunks()
+        self.assertEqual(len(alpha.txDedups), 1) # kept until chunks delivered
+        self.timer.restart(duration=1.0)
+        while not self.timer.expired:
+            alpha.serviceAll()
+            beta.serviceReceives()
+            beta.rxes.clear() # lost
+            self.store.advanceStamp(0.1)
+            time.sleep(0.1)
+        self.assertEqual(alpha.stats['dedup_tx_failure'], 2)
+        self.assertEqual(alpha.stats['dedup_tx_resent'], 2)
+        self.assertEqual(remote.savedCount(), 0) # remote still allowed
+        self.serviceStacks(stacks, duration=3.0)
+        self.serviceStacks(stacks, duration=1.0)
+        self.assertEqual(len(beta.rxMsgs), 1)
+        receivedMsg, source = beta.rxMsgs.popleft()
+        self.assertDictEqual(reverse, receivedMsg)
+        self.assertEqual(alpha.stats['dedup_tx_complete'], 6)
+
+        console.terse("\nDisk chunk cache survives restart *********\n")
+        reopened = deduping.ChunkCache(size=beta.dedupCacheSize,
+                                       dirpath=cache.dirpath)
+        self.assertEqual(len(reopened), len(cache))
+        for key in cache.keys():
+            self.assertEqual(reopened.get(key), cache.get(key))
+        self.assertEqual(beta.stats.get('invalid_dedup', 0), 0)
+
+        for stack in stacks:
+            stack.server.close()
+            stack.clearAllKeeps()
+
+    def testDatagram(self):
+        '''
+        Test datagram messages sent without transactions, acks or resends
+        '''
+        console.terse("{0}\n".format(self.testDatagram.__doc__))
+
+        stacks = []
+        for i, name in enumerate(['alpha', 'beta']):
+            data = self.createRoadData(name=name,
+                                       base=self.base,
+                                       auto=raeting.AutoMode.once.value)
+            keeping.clearAllKeep(data['dirpath'])
+            stacks.append(self.createRoadStack(data=data,
+                                               main=True,
+                                               auto=data['auto'],
+                                               ha=("", raeting.RAET_TEST_PORT + i)))
+        alpha, beta = stacks
+
+        console.terse("\nDatagram before allowed dropped *********\n")
+        self.join(beta, alpha)
+        self.assertFalse(alpha.datagram(odict(who="Green")))
+        self.assertEqual(alpha.stats['unallowed_remote'], 1)
+
+        self.allow(beta, alpha)
+        for stack in stacks:
+            stack.clearStats()
+
+        console.terse("\nDatagrams Alpha to Beta *********\n")
+        msgs = [odict(who="Green", sample=i) for i in range(3)]
+        for msg in msgs[:2]:
+            self.assertTrue(alpha.datagram(msg))
+        self.assertTrue(alpha.datagram(msgs[2], encrypt=False))
+        self.assertEqual(len(alpha.txes), 3)
+        self.assertEqual(len(alpha.transactions), 0)
+        duples = []
+        while alpha.txes:
+            duples.append(alpha.txes.popleft())
+        for duple in duples + duples[:1]: # first sent twice
+            alpha.txes.append(duple)
+
+        self.timer.restart(duration=0.5)
+        while not self.timer.expired:
+            alpha.serviceAllTx()
+            beta.serviceAllRx() # receive but leave any reply queued
+            self.store.advanceStamp(0.1)
+            time.sleep(0.1)
+        self.assertEqual(len(beta.txes), 0) # nothing to send back
+        for stack in stacks:
+            self.assertEqual(len(stack.transactions), 0)
+        self.assertEqual(len(beta.rxMsgs), 3)
+        for msg in msgs:
+            receivedMsg, source = beta.rxMsgs.popleft()
+            self.assertEqual(source, 'alpha')
+            self.assertDictEqual(msg, receivedMsg)
+        self.assertEqual(alpha.stats['datagram_tx'], 3)
+        self.assertEqual(beta.stats['datagram_rx'], 3)
+        self.assertEqual(beta.stats['datagram_duplicate'], 1)
+        self.assertNotIn('message_complete_ack', beta.stats)
+        remote = beta.remotes.values()[0]
+        self.assertEqual(len(remote.doneTids), 0) # own window not message tids
+        sid = remote.dgRsid
+        tid = remote.dgTid
+        self.assertFalse(remote.validDatagram(sid, tid))
+        self.assertTrue(remote.validDatagram(sid, tid - 3)) # gap in window
+        self.assertTrue(remote.validDatagram(sid, tid + 1))
+        remote.receivedDatagram(sid, tid + beta.DatagramWindow)
+        self.assertFalse(remote.validDatagram(sid, tid)) # slid out of window
+        self.assertTrue(remote.validDatagram(sid, tid + 1))
+        self.assertFalse(remote.validDatagram(sid, tid + beta.DatagramWindow))
+
+        console.terse("\nDatagram too big for one packet dropped *********\n")
+        bloat = "".join([str(i).rjust(100, " ") for i in range(40)])
+        self.assertFalse(alpha.datagram(odict(who="Green", data=bloat)))
+        self.assertEqual(alpha.stats['packing_error'], 1)
+        self.assertEqual(len(alpha.txes), 0)
+
+        for stack in stacks:
+            stack.server.close()
+            stack.clearAllKeeps()
+
+    def testMessageResume(self):
+        '''
+        Test resumable message only resends missing pieces after interruptions
+        '''
+        console.terse("{0}\n".format(self.testMessageResume.__doc__))
+
+        datas = []
+        stacks = []
+        for i, name in enumerate(['alpha', 'beta']):
+            data = self.createRoadData(name=name,
+                                       base=self.base,
+                                       auto=raeting.AutoMode.once.value)
+            keeping.clearAllKeep(data['dirpath'])
+            datas.append(data)
+            stacks.append(self.createRoadStack(data=data,
+                                               main=True,
+                                               auto=data['auto'],
+                                               ha=("", raeting.RAET_TEST_PORT + i),
+                                               resumeSize=4096,
+                                               resumePieceSize=2048,
+                                               resumeDisk=True))
+        alpha, beta = stacks
+
+        self.join(beta, alpha)
+        self.allow(beta, alpha)
+        for stack in stacks:
+            stack.clearStats()
+
+        def serviceUntil(stacks, done, duration=5.0, drop=False):
+            self.timer.restart(duration=duration)
+            while not self.timer.expired and not done():
+                for stack in stacks:
+                    if drop:
+                        stack.serviceReceives()
+                        stack.rxes.clear() # lost
+                    stack.serviceAll()
+                self.store.advanceStamp(0.1)
+                time.sleep(0.1)
+
+        console.terse("\nResumable message interrupted by timeouts *********\n")
+        bloat = "".join([str(i * 7919 % 10007).rjust(16, "x") for i in range(2500)])
+        msg = odict(who="Green", data=bloat)
+        alpha.transmit(msg, timeout=0.5)
+        serviceUntil(stacks, lambda: beta.stats.get('resume_piece_rx', 0) >= 4)
+        self.assertEqual(len(alpha.txResumes), 1)
+        resume = alpha.txResumes.values()[0]
+        count = resume.count
+        self.assertGreater(count, 8)
+        self.assertLess(beta.stats['resume_piece_rx'], count)
+        serviceUntil(stacks, lambda: False, duration=1.0, drop=True) # link down
+        self.assertTrue(resume.waiting)
+        serviceUntil(stacks, lambda: len(beta.rxMsgs), duration=10.0)
+        self.assertEqual(len(beta.rxMsgs), 1)
+        receivedMsg, source = beta.rxMsgs.popleft()
+        self.assertDictEqual(msg, receivedMsg)
+        self.serviceStacks(stacks)
+        self.assertEqual(len(alpha.txResumes), 0)
+        self.assertEqual(len(beta.rxResumes), 0)
+        self.assertGreaterEqual(alpha.stats['resume_interrupt'], 1)
+        self.assertGreaterEqual(alpha.stats['resume_offer_tx'], 2)
+        self.assertGreaterEqual(alpha.stats['resume_piece_skip'], 4)
+        self.assertLessEqual(alpha.stats['resume_piece_tx'], count + alpha.ResumeWindow)
+        self.assertEqual(alpha.stats['resume_tx_complete'], 1)
+        self.assertEqual(beta.stats['resume_rx_complete'], 1)
+        self.assertEqual(beta.stats['resume_piece_rx'], count)
+        self.assertEqual(os.listdir(os.path.join(beta.keep.dirpath, 'resumes')), [])
+
+        console.terse("\nResumable message resumed after receiver restart *********\n")
+        skipped = alpha.stats['resume_piece_skip']
+        msg = odict(who="Blue", data=bloat[::-1])
+        alpha.transmit(msg)
+        serviceUntil(stacks, lambda: beta.stats.get('resume_piece_rx', 0) >= count + 4)
+        beta.server.close()
+        beta = self.createRoadStack(data=datas[1],
+                                    main=True,
+                                    auto=datas[1]['auto'],
+                                    ha=("", raeting.RAET_TEST_PORT + 1),
+                                    resumeSize=4096,
+                                    resumePieceSize=2048,
+                                    resumeDisk=True)
+        stacks = [alpha, beta]
+        self.assertEqual(len(beta.remotes), 1)
+        self.join(beta, alpha)
+        self.allow(beta, alpha)
+        serviceUntil(stacks, lambda: len(beta.rxMsgs), duration=10.0)
+        self.assertEqual(len(beta.rxMsgs), 1)
+        receivedMsg, source = beta.rxMsgs.popleft()
+        self.assertDictEqual(msg, receivedMsg)
+        self.serviceStacks(stacks)
+        self.assertEqual(len(alpha.txResumes), 0)
+        self.assertGreaterEqual(beta.stats['resume_piece_kept'], 4)
+        self.assertGreaterEqual(alpha.stats['resume_piece_skip'] - skipped, 4)
+        self.assertEqual(alpha.stats['resume_tx_complete'], 2)
+        self.assertEqual(beta.stats.get('invalid_resume', 0), 0)
+
+        console.terse("\nDedup chunks sent resumable *********\n")
+        alpha.dedupSize = 4096
+        msg = odict(who="Red", data=bloat)
+        alpha.transmit(msg)
+        serviceUntil(stacks, lambda: len(beta.rxMsgs), duration=10.0)
+        self.assertEqual(len(beta.rxMsgs), 1)
+        receivedMsg, source = beta.rxMsgs.popleft()
+        self.assertDictEqual(msg, receivedMsg)
+        self.serviceStacks(stacks)
+        self.assertEqual(alpha.stats['dedup_offer_tx'], 1)
+        self.assertEqual(alpha.stats['dedup_tx_complete'], 1)
+        self.assertEqual(beta.stats['dedup_rx_complete'], 1)
+        self.assertEqual(alpha.stats['resume_tx_complete'], 3)
+        self.assertEqual(beta.stats['resume_rx_complete'], 2)
+        self.assertEqual(len(alpha.txDedups), 0)
+        self.assertEqual(len(alpha.txResumes), 0)
+        alpha.dedupSize = 0
+
+        console.terse("\nResumable message given up sent again whole *********\n")
+        remote = alpha.remotes.values()[0]
+        alpha.ResumeTimeout = 1.0
+        msg = odict(who="Gray", data=bloat[1:])
+        alpha.transmit(msg)
+        serviceUntil(stacks, lambda: alpha.stats.get('resume_tx_failure', 0),
+                     drop=True) # link down
+        self.assertEqual(alpha.stats['resume_tx_failure'], 1)
+        self.assertEqual(alpha.stats['resume_tx_resent'], 1)
+        self.assertEqual(remote.savedCount(), 0) # remote still allowed
+        alpha.ResumeTimeout = stacking.RoadStack.ResumeTimeout
+        for resume in alpha.txResumes.values(): # sent again
+            resume.timer.restart(duration=alpha.ResumeTimeout)
+        serviceUntil(stacks, lambda: len(beta.rxMsgs), duration=10.0)
+        self.assertEqual(len(beta.rxMsgs), 1)
+        receivedMsg, source = beta.rxMsgs.popleft()
+        self.assertDictEqual(msg, receivedMsg)
+        self.serviceStacks(stacks)
+        self.assertEqual(alpha.stats['resume_tx_complete'], 4)
+
+        console.terse("\nResumable message expired while interrupted *********\n")
+        expired = alpha.stats.get('message_expired_beta', 0)
+        msg = odict(who="Gray", data=bloat[2:])
+        alpha.transmit(msg, deadline=1.0)
+        serviceUntil(stacks, lambda: alpha.stats.get('resume_tx_failure', 0) > 1,
+                     drop=True) # link down
+        self.assertEqual(alpha.stats['resume_tx_failure'], 2)
+        self.assertEqual(alpha.stats['resume_tx_resent'], 1) # not sent again
+        self.assertEqual(len(alpha.txResumes), 0)
+        self.assertEqual(remote.savedCount(), 0)
+        self.assertGreater(alpha.stats['message_expired_beta'], expired)
+
+        for stack in stacks:
+            stack.server.close()
+            stack.clearAllKeeps()
+
 
 def runOne(test):
     '''
@@ -1592,6 +2994,21 @@ def runSome():
                 'testMessageDropAllFirst',
                 'testMessageSingleSegmentedDuplicate',
                 'testMessageSegmentedLostAckDuplicate',
+                'testMessageRttEstimate',
+                'testMessageCongestionWindow',
+                'testMessageCoalesce',
+                'testMessageStream',
+                'testMessageInflightQueue',
+                'testMessageReplayFilter',
+                'testMessageDeadline',
+                'testMessageFanout',
+                'testBroadcast',
+                'testPacketSize',
+                'testContainer',
+                'testMessageParity',
+                'testMessageDedup',
+                'testDatagram',
+                'testMessageResume',
             ]
 
     tests.extend(map(BasicTestCase, names))
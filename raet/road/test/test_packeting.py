@@ -101,9 +101,14 @@ class BasicTestCase(unittest.TestCase):
                                             'sn': 0,
                                             'sc': 1,
                                             'ml': 0,
+                                            'mc': 0,
+                                            'pg': 0,
+                                            'dd': 0,
+                                            'rk': 0,
                                             'sf': False,
                                             'af': False,
                                             'bk': 1,
+                                            'zk': 0,
                                             'ck': 0,
                                             'fk': 0,
                                             'fl': 0,
@@ -156,9 +161,14 @@ class BasicTestCase(unittest.TestCase):
                                             'sn': 0,
                                             'sc': 1,
                                             'ml': 0,
+                                            'mc': 0,
+                                            'pg': 0,
+                                            'dd': 0,
+                                            'rk': 0,
                                             'sf': False,
                                             'af': False,
                                             'bk': 3,
+                                            'zk': 0,
                                             'ck': 0,
                                             'fk': 0,
                                             'fl': 0,
@@ -211,9 +221,14 @@ class BasicTestCase(unittest.TestCase):
                                             'sn': 0,
                                             'sc': 1,
                                             'ml': 0,
+                                            'mc': 0,
+                                            'pg': 0,
+                                            'dd': 0,
+                                            'rk': 0,
                                             'sf': False,
                                             'af': False,
                                             'bk': 1,
+                                            'zk': 0,
                                             'ck': 0,
                                             'fk': 0,
                                             'fl': 0,
@@ -266,9 +281,14 @@ class BasicTestCase(unittest.TestCase):
                                             'sn': 0,
                                             'sc': 1,
                                             'ml': 0,
+                                            'mc': 0,
+                                            'pg': 0,
+                                            'dd': 0,
+                                            'rk': 0,
                                             'sf': False,
                                             'af': False,
                                             'bk': 3,
+                                            'zk': 0,
                                             'ck': 0,
                                             'fk': 0,
                                             'fl': 0,
@@ -320,9 +340,14 @@ class BasicTestCase(unittest.TestCase):
                                             'sn': 0,
                                             'sc': 1,
                                             'ml': 0,
+                                            'mc': 0,
+                                            'pg': 0,
+                                            'dd': 0,
+                                            'rk': 0,
                                             'sf': False,
                                             'af': False,
                                             'bk': 2,
+                                            'zk': 0,
                                             'ck': 0,
                                             'fk': 0,
                                             'fl': 0,
@@ -384,15 +409,64 @@ class BasicTestCase(unittest.TestCase):
                                            'sn': 0,
                                            'sc': 2,
                                            'ml': 1200,
+                                           'mc': 0,
+                                           'pg': 0,
+                                           'dd': 0,
+                                           'rk': 0,
                                            'sf': True,
                                            'af': False,
                                            'bk': 2,
+                                           'zk': 0,
                                            'ck': 0,
                                            'fk': 0,
                                            'fl': 0,
                                            'fg': '08'})
         self.assertEquals( tray1.body, stuff)
 
+    def testSelectiveAck(self):
+        '''
+        Test pack unpack of selective ack resend bodies
+        '''
+        console.terse("{0}\n".format(self.testSelectiveAck.__doc__))
+
+        misseds = [3, 4, 5, 9, 17, 18, 60]
+        body, remainders = packeting.packSack(misseds)
+        self.assertEqual(remainders, [])
+        self.assertEqual(body['base'], 3)
+        self.assertEqual(packeting.unpackSack(body), misseds)
+
+        body, remainders = packeting.packSack([])
+        self.assertIs(body, None)
+        self.assertEqual(remainders, [])
+
+        # heavy loss on big message fits thousands of misseds per body
+        misseds = [i for i in range(10000) if i % 10]
+        body, remainders = packeting.packSack(misseds)
+        span = packeting.SACK_MAX_SIZE * 8
+        self.assertEqual(remainders, [m for m in misseds if m >= 1 + span])
+        self.assertEqual(packeting.unpackSack(body), [m for m in misseds if m < 1 + span])
+        decoded = []
+        while misseds:
+            body, misseds = packeting.packSack(misseds)
+            decoded.extend(packeting.unpackSack(body))
+        self.assertEqual(decoded, [i for i in range(10000) if i % 10])
+
+        # full bitmap body fits in one packet with room for crypto coat and foot
+        body, remainders = packeting.packSack(list(range(span)))
+        data = odict(hk=raeting.HeadKind.json.value,
+                     bk=raeting.BodyKind.json.value,
+                     pk=raeting.PcktKind.resend.value,
+                     tk=raeting.TrnsKind.message.value,
+                     se=2, de=3, si=0x7ffffff, ti=0x7ffffff)
+        packet = packeting.TxPacket(embody=body, data=data)
+        packet.pack()
+        self.assertTrue(packet.size + raeting.TailSize.nacl + 16 + raeting.FootSize.nacl
+                        <= raeting.UDP_MAX_PACKET_SIZE)
+
+        for body in [odict(base=0), odict(base=-1, bitmap='AQ=='),
+                     odict(base=0, bitmap='A')]:
+            self.assertRaises(raeting.PacketError, packeting.unpackSack, body)
+
 class StackTestCase(unittest.TestCase):
     '''
     Pack and Parse with stacks
@@ -532,9 +606,14 @@ class StackTestCase(unittest.TestCase):
                                           'sn': 0,
                                           'sc': 2,
                                           'ml': 1200,
+                                          'mc': 0,
+                                          'pg': 0,
+                                          'dd': 0,
+                                          'rk': 0,
                                           'sf': True,
                                           'af': False,
                                           'bk': 2,
+                                          'zk': 0,
                                           'ck': 0,
                                           'fk': 1,
                                           'fl': 64,
@@ -585,9 +664,14 @@ class StackTestCase(unittest.TestCase):
                                           'sn': 0,
                                           'sc': 2,
                                           'ml': 1212,
+                                          'mc': 0,
+                                          'pg': 0,
+                                          'dd': 0,
+                                          'rk': 0,
                                           'sf': True,
                                           'af': False,
                                           'bk': 1,
+                                          'zk': 0,
                                           'ck': 0,
                                           'fk': 1,
                                           'fl': 64,
@@ -650,9 +734,14 @@ class StackTestCase(unittest.TestCase):
                                           'sn': 0,
                                           'sc': 2,
                                           'ml': 1252,
+                                          'mc': 0,
+                                          'pg': 0,
+                                          'dd': 0,
+                                          'rk': 0,
                                           'sf': True,
                                           'af': False,
                                           'bk': 1,
+                                          'zk': 0,
                                           'ck': 1,
                                           'fk': 1,
                                           'fl': 64,
@@ -660,6 +749,181 @@ class StackTestCase(unittest.TestCase):
 
         self.assertEqual( tray1.body, body)
 
+    def testSpill(self):
+        '''
+        Reassembly spill to memory mapped file and in memory budget tests
+        '''
+        console.terse("{0}\n".format(self.testSpill.__doc__))
+
+        body = odict(stuff=str(self.stuff.decode('ISO-8859-1')) * 20)
+        self.data.update(se=2, de=3,
+                    bk=raeting.BodyKind.json.value,
+                    ck=raeting.CoatKind.nacl.value,
+                    fk=raeting.FootKind.nacl.value)
+        tray0 = packeting.TxTray(stack=self.main, data=self.data, body=body)
+        tray0.pack()
+        ml = len(tray0.packed)
+        sc = len(tray0.packets)
+        self.assertGreater(sc, 3)
+
+        # spill above size out of order last segment first
+        self.other.SpillSize = ml
+        tray1 = packeting.RxTray(stack=self.other)
+        packets = list(reversed(tray0.packets))
+        tray1.parse(packets[0])
+        self.assertTrue(tray1.spilled)
+        self.assertEqual(self.other.reassemblySize, 0)
+        self.assertEqual(self.other.stats['reassembly_spill'], 1)
+        for packet in packets[1:] + packets[:3]:  # with duplicates
+            tray1.parse(packet)
+        self.assertTrue(tray1.complete)
+        self.assertFalse(tray1.spilled)  # released
+        self.assertIs(tray1.file, None)
+        self.assertEqual(tray1.data['ml'], ml)
+        self.assertEqual(tray1.body, body)
+
+        # below size in memory
+        self.other.SpillSize = ml + 1
+        tray1 = packeting.RxTray(stack=self.other)
+        tray1.parse(tray0.packets[0])
+        self.assertFalse(tray1.spilled)
+        self.assertEqual(self.other.reassemblySize, ml)
+        for packet in tray0.packets[1:]:
+            tray1.parse(packet)
+        self.assertEqual(tray1.body, body)
+        self.assertEqual(self.other.reassemblySize, 0)
+
+        # budget used up by concurrent reassembly so spills
+        self.other.SpillSize = 0
+        self.other.ReassemblyBudget = ml + ml // 2
+        tray1 = packeting.RxTray(stack=self.other)
+        tray2 = packeting.RxTray(stack=self.other)
+        tray1.parse(tray0.packets[1])
+        tray2.parse(tray0.packets[1])
+        self.assertFalse(tray1.spilled)
+        self.assertTrue(tray2.spilled)
+        self.assertEqual(self.other.reassemblySize, ml)
+        for packet in tray0.packets:
+            tray2.parse(packet)
+        self.assertEqual(tray2.body, body)
+        self.assertEqual(self.other.stats['reassembly_spill'], 2)
+
+        # abandoned reassembly releases its reservation
+        self.assertFalse(tray1.complete)
+        tray1.release()
+        self.assertEqual(self.other.reassemblySize, 0)
+        self.assertEqual(tray1.missing(end=len(tray1.segments)),
+                         [i for i in range(sc) if i != 1])
+
+
+    def testZipBody(self):
+        '''
+        Compressed body kind above threshold tests
+        '''
+        console.terse("{0}\n".format(self.testZipBody.__doc__))
+
+        body = odict(stuff=str(self.stuff.decode('ISO-8859-1')) * 20)
+        self.data.update(se=2, de=3,
+                    bk=raeting.BodyKind.json.value,
+                    ck=raeting.CoatKind.nacl.value,
+                    fk=raeting.FootKind.nacl.value)
+        tray0 = packeting.TxTray(stack=self.main, data=self.data, body=body)
+        tray0.pack()
+        sc = len(tray0.packets)
+        self.assertGreater(sc, 1)
+
+        # compressed into fewer segments
+        self.data.update(zk=raeting.ZipKind.zlib.value)
+        tray0 = packeting.TxTray(stack=self.main, data=self.data, body=body)
+        tray0.pack()
+        self.assertEqual(tray0.data['zk'], raeting.ZipKind.zlib.value)
+        self.assertLess(len(tray0.packets), sc)
+        tray1 = packeting.RxTray(stack=self.other)
+        for packet in tray0.packets:
+            packet = packeting.RxPacket(stack=self.other, packed=packet.packed)
+            packet.parseOuter()
+            tray1.parse(packet)
+        self.assertTrue(tray1.complete)
+        self.assertEqual(tray1.data['zk'], raeting.ZipKind.zlib.value)
+        self.assertEqual(tray1.body, body)
+
+        # below threshold sent uncompressed
+        small = odict(stuff="small")
+        tray0 = packeting.TxTray(stack=self.main, data=self.data, body=small)
+        tray0.pack()
+        self.assertEqual(tray0.data['zk'], raeting.ZipKind.nada.value)
+        packet = packeting.RxPacket(stack=self.other, packed=tray0.packets[0].packed)
+        packet.parseOuter()
+        self.assertEqual(packet.data['zk'], raeting.ZipKind.nada.value)
+        tray1 = packeting.RxTray(stack=self.other)
+        self.assertEqual(tray1.parse(packet), small)
+
+        # corrupt compressed body rejected
+        self.assertRaises(raeting.PacketError,
+                          packeting.unzipBody,
+                          b'not compressed',
+                          raeting.ZipKind.zlib.value)
+        self.assertRaises(raeting.PacketError,
+                          packeting.unzipBody,
+                          packeting.zipBody(b'x' * 1024, raeting.ZipKind.zlib.value),
+                          raeting.ZipKind.zlib.value,
+                          limit=1023)
+
+
+    def testParity(self):
+        '''
+        Xor parity segments rebuild one lost segment per group tests
+        '''
+        console.terse("{0}\n".format(self.testParity.__doc__))
+
+        body = odict(stuff=str(self.stuff.decode('ISO-8859-1')) * 20)
+        self.data.update(se=2, de=3,
+                    bk=raeting.BodyKind.json.value,
+                    ck=raeting.CoatKind.nacl.value,
+                    fk=raeting.FootKind.nacl.value)
+        tray0 = packeting.TxTray(stack=self.main, data=self.data, body=body, parity=3)
+        tray0.pack()
+        sc = tray0.packets[0].data['sc']
+        groups = (sc + 2) // 3
+        self.assertGreater(sc, 4)
+        self.assertEqual(len(tray0.packets), sc + groups)
+        for packet in tray0.packets:
+            self.assertLessEqual(packet.size, raeting.UDP_MAX_PACKET_SIZE)
+            self.assertEqual(packet.data['pg'], 3)
+        self.assertEqual(tray0.packets[-1].data['sn'], sc + groups - 1)
+
+        # one lost segment per group incuding last rebuilt in or out of order
+        losts = list(range(0, sc, 3)) + [sc - 1]
+        for spill in [0, 1]:
+            self.other.SpillSize = spill
+            self.other.clearStats()
+            tray1 = packeting.RxTray(stack=self.other)
+            packets = [packet for packet in tray0.packets
+                       if packet.data['sn'] not in losts]
+            packets = packets[sc // 2:] + packets[:sc // 2]
+            for packet in packets:
+                packet = packeting.RxPacket(stack=self.other, packed=packet.packed)
+                packet.parseOuter()
+                tray1.parse(packet)
+            self.assertTrue(tray1.complete)
+            self.assertEqual(tray1.body, body)
+            self.assertEqual(self.other.stats['parity_rebuild'], groups)
+
+        # two lost segments in group are missed not rebuilt
+        self.other.SpillSize = 0
+        tray1 = packeting.RxTray(stack=self.other)
+        for packet in tray0.packets:
+            if packet.data['sn'] not in [0, 1]:
+                tray1.parse(packet)
+                if packet.data['sn'] == sc - 1:
+                    self.assertTrue(tray1.pending)
+        self.assertFalse(tray1.pending)
+        self.assertFalse(tray1.complete)
+        self.assertEqual(tray1.missing(), [0, 1])
+        for packet in tray0.packets[:1]:
+            tray1.parse(packet)
+        self.assertTrue(tray1.complete)
+        self.assertEqual(tray1.body, body)
 
 def runOneBasic(test):
     '''
@@ -677,6 +941,7 @@ def runOneStack(test):
     suite = unittest.TestSuite([test])
     unittest.TextTestRunner(verbosity=2).run(suite)
 
+
 def runSome():
     """ Unittest runner """
     tests =  []
@@ -685,11 +950,15 @@ def runSome():
              'testBasicRaetJson',
              'testBasicRaetMsgpack',
              'testBasicRaetRaw',
-             'testSegmentation']
+             'testSegmentation',
+             'testSelectiveAck']
     tests.extend(map(BasicTestCase, names))
 
     names = ['testSign',
-             'testEncrypt', ]
+             'testEncrypt',
+             'testSpill',
+             'testZipBody',
+             'testParity', ]
     tests.extend(map(StackTestCase, names))
 
     suite = unittest.TestSuite(tests)
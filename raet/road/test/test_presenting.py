@@ -92,7 +92,10 @@ class BasicTestCase(unittest.TestCase):
                         role=None,
                         kind=None,
                         period=None,
-                        offset=None,):
+                        offset=None,
+                        interim=None,
+                        periodMax=None,
+                        jitter=None,):
         '''
         Creates stack and local estate from data with
         and overrides with parameters
@@ -112,7 +115,10 @@ class BasicTestCase(unittest.TestCase):
                                    kind=kind if kind is not None else data['kind'],
                                    dirpath=data['dirpath'],
                                    period=period,
-                                   offset=offset,)
+                                   offset=offset,
+                                   interim=interim,
+                                   periodMax=periodMax,
+                                   jitter=jitter,)
 
         return stack
 
@@ -1561,6 +1567,75 @@ class BasicTestCase(unittest.TestCase):
             stack.clearAllKeeps()
         time.sleep(0.1)
 
+    def testManageAdaptive(self):
+        '''
+        Test adaptive keep alive backoff, traffic suppression and jitter
+        '''
+        console.terse("{0}\n".format(self.testManageAdaptive.__doc__))
+
+        mainData = self.createRoadData(name='main',
+                                       base=self.base,
+                                       auto=raeting.AutoMode.once.value)
+        keeping.clearAllKeep(mainData['dirpath'])
+        main = self.createRoadStack(data=mainData,
+                                     main=True,
+                                     auto=mainData['auto'],
+                                     ha=None,
+                                     periodMax=4.0,
+                                     jitter=0.5)
+        self.assertIs(main.adaptive, True)
+        self.assertEqual(main.periodMax, 4.0)
+        self.assertEqual(main.jitter, 0.5)
+
+        otherData = self.createRoadData(name='other',
+                                        base=self.base,
+                                        auto=raeting.AutoMode.once.value)
+        keeping.clearAllKeep(otherData['dirpath'])
+        other = self.createRoadStack(data=otherData,
+                                     main=None,
+                                     auto=otherData['auto'],
+                                     ha=("", raeting.RAET_TEST_PORT),
+                                     interim=4.0,
+                                     periodMax=10.0)
+        self.assertEqual(other.periodMax, 2.0) # bounded by half interim
+        self.assertIs(other.adaptive, True)
+        self.assertEqual(other.jitter, 0.0)
+
+        self.join(other, main)
+        self.allow(other, main)
+        remote = main.remotes.values()[0]
+        self.assertIs(remote.alived, True)
+        self.assertEqual(remote.period, main.period)
+
+        console.terse("\nBackoff stable remote *********\n")
+        for period in [2.0, 4.0, 4.0]:
+            self.alive(main, other)
+            for stack in [main, other]:
+                self.assertEqual(len(stack.transactions), 0)
+            self.assertIs(remote.alived, True)
+            self.assertEqual(remote.period, period)
+            self.assertTrue(period / 2.0 <= remote.timer.duration <= period)
+        self.assertEqual(main.stats['alive_backoff'], 2)
+
+        console.terse("\nTraffic suppresses keep alive *********\n")
+        self.store.advanceStamp(remote.timer.duration - 0.5)
+        self.assertFalse(remote.timer.expired)
+        self.message([odict(content="Hello main")], other, main)
+        self.assertEqual(len(main.rxMsgs), 1)
+        self.assertTrue(main.stats['alive_traffic_refresh'] >= 1)
+        self.assertTrue(remote.timer.remaining > 1.0)
+        main.manage()
+        self.assertEqual(len(main.transactions), 0) # no alive started
+
+        console.terse("\nDead remote resets period *********\n")
+        remote.refresh(alived=False)
+        self.assertEqual(remote.period, main.period)
+
+        for stack in [main, other]:
+            stack.server.close()
+            stack.clearAllKeeps()
+        time.sleep(0.1)
+
     def testManageBothSides(self):
         '''
         Test stack manage remotes main and others
@@ -4622,6 +4697,7 @@ def runSome():
                 'testCascadeBoth',
                 'testManageOneSide',
                 'testManageBothSides',
+                'testManageAdaptive',
                 'testManageMainRebootCascade',
                 'testManageRebootCascadeBothSides',
                 'testManageRebootCascadeBothSidesAlt',
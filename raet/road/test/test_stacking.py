@@ -27,7 +27,8 @@ console = getConsole()
 # Import raet libs
 from raet.abiding import *  # import globals
 from raet import raeting, nacling
-from raet.road import keeping, estating, stacking, transacting
+from raet.road import (keeping, estating, stacking, transacting, packeting, limiting,
+                       scheduling)
 
 if sys.platform == 'win32':
     TEMPDIR = 'c:/temp'
@@ -327,6 +328,33 @@ class BasicTestCase(unittest.TestCase):
             console.terse("Estate '{0}' rxed:\n'{1}'\n".format(self.other.local.name, duple))
             self.assertDictEqual(mains[i], duple[0])
 
+    def craft(self, sender, receiver, sa=None, **kwa):
+        '''
+        Utility method to queue signed packet from sender on receiver .rxes
+        Packet header fields default to a valid message packet and are
+        overridden by kwa
+        sa is source address of packet, None means sender local ha
+        '''
+        sendee = sender.remotes.values()[0]
+        data = odict(hk=sender.Hk,
+                     bk=sender.Bk,
+                     fk=raeting.FootKind.nacl.value,
+                     ck=raeting.CoatKind.nada.value,
+                     se=sendee.nuid,
+                     de=sendee.fuid,
+                     si=sendee.sid,
+                     ti=sendee.nextTid(),
+                     tk=raeting.TrnsKind.message.value,
+                     cf=False,
+                     bf=False)
+        data.update(kwa)
+        packet = packeting.TxPacket(stack=sender,
+                                    kind=data.pop('pk', raeting.PcktKind.message.value),
+                                    embody=odict(),
+                                    data=data)
+        packet.pack()
+        receiver.rxes.append((packet.packed, sa or sender.local.ha))
+
     def testBootstrapJson(self):
         '''
         Test join allow message transactions with JSON Serialization of body
@@ -750,6 +778,240 @@ class BasicTestCase(unittest.TestCase):
         remote = self.other.remotes.values()[0]
         self.assertTrue(remote.alived)
 
+    def testTxScheduler(self):
+        '''
+        Test transmit scheduler serves control first then destinations fairly
+        '''
+        console.terse("{0}\n".format(self.testTxScheduler.__doc__))
+
+        self.join()
+        self.allow()
+        stack = self.other
+        remote = stack.remotes.values()[0]
+        mainHa = remote.ha
+        fakeHa = ('127.0.0.1', raeting.RAET_TEST_PORT + 11)
+        self.assertEqual(len(stack.txes), 0)
+        self.assertFalse(stack.txes)
+
+        for i in range(4):
+            stack.tx(b'm' * 1000, remote.uid)
+        for i in range(4):
+            stack.txes.append((b'f' * 500, fakeHa))
+        stack.tx(b'c' * 10, remote.uid, control=True)
+        self.assertEqual(len(stack.txes), 9)
+        self.assertEqual(stack.txes.depth(mainHa), 5)
+        self.assertEqual(stack.txes.depth(fakeHa), 4)
+
+        duples = [stack.txes.popleft() for i in range(9)]
+        self.assertEqual(duples[0], (b'c' * 10, mainHa))
+        self.assertEqual([ta for tx, ta in duples[1:]],
+                         [mainHa, fakeHa, fakeHa, mainHa, fakeHa, fakeHa,
+                          mainHa, mainHa])
+        self.assertEqual(len(stack.txes), 0)
+        self.assertRaises(IndexError, stack.txes.popleft)
+
+        # blocked destination is skipped and its packet keeps its place
+        for tx, ta in duples[1:]:
+            stack.txes.append((tx, ta))
+        tx, ta = stack.txes.popleft(skips=[mainHa])
+        self.assertEqual(ta, fakeHa)
+        stack.txes.pushback((tx, ta))
+        self.assertEqual(stack.txes.depth(fakeHa), 4)
+        self.assertFalse(stack.txes.ready(skips=[mainHa, fakeHa]))
+        self.assertEqual(stack.txes.popleft(), (tx, ta)) # kept its turn
+        stack.txes.pushback((tx, ta))
+
+        # pushed back packet keeps its deficit credit
+        txes = scheduling.TxScheduler(store=self.store, quantum=1000)
+        for ha in [mainHa, mainHa, fakeHa]:
+            txes.append((b'p' * 600, ha))
+        duple = txes.popleft()
+        self.assertEqual(duple[1], mainHa)
+        txes.pushback(duple)
+        self.assertEqual([txes.popleft()[1] for i in range(3)],
+                         [mainHa, fakeHa, mainHa])
+
+        self.store.advanceStamp(0.5)
+        stack.serviceTxes()
+        self.assertEqual(len(stack.txes), 0)
+        self.assertEqual(stack.stats['tx_depth_{0}'.format(remote.name)], 0)
+        self.assertEqual(stack.stats['tx_sojourn_{0}'.format(remote.name)], 0.5)
+        self.assertNotIn('tx_sojourn_127.0.0.1:{0}'.format(fakeHa[1]), stack.stats)
+        stack.removeRemote(remote)
+        self.assertNotIn('tx_depth_{0}'.format(remote.name), stack.stats)
+        self.assertNotIn('tx_sojourn_{0}'.format(remote.name), stack.stats)
+
+    def testScreenBeforeVerify(self):
+        '''
+        Test unroutable packets rejected before signature verification
+        '''
+        console.terse("{0}\n".format(self.testScreenBeforeVerify.__doc__))
+
+        self.join()
+        self.allow()
+        sender = self.other
+        receiver = self.main
+        remote = receiver.remotes.values()[0]
+        verifies = []
+        verify = remote.verfer.verify
+        def countVerify(signature, msg):
+            verifies.append(msg)
+            return verify(signature, msg)
+        remote.verfer.verify = countVerify
+        receiver.clearStats()
+
+        stale = (remote.rsid + 0x80000000) % 0x100000000
+        self.craft(sender, receiver, bf=True, tk=raeting.TrnsKind.alive.value)
+        self.craft(sender, receiver, si=0)
+        self.craft(sender, receiver, de=0)
+        self.craft(sender, receiver, de=99)
+        self.craft(sender, receiver, si=stale, pk=raeting.PcktKind.nack.value)
+        self.craft(sender, receiver, cf=True, pk=raeting.PcktKind.nack.value)
+        receiver.rxes.append((b'ri RAET\ngarbage', sender.local.ha))
+        receiver.serviceRxes()
+        self.assertEqual(len(verifies), 0)
+        self.assertEqual(receiver.stats['rx_reject_route'], 6)
+        self.assertEqual(receiver.stats['rx_reject_head'], 1)
+        self.assertEqual(receiver.stats['broadcast_invalid'], 1)
+        self.assertEqual(receiver.stats['invalid_sid'], 1)
+        self.assertEqual(receiver.stats['invalid_uid'], 1)
+        self.assertEqual(receiver.stats['unknown_destination_uid'], 1)
+        self.assertEqual(receiver.stats['stale_nack_drop'], 2)
+        self.assertEqual(receiver.stats['stale_sid'], 1)
+
+        # routable stale packet is verified before it is nacked
+        self.craft(sender, receiver, si=stale)
+        receiver.serviceRxes()
+        self.assertEqual(len(verifies), 1)
+        self.assertEqual(receiver.stats['rx_reject_route'], 6)
+        self.assertEqual(receiver.stats['stale_sid'], 2)
+        self.assertNotIn('rx_reject_verify', receiver.stats)
+
+        # routable packet with bad signature fails verification
+        self.craft(sender, receiver, )
+        raw, sa = receiver.rxes.pop()
+        receiver.rxes.append((raw[:-1] + chr(ord(raw[-1]) ^ 0x01), sa))
+        receiver.serviceRxes()
+        self.assertEqual(len(verifies), 2)
+        self.assertEqual(receiver.stats['rx_reject_verify'], 1)
+        self.service()
+
+    def testRxRateLimit(self):
+        '''
+        Test receive rate limits per source and per remote and stale reply cap
+        '''
+        console.terse("{0}\n".format(self.testRxRateLimit.__doc__))
+
+        self.join()
+        self.allow()
+        sender = self.other
+        receiver = self.main
+        remote = receiver.remotes.values()[0]
+        receiver.clearStats()
+
+        console.terse("\nSource over limit dropped before parsing *********\n")
+        receiver.rxRate = 5.0
+        receiver.rxBurst = 3
+        flooder = ('127.0.0.1', raeting.RAET_TEST_PORT + 11)
+        for i in range(10):
+            receiver.rxes.append((b'garbage', flooder))
+        receiver.serviceRxes()
+        self.assertEqual(receiver.stats['rx_reject_head'], 3)
+        self.assertEqual(receiver.stats['rx_limit_source'], 7)
+        self.assertEqual(receiver.stats['rx_reject_limit'], 7)
+        self.craft(sender, receiver)  # other source has own bucket
+        receiver.serviceRxes()
+        self.assertEqual(receiver.stats['rx_limit_source'], 7)
+        self.store.advanceStamp(0.3)  # refills one and a half tokens
+        for i in range(2):
+            receiver.rxes.append((b'garbage', flooder))
+        receiver.serviceRxes()
+        self.assertEqual(receiver.stats['rx_reject_head'], 4)
+        self.assertEqual(receiver.stats['rx_limit_source'], 8)
+        self.assertEqual(len(receiver.rxBuckets), 2)
+        receiver.rxRate = 0.0
+        buckets = limiting.BucketMap(store=self.store, rate=1.0, limit=2)
+        sources = [('127.0.0.1', raeting.RAET_TEST_PORT + i) for i in range(12, 15)]
+        buckets.take(sources[0])
+        self.assertTrue(buckets.take(sources[1]))
+        self.assertFalse(buckets.take(sources[0])) # flooder used recently
+        buckets.take(sources[2])
+        self.assertEqual(buckets.buckets.keys(), [sources[0], sources[2]])
+        self.assertFalse(buckets.take(sources[0])) # flooder not forgotten
+
+        console.terse("\nRemote over limit dropped before verify *********\n")
+        receiver.remoteRxRate = 2.0
+        receiver.remoteRxBurst = 2
+        stale = (remote.rsid + 0x80000000) % 0x100000000
+        for i in range(4):
+            self.craft(sender, receiver, si=stale)
+        receiver.serviceRxes()
+        self.assertEqual(receiver.stats['rx_limit_remote'], 2)
+        self.assertEqual(receiver.stats['rx_limit_{0}'.format(remote.name)], 2)
+        self.assertEqual(receiver.stats['stale_sid'], 2)
+        self.store.advanceStamp(1.0)  # refills bucket
+        forger = ('127.0.0.1', raeting.RAET_TEST_PORT + 16)
+        for i in range(4):  # forged de from other source not charged to remote
+            self.craft(sender, receiver, sa=forger, si=stale)
+        self.craft(sender, receiver, si=stale)  # real traffic still accepted
+        receiver.serviceRxes()
+        self.assertEqual(receiver.stats['rx_limit_remote'], 2)
+        self.assertEqual(receiver.stats['stale_sid'], 7)
+        receiver.remoteRxRate = 0.0
+
+        console.terse("\nStale replies capped *********\n")
+        receiver.staleRate = 1.0
+        for i in range(3):
+            self.craft(sender, receiver, si=stale)
+        receiver.serviceRxes()
+        self.assertEqual(receiver.stats['stale_sid'], 10)
+        self.assertEqual(receiver.stats['stale_reply_limit'], 2)
+        receiver.staleRate = 0.0
+        receiver.serviceTxes()
+        self.service()
+
+    def testStaleSuppress(self):
+        '''
+        Test repeated stale packets of same transaction get only one reply
+        '''
+        console.terse("{0}\n".format(self.testStaleSuppress.__doc__))
+
+        self.join()
+        self.allow()
+        sender = self.other
+        receiver = self.main
+        remote = receiver.remotes.values()[0]
+        receiver.clearStats()
+        receiver.StaleSuppress = 1.0
+
+        stale = (remote.rsid + 0x80000000) % 0x100000000
+        for i in range(3):  # retransmits of old transaction
+            self.craft(sender, receiver, si=stale, ti=7)
+        self.craft(sender, receiver, si=stale, ti=8)
+        receiver.serviceRxes()
+        self.assertEqual(receiver.stats['stale_sid'], 4)
+        self.assertEqual(receiver.stats['stale_initiator_nack'], 2)
+        self.assertEqual(receiver.stats['stale_reply_suppressed'], 2)
+        self.assertEqual(len(receiver.staleReplies), 2)
+
+        self.store.advanceStamp(1.0)  # suppression expired
+        self.craft(sender, receiver, si=stale, ti=7)
+        receiver.serviceRxes()
+        self.assertEqual(receiver.stats['stale_initiator_nack'], 3)
+        self.assertEqual(receiver.stats['stale_reply_suppressed'], 2)
+        self.assertEqual(len(receiver.staleReplies), 1)
+
+        receiver.StaleSuppressSize = 2  # oldest forgotten at cap
+        for ti in [9, 10]:
+            self.craft(sender, receiver, si=stale, ti=ti)
+        receiver.serviceRxes()
+        self.assertEqual(receiver.stats['stale_initiator_nack'], 5)
+        self.assertEqual([key[2] for key in receiver.staleReplies], [9, 10])
+        receiver.StaleSuppress = 0.0
+        receiver.serviceTxes()
+        self.service()
+
+
 def runOne(test):
     '''
     Unittest Runner
@@ -773,6 +1035,10 @@ def runSome():
              'testBasicAlive',
              'testStaleNack',
              'testJoinForever',
+             'testTxScheduler',
+             'testScreenBeforeVerify',
+             'testRxRateLimit',
+             'testStaleSuppress',
             ]
     tests.extend(map(BasicTestCase, names))
 
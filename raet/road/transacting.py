@@ -7,8 +7,10 @@ stacking.py raet protocol stacking classes
 
 # Import python libs
 import socket
+import random
 import binascii
 import struct
+from collections import Mapping
 
 try:
     import simplejson as json
@@ -63,6 +65,7 @@ class Transaction(object):
         self.txData = txData or odict() # data used to prepare last txPacket
         self.txPacket = txPacket  # last tx packet needed for retries
         self.rxPacket = rxPacket  # last rx packet needed for index
+        self.rttStamp = None  # tx stamp of unretransmitted packet for rtt sample
 
     @property
     def index(self):
@@ -75,6 +78,40 @@ class Transaction(object):
         re = self.remote.fuid
         return ((self.rmt, le, re, self.sid, self.tid, self.bcst,))
 
+    def redoTimeouts(self, redoTimeoutMin=None, redoTimeoutMax=None):
+        '''
+        Returns duple (min, max,) of redo timeouts
+        Explicit values take precedence. Otherwise when .remote has an estimated
+        retransmission timeout, rto, from round trip samples use rto as min
+        and stretch max to at least twice rto. Otherwise use class defaults
+        '''
+        timeoutMin = redoTimeoutMin or self.RedoTimeoutMin
+        timeoutMax = redoTimeoutMax or self.RedoTimeoutMax
+        rto = getattr(self.remote, 'rto', None)
+        if rto is not None:
+            if not redoTimeoutMin:
+                timeoutMin = rto
+            if not redoTimeoutMax:
+                timeoutMax = max(timeoutMax, 2.0 * rto)
+        return (timeoutMin, timeoutMax)
+
+    def stampRtt(self):
+        '''
+        Start round trip time measurement from now
+        '''
+        self.rttStamp = self.stack.store.stamp
+
+    def sampleRtt(self):
+        '''
+        Update round trip time estimate of .remote from response to stamped packet
+        Per Karn's algorithm no sample is taken once a packet has been
+        retransmitted since the response is ambiguous so .rttStamp is cleared
+        on retransmission
+        '''
+        if self.rttStamp is not None and self.remote:
+            self.remote.sampleRtt(self.stack.store.stamp - self.rttStamp)
+        self.rttStamp = None
+
     def process(self):
         '''
         Process time based handling of transaction like timeout or retries
@@ -91,8 +128,16 @@ class Transaction(object):
         '''
         Queue tx duple on stack transmit queue
         '''
+        control = (packet.data['pk'] != PcktKind.message)
+        contain = None
+        if (control and packet.data['tk'] != TrnsKind.join and
+                not packet.data['bf']):
+            contain = packet.foot.size # may share signed container packet
         try:
-            self.stack.tx(packet.packed, self.remote.uid)
+            self.stack.tx(packet.packed,
+                          self.remote.uid,
+                          control=control,
+                          contain=contain)
         except raeting.StackError as ex:
             console.terse(str(ex) + '\n')
             self.stack.incStat(self.statKey())
@@ -249,7 +294,7 @@ class Staler(Initiator):
             self.stack.incStat("packing_error")
             return
 
-        self.stack.txes.append((packet.packed, ha))
+        self.stack.txes.append((packet.packed, ha), control=True)
         console.terse("Staler '{0}'. Do Nack of stale correspondent {1} in {2} at {3}\n".format(
                 self.stack.name, ha, self.tid, self.stack.store.stamp))
         self.stack.incStat('stale_correspondent_nack')
@@ -350,7 +395,7 @@ class Stalent(Correspondent):
                                        self.stack.store.stamp))
             kind == PcktKind.nack
 
-        self.stack.txes.append((packet.packed, ha))
+        self.stack.txes.append((packet.packed, ha), control=True)
         self.stack.incStat('stale_initiator_nack')
 
 class Joiner(Initiator):
@@ -379,8 +424,8 @@ class Joiner(Initiator):
 
         self.cascade = cascade
 
-        self.redoTimeoutMax = redoTimeoutMax or self.RedoTimeoutMax
-        self.redoTimeoutMin = redoTimeoutMin or self.RedoTimeoutMin
+        self.redoTimeoutMin, self.redoTimeoutMax = self.redoTimeouts(redoTimeoutMin,
+                                                                     redoTimeoutMax)
         self.redoTimer = aiding.StoreTimer(self.stack.store,
                                            duration=self.redoTimeoutMin)
         self.pendRedoTimeout = pendRedoTimeout or self.PendRedoTimeout
@@ -544,6 +589,8 @@ class Joiner(Initiator):
                       ('pubhex', str(self.stack.local.priver.pubhex.decode('ISO-8859-1'))
                                if    self.stack.local.priver.pubhex else None),
                       ('role', self.stack.local.role)])
+        if self.stack.packetSize: # offer max packet size
+            body['ps'] = self.stack.packetSize
         packet = packeting.TxPacket(stack=self.stack,
                                     kind=PcktKind.request.value,
                                     embody=body,
@@ -663,6 +710,8 @@ class Joiner(Initiator):
             self.remove(index=self.txPacket.index)
             return
 
+        self.offer = body.get('ps') # max packet size offered by remote if any
+
         rha = (data['sh'], data['sp'])
         reid = data['se']
         leid = data['de']
@@ -808,7 +857,9 @@ class Joiner(Initiator):
             self.remote.replaceStaleInitiators() # this join not stale since sid == 0
         if self.vacuous:
             self.remote.rsid = 0 # reset .rsid on vacuous join so allow will work
+            self.remote.doneTids.clear() # remote tids may start over
         self.remote.joined = True #accepted
+        self.stack.agreePacketSize(self.remote, self.offer)
         self.stack.dumpRemote(self.remote)
         self.stack.dumpLocal() #persist puid
         self.ackAccept()
@@ -923,12 +974,13 @@ class Joinent(Correspondent):
         kwa['kind'] = TrnsKind.join.value
         super(Joinent, self).__init__(**kwa)
 
-        self.redoTimeoutMax = redoTimeoutMax or self.RedoTimeoutMax
-        self.redoTimeoutMin = redoTimeoutMin or self.RedoTimeoutMin
+        self.redoTimeoutMin, self.redoTimeoutMax = self.redoTimeouts(redoTimeoutMin,
+                                                                     redoTimeoutMax)
         self.redoTimer = aiding.StoreTimer(self.stack.store, duration=0.0)
         self.pendRedoTimeout = pendRedoTimeout or self.PendRedoTimeout
         self.vacuous = None # gets set in join method
         self.pended = False # Farside initiator has pended remote acceptance
+        self.offer = None # max packet size offered by remote in join
         self.prep()
 
     def transmit(self, packet):
@@ -1118,6 +1170,8 @@ class Joinent(Correspondent):
             self.remove(index=self.rxPacket.index)
             return
 
+        self.offer = body.get('ps') # max packet size offered by remote if any
+
         rha = (data['sh'], data['sp'])
         reid = data['se']
         leid = data['de']
@@ -1380,6 +1434,8 @@ class Joinent(Correspondent):
                        ('pubhex', str(self.stack.local.priver.pubhex.decode('ISO-8859-1'))
                                   if self.stack.local.priver.pubhex else None),
                        ('role', self.stack.local.role)])
+        if self.stack.packetSize: # offer max packet size
+            body['ps'] = self.stack.packetSize
         packet = packeting.TxPacket(stack=self.stack,
                                     kind=PcktKind.response.value,
                                     embody=body,
@@ -1391,6 +1447,7 @@ class Joinent(Correspondent):
             self.stack.incStat("packing_error")
             self.remove(index=self.rxPacket.index)
             return
+        self.stack.agreePacketSize(self.remote, self.offer)
 
         console.concise("Joinent {0}. Do Accept of {1} in {2} at {3}\n".format(
                 self.stack.name, self.remote.name, self.tid, self.stack.store.stamp))
@@ -1420,6 +1477,7 @@ class Joinent(Correspondent):
             self.remote.replaceStaleInitiators()
         if self.vacuous:
             self.remote.rsid = 0 # reset .rsid on vacuous join so allow will work
+            self.remote.doneTids.clear() # remote tids may start over
         self.remote.joined = True # accepted
         self.stack.dumpRemote(self.remote)
         self.stack.dumpLocal() # persist puid
@@ -1499,7 +1557,7 @@ class Joinent(Correspondent):
 
         self.stack.incStat(self.statKey())
 
-        self.stack.txes.append((packet.packed, ha))
+        self.stack.txes.append((packet.packed, ha), control=True)
         self.remove(index=self.rxPacket.index)
 
 class Allower(Initiator):
@@ -1521,8 +1579,8 @@ class Allower(Initiator):
 
         self.cascade = cascade
 
-        self.redoTimeoutMax = redoTimeoutMax or self.RedoTimeoutMax
-        self.redoTimeoutMin = redoTimeoutMin or self.RedoTimeoutMin
+        self.redoTimeoutMin, self.redoTimeoutMax = self.redoTimeouts(redoTimeoutMin,
+                                                                     redoTimeoutMax)
         self.redoTimer = aiding.StoreTimer(self.stack.store,
                                            duration=self.redoTimeoutMin)
 
@@ -1772,6 +1830,7 @@ class Allower(Initiator):
 
         self.remote.allowed = True
         self.remote.alived = True  # fast alive as soon as allowed
+        self.remote.doneTids.clear() # restarted remote tids start over
         self.ackFinal()
 
     def ackFinal(self):
@@ -1903,8 +1962,8 @@ class Allowent(Correspondent):
         kwa['kind'] = TrnsKind.allow.value
         super(Allowent, self).__init__(**kwa)
 
-        self.redoTimeoutMax = redoTimeoutMax or self.RedoTimeoutMax
-        self.redoTimeoutMin = redoTimeoutMin or self.RedoTimeoutMin
+        self.redoTimeoutMin, self.redoTimeoutMax = self.redoTimeouts(redoTimeoutMin,
+                                                                     redoTimeoutMax)
         self.redoTimer = aiding.StoreTimer(self.stack.store,
                                            duration=self.redoTimeoutMin)
 
@@ -2225,6 +2284,7 @@ class Allowent(Correspondent):
         '''
         self.remote.allowed = True
         self.remote.alived = True  # Fast alived as soon as allowed
+        self.remote.doneTids.clear() # restarted remote tids start over
         self.remote.nextSid() # start new session always on successful allow
         self.remote.replaceStaleInitiators()
         self.stack.dumpRemote(self.remote)
@@ -2327,17 +2387,20 @@ class Aliver(Initiator):
     RedoTimeoutMax = 1.0 # max timeout
 
     def __init__(self, redoTimeoutMin=None, redoTimeoutMax=None,
-                cascade=False, **kwa):
+                cascade=False, probe=0, **kwa):
         '''
         Setup instance
+        probe is packet size in bytes the alive is padded to so it probes
+        whether packets of that size get through to the remote
         '''
         kwa['kind'] = TrnsKind.alive.value
         super(Aliver, self).__init__(**kwa)
 
         self.cascade = cascade
+        self.probe = probe
 
-        self.redoTimeoutMax = redoTimeoutMax or self.RedoTimeoutMax
-        self.redoTimeoutMin = redoTimeoutMin or self.RedoTimeoutMin
+        self.redoTimeoutMin, self.redoTimeoutMax = self.redoTimeouts(redoTimeoutMin,
+                                                                     redoTimeoutMax)
         self.redoTimer = aiding.StoreTimer(self.stack.store,
                                            duration=self.redoTimeoutMin)
 
@@ -2380,6 +2443,9 @@ class Aliver(Initiator):
             console.concise("Aliver {0}. Timed out with {1} in {2} at {3}\n".format(
                 self.stack.name, self.remote.name, self.tid, self.stack.store.stamp))
             self.remove()
+            if self.probe:
+                self.failProbe()
+                return
             self.remote.refresh(alived=False) # mark as dead
             return
 
@@ -2392,6 +2458,7 @@ class Aliver(Initiator):
             self.redoTimer.restart(duration=duration)
             if self.txPacket:
                 if self.txPacket.data['pk'] == PcktKind.request:
+                    self.rttStamp = None  # Karn's algorithm
                     self.transmit(self.txPacket) # redo
                     console.concise("Aliver {0}. Redo with {1} in {2} at {3}\n".format(
                         self.stack.name, self.remote.name, self.tid, self.stack.store.stamp))
@@ -2440,8 +2507,21 @@ class Aliver(Initiator):
         packet = packeting.TxPacket(stack=self.stack,
                                     kind=PcktKind.request.value,
                                     embody=body,
-                                    data=self.txData)
+                                    data=self.txData,
+                                    limit=self.probe)
         try:
+            if self.probe: # pad body until packet is probe size
+                body['pad'] = ''
+                for i in range(3): # head length fields may grow with padding
+                    packet.prepack()
+                    if packet.size == self.probe:
+                        break
+                    body['pad'] = 'x' * max(0, len(body['pad']) + self.probe - packet.size)
+                    packet = packeting.TxPacket(stack=self.stack,
+                                                kind=PcktKind.request.value,
+                                                embody=body,
+                                                data=self.txData,
+                                                limit=self.probe)
             packet.pack()
         except raeting.PacketError as ex:
             console.terse(str(ex) + '\n')
@@ -2449,6 +2529,7 @@ class Aliver(Initiator):
             self.remove()
             return
         self.transmit(packet)
+        self.stampRtt()
         console.concise("Aliver {0}. Do Alive with {1} in {2} at {3}\n".format(
                 self.stack.name, self.remote.name, self.tid, self.stack.store.stamp))
 
@@ -2458,11 +2539,33 @@ class Aliver(Initiator):
         '''
         if not self.stack.parseInner(self.rxPacket):
             return
+        self.sampleRtt()
+        if self.remote.alived:  # stable so stretch keep alive period
+            self.remote.backoff()
         self.remote.refresh(alived=True) # restart timer mark as alive
         self.remove()
         console.concise("Aliver {0}. Done with {1} in {2} at {3}\n".format(
                 self.stack.name, self.remote.name, self.tid, self.stack.store.stamp))
         self.stack.incStat("alive_complete")
+        if self.probe and self.probe == self.remote.probeSize:
+            self.remote.packetSize = self.probe
+            self.remote.probeSize = 0
+            console.concise("Aliver {0}. Probed packet size {1} with {2} at {3}\n".format(
+                self.stack.name, self.probe, self.remote.name, self.stack.store.stamp))
+            self.stack.incStat("packet_probe_complete")
+
+    def failProbe(self):
+        '''
+        Probe of packet size timed out so probe halfway down to the default
+        next time or give up on larger packets when close to the default
+        '''
+        if self.probe != self.remote.probeSize: # stale probe
+            return
+        size = (self.probe + raeting.UDP_MAX_PACKET_SIZE) // 2
+        self.remote.probeSize = size if (size - raeting.UDP_MAX_PACKET_SIZE) >= 64 else 0
+        console.concise("Aliver {0}. Failed probe of packet size {1} with {2} at {3}\n".format(
+            self.stack.name, self.probe, self.remote.name, self.stack.store.stamp))
+        self.stack.incStat("packet_probe_failure")
 
     def refuse(self):
         '''
@@ -2680,26 +2783,42 @@ class Messenger(Initiator):
     RedoTimeoutMin = 0.2 # initial timeout
     RedoTimeoutMax = 0.5 # max timeout
 
-    def __init__(self, redoTimeoutMin=None, redoTimeoutMax=None, burst=0, **kwa):
+    def __init__(self, redoTimeoutMin=None, redoTimeoutMax=None, burst=0,
+                 stream=None, expiry=None, **kwa):
         '''
         Setup instance
+        stream is TxStream to notify when message is a stream chunk
+        expiry is stamp when message is abandoned, None means never
         '''
         kwa['kind'] = TrnsKind.message.value
         super(Messenger, self).__init__(**kwa)
+        self.stream = stream
+        self.expiry = expiry
+        self.completed = False
 
-        self.redoTimeoutMax = redoTimeoutMax or self.RedoTimeoutMax
-        self.redoTimeoutMin = redoTimeoutMin or self.RedoTimeoutMin
+        self.redoTimeoutMin, self.redoTimeoutMax = self.redoTimeouts(redoTimeoutMin,
+                                                                     redoTimeoutMax)
         self.redoTimer = aiding.StoreTimer(self.stack.store,
                                            duration=self.redoTimeoutMin)
 
         self.burst = max(0, int(burst)) # BurstSize
         self.misseds = oset()  # ordered set of currently missed segments
         self.acked = False  # Have received at least one ack
+        self.ackedSn = -1  # highest segment number of acks acted on
+        self.windowStart = 0  # first segment of current window
+        self.windowEnd = 0  # one past last segment of current window
+        self.paceStamp = None  # stamp when pacing tokens last updated
+        self.paceTokens = 0.0  # segments that pacing allows to send now
+        self.reported = set()  # segments reported missed by resend requests
+        self.resent = set()  # segments resent since last resend request
 
         self.sid = self.remote.sid
         self.tid = self.remote.nextTid()
         self.prep() # prepare .txData
-        self.tray = packeting.TxTray(stack=self.stack)
+        parity = self.remote.parityGroup
+        self.tray = packeting.TxTray(stack=self.stack,
+                                     parity=(parity if parity is not None
+                                                    else self.stack.parityGroup))
 
     def transmit(self, packet):
         '''
@@ -2717,10 +2836,12 @@ class Messenger(Initiator):
         if packet.data['tk'] == TrnsKind.message:
             if packet.data['pk'] == PcktKind.ack: # more
                 self.acked = True
-                self.another()  # continue message
+                if not self.expired():
+                    self.another()  # continue message
             elif packet.data['pk'] == PcktKind.resend:  # resend
                 self.acked = True
-                self.resend()  # resend missed segments
+                if not self.expired():
+                    self.resend()  # resend missed segments
             elif packet.data['pk'] == PcktKind.done:  # completed
                 self.acked = True
                 self.complete()
@@ -2737,6 +2858,13 @@ class Messenger(Initiator):
                     self.stack.name, self.remote.name, self.tid, self.stack.store.stamp))
             return
 
+        if self.expired():
+            return
+
+        if self.tray.current < self.windowEnd:  # paced window not all sent yet
+            self.message()
+            return
+
         # keep sending message  until completed or timed out
         if self.redoTimer.expired:
             duration = min(
@@ -2749,6 +2877,8 @@ class Messenger(Initiator):
                     if self.acked and not self.txPacket.data['af']:  # turn on AgnFlag if not set
                         self.txPacket.data.update(af=True)
                         self.txPacket.repack()
+                    self.rttStamp = None  # Karn's algorithm
+                    self.remote.shrinkWindow(timeout=True)
                     self.transmit(self.txPacket) # redo
                     console.concise("Messenger {0}. Redo Segment {1} with "
                                     "{2} in {3} at {4}\n".format(
@@ -2759,6 +2889,18 @@ class Messenger(Initiator):
                                     self.stack.store.stamp))
                     self.stack.incStat('redo_segment')
 
+    def expired(self):
+        '''
+        Returns True if message deadline has passed so abandons message
+        without sending any more segments
+        '''
+        if not self.stack.expire(self.expiry, remote=self.remote):
+            return False
+        self.remove()
+        console.concise("Messenger {0}. Expired with {1} in {2} at {3}\n".format(
+                self.stack.name, self.remote.name, self.tid, self.stack.store.stamp))
+        return True
+
     def prep(self):
         '''
         Prepare .txData
@@ -2818,11 +2960,20 @@ class Messenger(Initiator):
             self.remove()
             return
 
-        burst = (min(self.burst, (len(self.tray.packets) - self.tray.current))
-                    if self.burst else (len(self.tray.packets) - self.tray.current))
+        if self.tray.current >= self.windowEnd:  # start new window
+            window = self.window()
+            burst = (min(window, (len(self.tray.packets) - self.tray.current))
+                        if window else (len(self.tray.packets) - self.tray.current))
+            self.windowStart = self.tray.current
+            self.windowEnd = self.tray.current + burst
 
-        packets = self.tray.packets[self.tray.current:self.tray.current + burst]
-        if packets:
+        count = self.paced(self.windowEnd - self.tray.current)
+        packets = self.tray.packets[self.tray.current:self.tray.current + count]
+        for packet in packets:
+            if packet.data['wf']:  # clear wait flag left from earlier burst
+                packet.data.update(wf=False)
+                packet.repack()
+        if packets and self.tray.current + count == self.windowEnd:
             last = packets[-1]
             last.data.update(wf=True)  # set wait flag on last packet in burst
             last.repack()
@@ -2834,15 +2985,73 @@ class Messenger(Initiator):
             self.stack.incStat("message_segment_tx")
             console.concise("Messenger {0}. Do Message Segment {1} with {2} in {3} at {4}\n".format(
                     self.stack.name, self.tray.last, self.remote.name, self.tid, self.stack.store.stamp))
+        if packets and self.tray.current == self.windowEnd:
+            self.stampRtt()  # time until ack of wait flagged last packet
+
+    def remove(self, remote=None, index=None):
+        '''
+        Augment remove to notify .stream of outcome of chunk message
+        '''
+        super(Messenger, self).remove(remote=remote, index=index)
+        if self.stream:
+            stream, self.stream = self.stream, None
+            if self.completed:
+                stream.complete(self)
+            else:
+                stream.fail(self)
+
+    def window(self):
+        '''
+        Returns max number of segments to send before waiting for an ack
+        That is the lesser of .burst and the congestion window of .remote
+        when the stack is congestive. Zero means no limit
+        '''
+        window = self.burst
+        if self.stack.congestive:
+            cwnd = max(1, int(self.remote.cwnd))
+            window = min(window, cwnd) if window else cwnd
+        return window
+
+    def paced(self, count):
+        '''
+        Returns how many of count segments may be sent now
+        When the stack is pacing and the round trip time of .remote is known
+        the congestion window is spread over the smoothed round trip time
+        '''
+        if not (self.stack.pacing and self.stack.congestive and self.remote.srtt):
+            return count
+        stamp = self.stack.store.stamp
+        rate = self.remote.cwnd / self.remote.srtt  # segments per unit time
+        if self.paceStamp is None:
+            self.paceTokens = 1.0
+        else:
+            self.paceTokens = min(self.paceTokens + (stamp - self.paceStamp) * rate,
+                                  max(1.0, self.remote.cwnd))
+        self.paceStamp = stamp
+        count = min(count, int(self.paceTokens))
+        self.paceTokens -= count
+        if count:
+            self.stack.incStat('message_paced_tx', count)
+        return count
 
     def another(self):
         '''
         Process ack packet and continue sending
+        Late or duplicate acks are dropped since the redo timer and resend
+        requests recover lost segments
         '''
         if not self.stack.parseInner(self.rxPacket):
             return
+        if self.rxPacket.data['sn'] <= self.ackedSn:
+            self.stack.incStat("message_ack_duplicate")
+            return
+        self.ackedSn = self.rxPacket.data['sn']
+        self.sampleRtt()
         self.remote.refresh(alived=True)
         self.stack.incStat("message_ack_rx")
+        if self.rxPacket.data['sn'] + 1 >= self.windowEnd:  # whole window acked
+            self.remote.openWindow(self.windowEnd - self.windowStart)
+            self.windowStart = self.windowEnd
 
         if self.misseds:
             self.sendMisseds()
@@ -2853,6 +3062,7 @@ class Messenger(Initiator):
                     self.stack.name, self.tray.current, current))
                 self.tray.current = current
                 self.tray.last = current - 1
+            self.windowEnd = self.tray.current  # ack ends current window
             if self.tray.current < len(self.tray.packets):
                 self.message()  # continue message
 
@@ -2864,6 +3074,7 @@ class Messenger(Initiator):
         if not self.stack.parseInner(self.rxPacket):
             return
 
+        self.sampleRtt()
         self.remote.refresh(alived=True)
         self.stack.incStat('message_resend_rx')
 
@@ -2871,6 +3082,13 @@ class Messenger(Initiator):
         body = self.rxPacket.body.data
 
         misseds = body.get('misseds')  # indexes of missed segments
+        if misseds is None and 'bitmap' in body:  # selective ack
+            try:
+                misseds = packeting.unpackSack(body)
+            except raeting.PacketError as ex:
+                console.terse(str(ex) + '\n')
+                self.stack.incStat('invalid_resend')
+                return
         if misseds:
             if not self.tray.packets:
                 emsg = "Invalid resend request '{0}'\n".format(misseds)
@@ -2887,15 +3105,34 @@ class Messenger(Initiator):
                     self.stack.incStat("invalid_misseds")
                     return
                 self.misseds.add(packet)  # add segment, set only adds if unique
+            self.recover(misseds)
             self.sendMisseds()
 
+    def recover(self, misseds):
+        '''
+        Adjust congestion window of .remote from resend request of misseds
+        Segments not reported before or resent and missed again are new losses
+        which shrink the window. Otherwise resent segments not missed anymore
+        were received which grows it
+        '''
+        lost = [m for m in misseds if m in self.resent or m not in self.reported]
+        acked = len(self.resent.difference(misseds))
+        self.reported.update(misseds)
+        self.resent.clear()
+        if lost:
+            self.remote.shrinkWindow()
+        elif acked:
+            self.remote.openWindow(acked)
+
     def sendMisseds(self):
         '''
         Send a burst of missed packets
         '''
         if self.misseds:
-            burst = (min(self.burst, (len(self.misseds))) if
-                     self.burst else len(self.misseds))
+            self.rttStamp = None  # retransmission so no rtt sample
+            window = self.window()
+            burst = (min(window, (len(self.misseds))) if
+                     window else len(self.misseds))
             # make list of first burst number of packets
             misseds = [missed for missed in self.misseds][:burst]
             for packet in misseds[:-1]:
@@ -2930,6 +3167,7 @@ class Messenger(Initiator):
                     self.tid,
                     self.stack.store.stamp))
                 self.misseds.discard(packet)  # remove from self.misseds
+                self.resent.add(packet.data['sn'])
 
     def complete(self):
         '''
@@ -2939,9 +3177,13 @@ class Messenger(Initiator):
         if not self.stack.parseInner(self.rxPacket):
             return
 
+        self.sampleRtt()
         self.remote.refresh(alived=True)
         self.stack.incStat('message_complete_rx')
+        self.remote.openWindow(self.windowEnd - self.windowStart)
+        self.windowStart = self.windowEnd
 
+        self.completed = True
         self.remove()
         console.concise("Messenger {0}. Done with {1} in {2} at {3}\n".format(
                 self.stack.name, self.remote.name, self.tid, self.stack.store.stamp))
@@ -3003,8 +3245,8 @@ class Messengent(Correspondent):
         kwa['kind'] = TrnsKind.message.value
         super(Messengent, self).__init__(**kwa)
 
-        self.redoTimeoutMax = redoTimeoutMax or self.RedoTimeoutMax
-        self.redoTimeoutMin = redoTimeoutMin or self.RedoTimeoutMin
+        self.redoTimeoutMin, self.redoTimeoutMax = self.redoTimeouts(redoTimeoutMin,
+                                                                     redoTimeoutMax)
         self.redoTimer = aiding.StoreTimer(self.stack.store,
                                            duration=self.redoTimeoutMin)
 
@@ -3013,6 +3255,13 @@ class Messengent(Correspondent):
         self.prep() # prepare .txData
         self.tray = packeting.RxTray(stack=self.stack)
 
+    def remove(self, remote=None, index=None):
+        '''
+        Augment remove to release reassembly resources of incomplete tray
+        '''
+        super(Messengent, self).remove(remote=remote, index=index)
+        self.tray.release()
+
     def transmit(self, packet):
         '''
         Augment transmit with restart of redo timer
@@ -3055,7 +3304,7 @@ class Messengent(Correspondent):
                 self.complete()
             else:
                 misseds = self.tray.missing(begin=self.lowest)
-                if misseds:  # resent missed segments
+                if misseds and not self.tray.pending:  # resent missed segments
                     self.lowest = misseds[0]
                     self.resend(misseds)
                 else:  # always ask for more here
@@ -3116,12 +3365,14 @@ class Messengent(Correspondent):
         self.stack.incStat("message_segment_rx")
 
         self.wait = self.rxPacket.data['wf']  # sender is waiting for ack
+        if not self.wait:  # sender still sending so only redo after silence
+            self.redoTimer.restart()
 
         if self.tray.complete:
             self.complete()
         elif self.wait:  # ask for more if sender waiting for ack
             misseds = self.tray.missing(begin=self.lowest)
-            if misseds:  # resent missed segments
+            if misseds and not self.tray.pending:  # resent missed segments
                 self.lowest = misseds[0]
                 self.resend(misseds)
             else:
@@ -3157,15 +3408,10 @@ class Messengent(Correspondent):
     def resend(self, misseds):
         '''
         Send resend request(s) for missing packets
+        Each request body is a compact selective ack bitmap of misseds
         '''
         while misseds:
-            if len(misseds) > 64:
-                remainders = misseds[64:] # only do at most 64 at a time
-                misseds = misseds[:64]
-            else:
-                remainders = []
-
-            body = odict(misseds=misseds)
+            body, remainders = packeting.packSack(misseds)
             packet = packeting.TxPacket(stack=self.stack,
                                         kind=PcktKind.resend.value,
                                         embody=body,
@@ -3181,7 +3427,7 @@ class Messengent(Correspondent):
             self.stack.incStat("message_resend_tx")
             console.concise("Messengent {0}. Do Resend Segments {1} with {2} in {3} at {4}\n".format(
                     self.stack.name,
-                    misseds,
+                    misseds[:len(misseds) - len(remainders)],
                     self.remote.name,
                     self.tid,
                     self.stack.store.stamp))
@@ -3192,10 +3438,34 @@ class Messengent(Correspondent):
         Complete transaction and remove
         '''
         self.done()
+        self.remote.doneMessage(self.sid, self.tid)
         console.verbose("{0} received message body\n{1}\n".format(
             self.stack.name, self.tray.body))
         # application layer authorizaiton needs to know who sent the message
-        self.stack.rxMsgs.append((self.tray.body, self.remote.name))
+        count = self.tray.data.get('mc', 0)
+        order = self.tray.data.get('oi', 0)
+        dedup = self.tray.data.get('dd', 0)
+        resume = self.tray.data.get('rk', 0)
+        if dedup:  # step of deduplicated message exchange
+            self.stack.receiveDedup(self.tray.body, self.remote, dedup)
+        elif resume:  # step of resumable message exchange
+            self.stack.receiveResume(self.tray.body, self.remote, resume, index=order - 1)
+        elif order:  # stream chunk with index order - 1
+            self.stack.receiveChunk(self.tray.body, self.remote, index=order - 1)
+        elif count:  # coalesced messages so split in order
+            bodies = self.tray.body.get('ms') if isinstance(self.tray.body, Mapping) else None
+            if not isinstance(bodies, list) or len(bodies) != count:
+                emsg = "Messengent {0}. Invalid coalesced message from {1}\n".format(
+                        self.stack.name, self.remote.name)
+                console.terse(emsg)
+                self.stack.incStat('invalid_coalesced_message')
+                self.remove()
+                return
+            for body in bodies:
+                self.stack.rxMsgs.append((body, self.remote.name))
+            self.stack.incStat('message_coalesced_rx', count)
+        else:
+            self.stack.rxMsgs.append((self.tray.body, self.remote.name))
         self.remove()
         console.concise("Messengent {0}. Complete with {1} in {2} at {3}\n".format(
                 self.stack.name, self.remote.name, self.tid, self.stack.store.stamp))
@@ -3265,3 +3535,302 @@ class Messengent(Correspondent):
                 self.stack.name, self.remote.name, self.tid, self.stack.store.stamp))
         self.stack.incStat(self.statKey())
 
+
+class Broadcaster(Transaction):
+    '''
+    RAET protocol Broadcaster Initiator class Dual of Broadcastent
+    Sends one signed but not encrypted message to many remotes at once.
+    Receivers do not ack. Segments nacked as missing are resent until no
+    repair is asked for within timeout
+    '''
+    Timeout = 5.0 # linger to repair missing segments
+    RepairHoldoff = 0.1 # min time between group resends of same segment
+
+    def __init__(self, remotes=None, ha=None, **kwa):
+        '''
+        Setup instance
+        remotes is list of remotes broadcast to
+        ha is multicast group (host, port) sent to instead of each remote
+        '''
+        kwa['kind'] = TrnsKind.message.value
+        kwa['rmt'] = False
+        kwa['bcst'] = True
+        super(Broadcaster, self).__init__(**kwa)
+        self.remotes = list(remotes or [])
+        self.ha = ha
+        self.repairs = odict()  # stamps of group resends keyed by segment number
+
+        self.sid = self.stack.bcstSid
+        self.tid = self.stack.local.nextTid()
+        self.prep() # prepare .txData
+        self.tray = packeting.TxTray(stack=self.stack)
+
+    @property
+    def index(self):
+        '''
+        Property is key (si, ti) in stack .broadcasts
+        '''
+        return ((self.sid, self.tid))
+
+    def add(self, remote=None, index=None):
+        '''
+        Add self to stack broadcasts
+        '''
+        self.stack.broadcasts[self.index] = self
+
+    def remove(self, remote=None, index=None):
+        '''
+        Remove self from stack broadcasts
+        '''
+        if self.stack.broadcasts.get(self.index) is self:
+            del self.stack.broadcasts[self.index]
+
+    def transmit(self, packet, ha=None):
+        '''
+        Queue packet to ha if given Otherwise to group .ha if any
+        Otherwise to each of .remotes
+        '''
+        if ha is None:
+            ha = self.ha
+        has = [ha] if ha else [remote.ha for remote in self.remotes]
+        for ha in has:
+            self.stack.txes.append((packet.packed, ha))
+        self.txPacket = packet
+
+    def receive(self, packet):
+        """
+        Process received packet belonging to this transaction
+        """
+        super(Broadcaster, self).receive(packet)
+
+        if packet.data['tk'] == TrnsKind.message:
+            if packet.data['pk'] == PcktKind.resend:  # nack of missing segments
+                self.repair()
+
+    def process(self):
+        '''
+        Perform time based processing of transaction
+        '''
+        if self.timeout > 0.0 and self.timer.expired:
+            self.remove()
+            console.concise("Broadcaster {0}. Done repairing in {1} at {2}\n".format(
+                    self.stack.name, self.tid, self.stack.store.stamp))
+
+    def prep(self):
+        '''
+        Prepare .txData
+        Zero uids since receivers match the source address instead
+        '''
+        self.txData.update(se=0,
+                           de=0,
+                           tk=self.kind,
+                           cf=self.rmt,
+                           bf=self.bcst,
+                           si=self.sid,
+                           ti=self.tid,)
+
+    def message(self, body=None):
+        '''
+        Send all segments of message
+        '''
+        try:
+            self.tray.pack(data=self.txData, body=body)
+        except raeting.PacketError as ex:
+            console.terse(str(ex) + '\n')
+            self.stack.incStat("packing_error")
+            return
+
+        self.add()
+        for packet in self.tray.packets:
+            self.transmit(packet)
+        self.stack.incStat("broadcast_segment_tx", len(self.tray.packets))
+        self.stack.incStat("broadcast_initiate")
+        console.concise("Broadcaster {0}. Do Broadcast of {1} segments to {2} in {3} at {4}\n".format(
+                self.stack.name,
+                len(self.tray.packets),
+                self.ha or [remote.name for remote in self.remotes],
+                self.tid,
+                self.stack.store.stamp))
+
+    def repair(self):
+        '''
+        Process resend packet and resend the missed segments to the remote that
+        sent it or to the group once per .RepairHoldoff
+        '''
+        remote = self.stack.remotes.get(self.rxPacket.data['de'])
+        if not remote or not self.stack.parseInner(self.rxPacket):
+            return
+        remote.refresh(alived=True)
+        self.stack.incStat('broadcast_resend_rx')
+
+        try:
+            misseds = packeting.unpackSack(self.rxPacket.body.data)
+        except raeting.PacketError as ex:
+            console.terse(str(ex) + '\n')
+            self.stack.incStat('invalid_resend')
+            return
+
+        self.timer.restart() # linger while receivers still repair
+        stamp = self.stack.store.stamp
+        for m in misseds:
+            if m >= len(self.tray.packets):
+                console.terse("Invalid misseds segment number {0}\n".format(m))
+                self.stack.incStat("invalid_misseds")
+                return
+            if self.ha:  # one group resend repairs every receiver
+                if m in self.repairs and (stamp - self.repairs[m]) < self.RepairHoldoff:
+                    self.stack.incStat('broadcast_repair_suppressed')
+                    continue
+                self.repairs[m] = stamp
+                self.transmit(self.tray.packets[m])
+            else:
+                self.transmit(self.tray.packets[m], ha=remote.ha)
+            self.stack.incStat('broadcast_repair_tx')
+        console.concise("Broadcaster {0}. Do Repair Segments {1} for {2} in {3} at {4}\n".format(
+                self.stack.name, misseds, remote.name, self.tid, stamp))
+
+class Broadcastent(Correspondent):
+    '''
+    RAET protocol Broadcastent Correspondent class Dual of Broadcaster
+    Receives broadcast message without acking. Nacks missing segments once
+    the broadcaster goes silent. Timeout is reset by each segment received
+    '''
+    Timeout = 5.0
+    RedoTimeoutMin = 0.2 # initial timeout
+    RedoTimeoutMax = 1.0 # max timeout
+
+    def __init__(self, redoTimeoutMin=None, redoTimeoutMax=None, **kwa):
+        '''
+        Setup instance
+        '''
+        kwa['kind'] = TrnsKind.message.value
+        kwa['bcst'] = True
+        super(Broadcastent, self).__init__(**kwa)
+
+        self.redoTimeoutMin, self.redoTimeoutMax = self.redoTimeouts(redoTimeoutMin,
+                                                                     redoTimeoutMax)
+        # random holdoff so receivers that missed the same segments spread nacks
+        self.redoTimer = aiding.StoreTimer(self.stack.store,
+                duration=self.redoTimeoutMin * (1.0 + random.random()))
+
+        self.prep() # prepare .txData
+        self.tray = packeting.RxTray(stack=self.stack)
+
+    def remove(self, remote=None, index=None):
+        '''
+        Augment remove to release reassembly resources of incomplete tray
+        '''
+        super(Broadcastent, self).remove(remote=remote, index=index)
+        self.tray.release()
+
+    def receive(self, packet):
+        """
+        Process received packet belonging to this transaction
+        """
+        super(Broadcastent, self).receive(packet)
+
+        if packet.data['tk'] == TrnsKind.message:
+            if packet.data['pk'] == PcktKind.message:
+                self.message()
+
+    def process(self):
+        '''
+        Perform time based processing of transaction
+        '''
+        if self.timeout > 0.0 and self.timer.expired:
+            self.remove()
+            console.concise("Broadcastent {0}. Timed out with {1} in {2} at {3}\n".format(
+                    self.stack.name, self.remote.name, self.tid, self.stack.store.stamp))
+            self.stack.incStat('broadcast_incomplete')
+            return
+
+        if self.redoTimer.expired:
+            duration = min(
+                         max(self.redoTimeoutMin,
+                              self.redoTimer.duration * 2.0),
+                         self.redoTimeoutMax)
+            self.redoTimer.restart(duration=duration)
+            misseds = self.tray.missing(end=len(self.tray.segments))
+            if misseds:
+                self.resend(misseds)
+
+    def prep(self):
+        '''
+        Prepare .txData
+        '''
+        self.txData.update( dh=self.remote.ha[0], # maybe needed for index
+                            dp=self.remote.ha[1], # maybe needed for index
+                            se=self.remote.nuid,
+                            de=self.remote.fuid,
+                            tk=self.kind,
+                            cf=self.rmt,
+                            bf=self.bcst,
+                            si=self.sid,
+                            ti=self.tid,)
+
+    def message(self):
+        '''
+        Process message packet. Called repeatedly for each packet in message
+        '''
+        try:
+            self.tray.parse(self.rxPacket)
+        except raeting.PacketError as ex:
+            console.terse(str(ex) + '\n')
+            self.stack.incStat('parsing_message_error')
+            self.remove()
+            return
+
+        if self.index not in self.remote.transactions:
+            self.add()
+
+        self.remote.refresh(alived=True)
+        self.stack.incStat("broadcast_segment_rx")
+        self.timer.restart()
+        self.redoTimer.restart()  # only nack after silence
+
+        if self.tray.complete:
+            self.complete()
+
+    def resend(self, misseds):
+        '''
+        Send resend request(s) for missing segments to broadcaster
+        '''
+        while misseds:
+            body, remainders = packeting.packSack(misseds)
+            packet = packeting.TxPacket(stack=self.stack,
+                                        kind=PcktKind.resend.value,
+                                        embody=body,
+                                        data=self.txData)
+            try:
+                packet.pack()
+            except raeting.PacketError as ex:
+                console.terse(str(ex) + '\n')
+                self.stack.incStat("packing_error")
+                self.remove()
+                return
+            self.transmit(packet)
+            self.stack.incStat("broadcast_resend_tx")
+            console.concise("Broadcastent {0}. Do Resend Segments {1} with {2} in {3} at {4}\n".format(
+                    self.stack.name,
+                    misseds[:len(misseds) - len(remainders)],
+                    self.remote.name,
+                    self.tid,
+                    self.stack.store.stamp))
+            misseds = remainders
+
+    def complete(self):
+        '''
+        Complete transaction and remove
+        '''
+        self.remote.receivedBcst(self.tid)
+        self.stack.rxMsgs.append((self.tray.body, self.remote.name))
+        self.remove()
+        console.concise("Broadcastent {0}. Complete with {1} in {2} at {3}\n".format(
+                self.stack.name, self.remote.name, self.tid, self.stack.store.stamp))
+        self.stack.incStat("broadcast_correspond_complete")
+
+    def nack(self):
+        '''
+        Terminate without nack since broadcaster does not wait on receivers
+        '''
+        self.remove()
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+'''
+serializing.py raet protocol body serializer registry
+
+Road packet bodies are serialized by the serializer registered for their
+body kind and lane page bodies by the serializer registered for their pack
+kind so codecs can be swapped or added without changing packeting or paging.
+'''
+# pylint: skip-file
+# pylint: disable=W0611
+
+# Import python libs
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Import ioflo libs
+from ioflo.base.odicting import odict
+
+from ioflo.base.consoling import getConsole
+console = getConsole()
+
+# Import raet libs
+from .abiding import *  # import globals
+from . import raeting
+from .raeting import BodyKind, PackKind
+
+
+class Packed(bytes):
+    '''
+    Body data already serialized for the body or pack kind it is sent with
+    Packed bodies are sent as is instead of being serialized again
+    Compressed forms are cached in .zips keyed by zip kind so a body sent
+    to many remotes is compressed once
+    '''
+    def __new__(cls, packed=b''):
+        self = super(Packed, cls).__new__(cls, packed)
+        self.zips = {}
+        return self
+
+
+class Serializer(object):
+    '''
+    Base serializer of nada body kind that packs nothing and parses to an
+    empty mapping
+    '''
+    Mapped = True # parsed body must be a mapping
+
+    def __init__(self, ordered=True):
+        '''
+        Setup instance
+
+        ordered True means parsed mappings are odicts otherwise dicts
+        which are faster to build
+        '''
+        self.ordered = ordered
+        self.mapping = odict if ordered else dict
+        self.hook = odict if ordered else None # object_pairs_hook
+
+    def pack(self, data):
+        '''
+        Returns packed bytes of body data
+        '''
+        if isinstance(data, Packed):
+            return data # shared not copied
+        if not data:
+            return b''
+        return self.dump(data)
+
+    def parse(self, packed):
+        '''
+        Returns body data parsed from packed bytes
+        '''
+        if not packed:
+            return self.mapping()
+        return self.load(packed)
+
+    def dump(self, data):
+        return b''
+
+    def load(self, packed):
+        return self.mapping()
+
+
+class RawSerializer(Serializer):
+    '''
+    Passes bytes through both ways for bodies serialized by the application
+    '''
+    Mapped = False
+
+    def pack(self, data):
+        return data
+
+    def parse(self, packed):
+        return packed
+
+
+class JsonSerializer(Serializer):
+    '''
+    Serializes bodies as compact utf-8 json
+    '''
+    def dump(self, data):
+        return ns2b(json.dumps(data,
+                               separators=(',', ':'),
+                               encoding='utf-8'))
+
+    def load(self, packed):
+        return json.loads(packed.decode(encoding='utf-8'),
+                          object_pairs_hook=self.hook,
+                          encoding='utf-8')
+
+
+class MsgpackSerializer(Serializer):
+    '''
+    Serializes bodies as msgpack
+    Raises PacketError if msgpack is not installed
+    '''
+    def dump(self, data):
+        if not msgpack:
+            emsg = "Msgpack not installed."
+            raise raeting.PacketError(emsg)
+        return msgpack.dumps(data, encoding='utf-8')
+
+    def load(self, packed):
+        if not msgpack:
+            emsg = "Msgpack not installed."
+            raise raeting.PacketError(emsg)
+        return msgpack.loads(packed,
+                             object_pairs_hook=self.hook,
+                             encoding='utf-8')
+
+
+BodySerializers = odict() # road body serializers keyed by body kind value
+PackSerializers = odict() # lane body serializers keyed by pack kind value
+
+
+def registerBody(bk, serializer):
+    '''
+    Register serializer for road body kind bk replacing any existing one
+    bk is BodyKind value or any other unused head field value up to 254
+    '''
+    if bk == BodyKind.unknown:
+        emsg = "Invalid body kind '{0}'".format(bk)
+        raise ValueError(emsg)
+    BodySerializers[int(bk)] = serializer
+
+
+def registerPack(pk, serializer):
+    '''
+    Register serializer for lane pack kind pk replacing any existing one
+    '''
+    PackSerializers[int(pk)] = serializer
+
+
+registerBody(BodyKind.nada.value, Serializer())
+registerBody(BodyKind.json.value, JsonSerializer())
+registerBody(BodyKind.raw.value, RawSerializer())
+registerBody(BodyKind.msgpack.value, MsgpackSerializer())
+registerPack(PackKind.json.value, JsonSerializer())
+registerPack(PackKind.pack.value, MsgpackSerializer())
@@ -32,6 +32,7 @@ from ioflo.base import storing
 # Import raet libs
 from .abiding import *  # import globals
 from . import raeting
+from . import serializing
 from . import keeping
 from . import lotting
 
@@ -333,10 +334,10 @@ class Stack(object):
     def transmit(self, msg, uid=None):
         '''
         Append duple (msg, uid) to .txMsgs deque
-        If msg is not mapping then raises exception
+        If msg is not mapping or serializing.Packed then raises exception
         If uid is None then it will default to the first entry in .remotes
         '''
-        if not isinstance(msg, Mapping):
+        if not isinstance(msg, (Mapping, serializing.Packed)):
             emsg = "Invalid msg, not a mapping {0}\n".format(msg)
             console.terse(emsg)
             self.incStat("invalid_transmit_body")
@@ -403,6 +404,17 @@ class Stack(object):
             laters.append((tx, ta)) # keep sequential
             return
 
+        if not self._sendOneTx(tx, ta):
+            # problem sending such as busy with last message. save it for later
+            laters.append((tx, ta))
+            blocks.append(ta)
+
+    def _sendOneTx(self, tx, ta):
+        '''
+        Send packet tx to destination address ta through server
+        Returns False if destination is blocked so tx should be sent later
+        Otherwise returns True
+        '''
         try:
             self.server.send(tx, ta)
         except socket.error as ex:
@@ -410,11 +422,15 @@ class Stack(object):
                              errno.ENETUNREACH, errno.ETIME,
                              errno.EHOSTUNREACH, errno.EHOSTDOWN,
                              errno.ECONNRESET]):
-                # problem sending such as busy with last message. save it for later
-                laters.append((tx, ta))
-                blocks.append(ta)
+                return False
+            elif ex.errno == errno.EMSGSIZE: # too big for path so drop
+                emsg = "Stack '{0}'. Dropped packet of {1} bytes to {2}. {3}\n".format(
+                        self.name, len(tx), ta, ex)
+                console.terse(emsg)
+                self.incStat('tx_too_big')
             else:
                 raise
+        return True
 
     def serviceTxes(self):
         '''
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+'''
+Tests to try out serializing. Potentially ephemeral
+
+'''
+# pylint: skip-file
+import sys
+
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+from ioflo.base.consoling import getConsole
+console = getConsole()
+
+from ioflo.base.odicting import odict
+
+# Import raet libs
+from raet.abiding import *  # import globals
+from raet import raeting, serializing
+from raet.road import packeting
+from raet.lane import paging
+
+def setUpModule():
+    console.reinit(verbosity=console.Wordage.concise)
+
+def tearDownModule():
+    pass
+
+
+class BasicTestCase(unittest.TestCase):
+    '''
+    Test body serializer registry
+    '''
+
+    def setUp(self):
+        self.bodies = odict(serializing.BodySerializers)
+        self.packs = odict(serializing.PackSerializers)
+
+    def tearDown(self):
+        serializing.BodySerializers.clear()
+        serializing.BodySerializers.update(self.bodies)
+        serializing.PackSerializers.clear()
+        serializing.PackSerializers.update(self.packs)
+
+    def testSerializers(self):
+        '''
+        Test ordered and unordered codecs and passthrough of packed bodies
+        '''
+        console.terse("{0}\n".format(self.testSerializers.__doc__))
+        body = odict([('b', 1), ('a', [1, 2]), ('c', odict(z=None))])
+        serializers = [serializing.JsonSerializer, serializing.MsgpackSerializer]
+        for serializer in serializers:
+            ordered = serializer()
+            unordered = serializer(ordered=False)
+            packed = ordered.pack(body)
+            self.assertEqual(unordered.pack(body), packed)
+            data = ordered.parse(packed)
+            self.assertIsInstance(data, odict)
+            self.assertEqual(data.keys(), body.keys())
+            data = unordered.parse(packed)
+            self.assertIs(type(data), dict)
+            self.assertIs(type(data['c']), dict)
+            self.assertEqual(data, body)
+            self.assertEqual(ordered.pack(odict()), b'')
+            self.assertEqual(ordered.parse(b''), odict())
+            self.assertEqual(ordered.pack(serializing.Packed(packed)), packed)
+
+        raw = serializing.RawSerializer()
+        self.assertEqual(raw.pack(b'stuff'), b'stuff')
+        self.assertEqual(raw.parse(b'stuff'), b'stuff')
+        self.assertRaises(ValueError,
+                          serializing.registerBody,
+                          raeting.BodyKind.unknown.value,
+                          raw)
+
+    def testRegistry(self):
+        '''
+        Test packets and pages serialized by registered serializers
+        '''
+        console.terse("{0}\n".format(self.testRegistry.__doc__))
+        body = odict([('msg', 'Hello Raet World'), ('extra', 'Goodby Big Moon')])
+
+        # unordered msgpack replaces default
+        bk = raeting.BodyKind.msgpack.value
+        serializing.registerBody(bk, serializing.MsgpackSerializer(ordered=False))
+        packet0 = packeting.TxPacket(embody=body, data=odict(bk=bk))
+        packet0.pack()
+        packet1 = packeting.RxPacket(packed=packet0.packed)
+        packet1.parse()
+        self.assertIs(type(packet1.body.data), dict)
+        self.assertEqual(packet1.body.data, body)
+
+        # pre serialized body sent as is
+        packed = serializing.JsonSerializer().pack(body)
+        bk = raeting.BodyKind.json.value
+        packet0 = packeting.TxPacket(embody=serializing.Packed(packed),
+                                     data=odict(bk=bk))
+        packet0.pack()
+        self.assertTrue(packet0.packed.endswith(packed))
+        packet1 = packeting.RxPacket(packed=packet0.packed)
+        packet1.parse()
+        self.assertEqual(packet1.body.data, body)
+        self.assertEqual(packet1.body.data.keys(), body.keys())
+
+        # custom body kind only parsed once registered
+        bk = 7
+        packet0 = packeting.TxPacket(embody=body, data=odict(bk=bk))
+        packet0.pack()
+        self.assertEqual(packet0.body.packed, b'')
+        serializing.registerBody(bk, serializing.JsonSerializer(ordered=False))
+        packet0 = packeting.TxPacket(embody=body, data=odict(bk=bk))
+        packet0.pack()
+        packet1 = packeting.RxPacket(packed=packet0.packed)
+        packet1.parse()
+        self.assertEqual(packet1.data['bk'], bk)
+        self.assertEqual(packet1.body.data, body)
+        del serializing.BodySerializers[bk]
+        packet1 = packeting.RxPacket(packed=packet0.packed)
+        self.assertRaises(raeting.PacketError, packet1.parse)
+        self.assertEqual(packet1.data['bk'], raeting.BodyKind.unknown.value)
+
+        # lane pages
+        pk = raeting.PackKind.pack.value
+        serializing.registerPack(pk, serializing.MsgpackSerializer(ordered=False))
+        page0 = paging.TxPage(data=odict(pk=pk), embody=body)
+        page0.pack()
+        page1 = paging.RxPage(packed=page0.packed)
+        page1.parse()
+        self.assertIs(type(page1.body.data), dict)
+        self.assertEqual(page1.body.data, body)
+        del serializing.PackSerializers[pk]
+        page0 = paging.TxPage(data=odict(pk=pk), embody=body)
+        self.assertRaises(raeting.PageError, page0.pack)
+
+
+def runSome():
+    """ Unittest runner """
+    tests = []
+    names = ['testSerializers',
+             'testRegistry', ]
+    tests.extend(map(BasicTestCase, names))
+
+    suite = unittest.TestSuite(tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
+
+
+def runAll():
+    """ Unittest runner """
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(BasicTestCase))
+
+    unittest.TextTestRunner(verbosity=2).run(suite)
+
+if __name__ == '__main__' and __package__ is None:
+
+    #console.reinit(verbosity=console.Wordage.concise)
+
+    runAll() #run all unittests
+
+    #runSome()#only run some
@@ -0,0 +1,456 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmarks for Raet Road Stack message transfer over an emulated link
+
+The link is emulated in process by intercepting each stack's .txes deque so
+loss, delay and receive buffer limits are reproducible without netem.
+Time is store time so results are in service ticks not wall clock.
+'''
+from __future__ import print_function
+# pylint: skip-file
+import sys
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+import os
+import binascii
+import random
+import shutil
+import tempfile
+from collections import deque
+
+from ioflo.base.odicting import odict
+from ioflo.base import storing
+from ioflo.base.aiding import StoreTimer
+
+from ioflo.base.consoling import getConsole
+console = getConsole()
+
+# Import raet libs
+from raet import raeting, nacling
+from raet.road import keeping, estating, stacking, transacting, packeting
+
+if sys.platform == 'win32':
+    TEMPDIR = 'c:/temp'
+    if not os.path.exists(TEMPDIR):
+        os.mkdir(TEMPDIR)
+else:
+    TEMPDIR = '/tmp'
+
+
+def setUpModule():
+    console.reinit(verbosity=console.Wordage.terse)
+
+
+def tearDownModule():
+    pass
+
+# Benchmark constants. Can be used to tune the benchmark.
+TICK = 0.01  # store time per service iteration
+MSG_SIZE_BIG = 256 * 1024
+SALT_SIZES = [64 * 1024, 1024 * 1024]  # packed sizes of salt like returns
+LOSSES = [0.0, 0.01, 0.05]
+DELAY = 0.05  # one way delay in store time
+RX_LIMIT = 64  # max packets receiver buffers per tick, rest are dropped
+SEED = 0x5eed
+PACKET_SIZES = [1024, 1400, 8192, 65507]  # negotiated max packet sizes
+PARITY_LOSSES = [0.01, 0.02, 0.05, 0.10]
+PARITY_GROUPS = [0, 16, 8, 4]  # segments per parity segment, 0 = no parity
+DEDUP_SIZES = [0, 16384]  # min message bytes sent deduplicated, 0 = never
+RESUME_SIZES = [0, 65536]  # min message bytes sent resumable, 0 = never
+RESUME_PIECE_SIZE = 16384  # bytes per resumable piece
+OUTAGE = (2.0, 32.0)  # store times after start when the link drops everything
+OUTAGE_TIMEOUT = 10.0  # message transaction timeout during outage bench
+DURATION = 600.0
+
+
+class BenchTestCase(unittest.TestCase):
+    '''
+    Runs one big message between two stacks over an emulated link for each
+    stack configuration and reports store time, segments and redos
+    '''
+
+    def setUp(self):
+        self.store = storing.Store(stamp=0.0)
+        self.timer = StoreTimer(store=self.store, duration=1.0)
+        self.base = tempfile.mkdtemp(prefix="raet",  suffix="base", dir=TEMPDIR)
+        self.burst = stacking.RoadStack.BurstSize
+        self.zk = stacking.RoadStack.Zk
+
+    def tearDown(self):
+        stacking.RoadStack.BurstSize = self.burst
+        stacking.RoadStack.Zk = self.zk
+        if os.path.exists(self.base):
+            shutil.rmtree(self.base)
+
+    def createStack(self, name, ha=None, **kwa):
+        '''
+        Create main road stack with fresh keys
+        '''
+        dirpath = os.path.join(self.base, 'road', 'keep', name)
+        keeping.clearAllKeep(dirpath)
+        stack = stacking.RoadStack(store=self.store,
+                                   name=name,
+                                   ha=ha,
+                                   main=True,
+                                   auto=raeting.AutoMode.always.value,
+                                   sigkey=nacling.Signer().keyhex,
+                                   prikey=nacling.Privateer().keyhex,
+                                   dirpath=dirpath,
+                                   **kwa)
+        return stack
+
+    def createPair(self, **kwa):
+        '''
+        Create, join and allow pair of stacks
+        '''
+        alpha = self.createStack('alpha', **kwa)
+        beta = self.createStack('beta', ha=("", raeting.RAET_TEST_PORT), **kwa)
+        alpha.addRemote(estating.RemoteEstate(stack=alpha,
+                                              fuid=0,
+                                              sid=0,
+                                              ha=beta.local.ha))
+        alpha.join()
+        self.serviceLink([alpha, beta], duration=2.0)
+        alpha.allow()
+        self.serviceLink([alpha, beta], duration=2.0)
+        for stack in [alpha, beta]:
+            remote = stack.remotes.values()[0]
+            self.assertIs(remote.allowed, True)
+        return (alpha, beta)
+
+    def closePair(self, stacks):
+        for stack in stacks:
+            stack.server.close()
+            stack.clearAllKeeps()
+
+    def serviceLink(self, stacks, loss=0.0, delay=0.0, limit=None,
+                    rand=None, outage=None, duration=1.0):
+        '''
+        Service stacks over emulated link until no transactions or duration
+        Each tx is dropped with probability loss otherwise held for delay
+        Receivers accept at most limit packets per tick and drop the rest
+        outage is (begin, end) store times when every tx is dropped
+        Returns elapsed store time
+        '''
+        rand = rand or random.Random(SEED)
+        links = [deque() for stack in stacks]  # (due stamp, tx, ta) in flight
+        start = self.store.stamp
+        self.timer.restart(duration=duration)
+        while not self.timer.expired:
+            for i, stack in enumerate(stacks):
+                stack.serviceTxMsgs()
+                while stack.txes:
+                    tx, ta = stack.txes.popleft()
+                    if loss and rand.random() < loss:
+                        continue  # lost
+                    if outage and outage[0] <= self.store.stamp < outage[1]:
+                        continue  # link down
+                    links[i].append((self.store.stamp + delay, tx, ta))
+                while links[i] and links[i][0][0] <= self.store.stamp:
+                    due, tx, ta = links[i].popleft()
+                    stack.server.send(tx, ta)
+
+            for stack in stacks:
+                stack.serviceReceives()
+                if limit is not None:
+                    while len(stack.rxes) > limit:
+                        stack.rxes.pop()  # buffer overrun
+                stack.serviceRxes()
+                stack.process()
+
+            if (all([not stack.transactions for stack in stacks]) and
+                    not any(links)):
+                break
+            self.store.advanceStamp(TICK)
+        return (self.store.stamp - start)
+
+    def saltReturn(self, size):
+        '''
+        Returns salt like state return odict of about size packed bytes
+        '''
+        states = odict()
+        ret = odict(fun='state.highstate',
+                    jid='20150101000000000000',
+                    id='minion',
+                    retcode=0,
+                    success=True,
+                    ret=states)
+        i = 0
+        while len(packeting.packBody(ret, raeting.BodyKind.json.value)) < size:
+            for j in range(64):
+                name = '/etc/app/conf.d/{0:05d}.conf'.format(i)
+                states['file_|-{0}_|-{0}_|-managed'.format(name)] = odict(
+                        changes=odict(),
+                        comment='File {0} is in the correct state'.format(name),
+                        name=name,
+                        result=True,
+                        __run_num__=i,
+                        start_time='10:00:{0:02d}.{1:06d}'.format(i % 60, i),
+                        duration=float(i % 97) / 10)
+                i += 1
+        return ret
+
+    def benchMessage(self, label, loss=0.0, delay=0.0, limit=None, burst=0,
+                     msg=None, zk=None, **kwa):
+        '''
+        Send one big message alpha to beta and return result odict
+        msg is message to send, None means random data of MSG_SIZE_BIG
+        zk is body compression kind, None means stack default
+        '''
+        stacking.RoadStack.BurstSize = burst
+        if zk is not None:
+            stacking.RoadStack.Zk = zk
+        alpha, beta = self.createPair(**kwa)
+        try:
+            for stack in [alpha, beta]:
+                stack.clearStats()
+            if msg is None:
+                bloat = binascii.hexlify(os.urandom(MSG_SIZE_BIG // 2)).decode('ascii')
+                msg = odict(who="Green", data=bloat)
+            alpha.transmit(msg)
+            elapsed = self.serviceLink([alpha, beta],
+                                       loss=loss,
+                                       delay=delay,
+                                       limit=limit,
+                                       duration=DURATION)
+            self.assertEqual(len(beta.rxMsgs), 1)
+            received, source = beta.rxMsgs.popleft()
+            self.assertEqual(received, msg)
+            result = odict(label=label,
+                           loss=loss,
+                           elapsed=elapsed,
+                           segments=alpha.stats.get('message_segment_tx', 0),
+                           redos=alpha.stats.get('redo_segment', 0),
+                           resends=alpha.stats.get('message_resend_rx', 0))
+        finally:
+            self.closePair([alpha, beta])
+        return result
+
+    def report(self, title, results):
+        '''
+        Print table of results
+        '''
+        console.terse("\n{0}\n".format(title))
+        console.terse("{0:<24} {1:>6} {2:>9} {3:>9} {4:>6} {5:>8}\n".format(
+                "config", "loss", "time", "segments", "redos", "resends"))
+        for result in results:
+            console.terse("{label:<24} {loss:>6.2f} {elapsed:>9.2f} {segments:>9} "
+                          "{redos:>6} {resends:>8}\n".format(**result))
+
+    def testCongestionLossDelay(self):
+        '''
+        Benchmark fixed bursts against congestion window under loss and delay
+        '''
+        console.terse("{0}\n".format(self.testCongestionLossDelay.__doc__))
+        configs = [("burst unlimited", dict(burst=0)),
+                   ("burst 100", dict(burst=100)),
+                   ("window", dict(windowInitial=4)),
+                   ("window paced", dict(windowInitial=4, pacing=True)), ]
+        results = []
+        for loss in LOSSES:
+            for label, kwa in configs:
+                results.append(self.benchMessage(label,
+                                                 loss=loss,
+                                                 delay=DELAY,
+                                                 limit=RX_LIMIT,
+                                                 **kwa))
+        self.report("Congestion delay {0} rx limit {1}".format(DELAY, RX_LIMIT),
+                    results)
+
+    def testCompression(self):
+        '''
+        Benchmark compressed body kind on salt like returns and random data
+        '''
+        console.terse("{0}\n".format(self.testCompression.__doc__))
+        payloads = [("salt {0}K".format(size // 1024), self.saltReturn(size))
+                    for size in SALT_SIZES]
+        bloat = binascii.hexlify(os.urandom(MSG_SIZE_BIG // 2)).decode('ascii')
+        payloads.append(("random hex 256K", odict(who="Green", data=bloat)))
+        results = []
+        for name, msg in payloads:
+            for label, zk in [("plain", raeting.ZipKind.nada.value),
+                              ("zlib", raeting.ZipKind.zlib.value)]:
+                results.append(self.benchMessage("{0} {1}".format(name, label),
+                                                 delay=DELAY,
+                                                 limit=RX_LIMIT,
+                                                 msg=msg,
+                                                 zk=zk,
+                                                 windowInitial=4))
+        self.report("Compression delay {0} rx limit {1}".format(DELAY, RX_LIMIT),
+                    results)
+        for i in range(0, len(SALT_SIZES) * 2, 2):
+            self.assertLess(results[i + 1]['segments'], results[i]['segments'])
+
+    def testPacketSize(self):
+        '''
+        Benchmark negotiated packet sizes on lossless and lossy links
+        '''
+        console.terse("{0}\n".format(self.testPacketSize.__doc__))
+        results = []
+        for loss in LOSSES:
+            for size in PACKET_SIZES:
+                results.append(self.benchMessage("packet {0}".format(size),
+                                                 loss=loss,
+                                                 delay=DELAY,
+                                                 limit=RX_LIMIT,
+                                                 windowInitial=4,
+                                                 packetSize=size))
+        self.report("Packet size delay {0} rx limit {1}".format(DELAY, RX_LIMIT),
+                    results)
+        for i in range(0, len(results), len(PACKET_SIZES)):
+            self.assertLess(results[i + len(PACKET_SIZES) - 1]['segments'],
+                            results[i]['segments'])
+
+    def testParity(self):
+        '''
+        Benchmark xor parity group sizes against resends alone under loss
+        '''
+        console.terse("{0}\n".format(self.testParity.__doc__))
+        results = []
+        for loss in PARITY_LOSSES:
+            for group in PARITY_GROUPS:
+                label = "parity {0}".format(group) if group else "no parity"
+                result = self.benchMessage(label,
+                                           loss=loss,
+                                           delay=DELAY,
+                                           limit=RX_LIMIT,
+                                           windowInitial=4,
+                                           parityGroup=group)
+                results.append(result)
+        self.report("Parity delay {0} rx limit {1}".format(DELAY, RX_LIMIT),
+                    results)
+
+    def testDedup(self):
+        '''
+        Benchmark deduplicated repeats of salt like returns against resending
+        '''
+        console.terse("{0}\n".format(self.testDedup.__doc__))
+        msg = self.saltReturn(SALT_SIZES[-1])
+        edited = odict(msg)
+        edited['retcode'] = 2
+        edited['ret'] = odict(msg['ret'])
+        key = edited['ret'].keys()[len(edited['ret']) // 2]
+        edited['ret'][key] = odict(edited['ret'][key], result=False)
+        results = []
+        for size in DEDUP_SIZES:
+            label = "dedup {0}".format(size) if size else "no dedup"
+            alpha, beta = self.createPair(windowInitial=4, dedupSize=size)
+            try:
+                for name, body in [("first", msg), ("repeat", msg), ("edited", edited)]:
+                    for stack in [alpha, beta]:
+                        stack.clearStats()
+                    alpha.transmit(body)
+                    elapsed = self.serviceLink([alpha, beta],
+                                               delay=DELAY,
+                                               limit=RX_LIMIT,
+                                               duration=DURATION)
+                    self.assertEqual(len(beta.rxMsgs), 1)
+                    received, source = beta.rxMsgs.popleft()
+                    self.assertEqual(received, body)
+                    results.append(odict(label="{0} {1}".format(label, name),
+                                         loss=0.0,
+                                         elapsed=elapsed,
+                                         segments=alpha.stats.get('message_segment_tx', 0),
+                                         redos=alpha.stats.get('redo_segment', 0),
+                                         resends=alpha.stats.get('message_resend_rx', 0)))
+            finally:
+                self.closePair([alpha, beta])
+        self.report("Dedup delay {0} rx limit {1}".format(DELAY, RX_LIMIT),
+                    results)
+        self.assertLess(results[4]['segments'] * 10, results[0]['segments'])
+        self.assertLess(results[5]['segments'] * 10, results[0]['segments'])
+
+    def testResume(self):
+        '''
+        Benchmark resumable messages against resending after a link outage
+        Segments counts those beta received since sends into the outage
+        never cross the link
+        '''
+        console.terse("{0}\n".format(self.testResume.__doc__))
+        msg = self.saltReturn(SALT_SIZES[-1])
+        results = []
+        for size in RESUME_SIZES:
+            label = "resume {0}".format(size) if size else "no resume"
+            alpha, beta = self.createPair(windowInitial=4, resumeSize=size,
+                                          resumePieceSize=RESUME_PIECE_SIZE)
+            try:
+                for stack in [alpha, beta]:
+                    stack.clearStats()
+                start = self.store.stamp
+                outage = (start + OUTAGE[0], start + OUTAGE[1])
+                while not beta.rxMsgs and self.store.stamp - start < DURATION:
+                    if not (alpha.transactions or alpha.txResumes):
+                        alpha.transmit(msg, timeout=OUTAGE_TIMEOUT) # resend whole
+                    self.serviceLink([alpha, beta],
+                                     delay=DELAY,
+                                     limit=RX_LIMIT,
+                                     outage=outage,
+                                     duration=DURATION)
+                    self.store.advanceStamp(TICK)
+                self.assertEqual(len(beta.rxMsgs), 1)
+                received, source = beta.rxMsgs.popleft()
+                self.assertEqual(received, msg)
+                results.append(odict(label=label,
+                                     loss=0.0,
+                                     elapsed=self.store.stamp - start,
+                                     segments=beta.stats.get('message_segment_rx', 0),
+                                     redos=alpha.stats.get('redo_segment', 0),
+                                     resends=alpha.stats.get('message_resend_rx', 0)))
+            finally:
+                self.closePair([alpha, beta])
+        self.report("Resume outage {0} delay {1} rx limit {2}".format(
+                OUTAGE, DELAY, RX_LIMIT), results)
+        self.assertLess(results[1]['segments'], results[0]['segments'])
+
+
+def runOne(test):
+    '''
+    Unittest Runner
+    '''
+    test = BenchTestCase(test)
+    suite = unittest.TestSuite([test])
+    unittest.TextTestRunner(verbosity=2).run(suite)
+
+
+def runSome():
+    '''
+    Unittest runner
+    '''
+    tests = []
+    names = [
+                'testCongestionLossDelay',
+                'testCompression',
+                'testPacketSize',
+                'testParity',
+                'testDedup',
+                'testResume',
+            ]
+
+    tests.extend(map(BenchTestCase, names))
+
+    suite = unittest.TestSuite(tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
+
+
+def runAll():
+    '''
+    Unittest runner
+    '''
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(BenchTestCase))
+
+    unittest.TextTestRunner(verbosity=2).run(suite)
+
+
+if __name__ == '__main__' and __package__ is None:
+
+    # console.reinit(verbosity=console.Wordage.concise)
+
+    # runAll()  # run all unittests
+
+    runSome()  # only run some
+
+    # runOne('testCongestionLossDelay')
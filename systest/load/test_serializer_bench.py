@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+'''
+Micro benchmarks for Raet body serializers
+
+Times pack and parse of each registered style of codec across message shapes
+in wall clock microseconds per call.
+'''
+from __future__ import print_function
+# pylint: skip-file
+import sys
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+import timeit
+
+from ioflo.base.odicting import odict
+
+from ioflo.base.consoling import getConsole
+console = getConsole()
+
+# Import raet libs
+from raet import raeting, serializing
+
+
+def setUpModule():
+    console.reinit(verbosity=console.Wordage.terse)
+
+
+def tearDownModule():
+    pass
+
+# Benchmark constants. Can be used to tune the benchmark.
+REPEAT = 3  # best of repeats is reported
+BUDGET = 0.2  # approximate wall clock seconds per timing
+
+
+def eventShape():
+    '''
+    Returns small flat salt like event body
+    '''
+    return odict([('route', odict([('src', ['minion', 'manor', None]),
+                                   ('dst', ['master', None, 'event_fire'])])),
+                  ('tag', 'salt/job/20150101000000000000/ret/minion'),
+                  ('data', odict([('jid', '20150101000000000000'),
+                                  ('fun', 'test.ping'),
+                                  ('return', True),
+                                  ('retcode', 0),
+                                  ('success', True),
+                                  ('_stamp', '2015-01-01T00:00:00.000000')]))])
+
+
+def returnShape(count=256):
+    '''
+    Returns nested salt like state return body of count states
+    '''
+    states = odict()
+    for i in range(count):
+        name = '/etc/app/conf.d/{0:05d}.conf'.format(i)
+        states['file_|-{0}_|-{0}_|-managed'.format(name)] = odict(
+                changes=odict(),
+                comment='File {0} is in the correct state'.format(name),
+                name=name,
+                result=True,
+                __run_num__=i,
+                duration=float(i % 97) / 10)
+    return odict(fun='state.highstate', id='minion', retcode=0, ret=states)
+
+
+def wideShape(count=4096):
+    '''
+    Returns body with long list of numbers
+    '''
+    return odict(id='minion', samples=[i * 7 % 1009 for i in range(count)])
+
+
+class BenchTestCase(unittest.TestCase):
+    '''
+    Times pack and parse per codec and message shape
+    '''
+
+    def time(self, call):
+        '''
+        Returns best microseconds per call
+        '''
+        number = 1
+        while timeit.timeit(call, number=number) < BUDGET / 10:
+            number *= 10
+        best = min(timeit.repeat(call, repeat=REPEAT, number=number))
+        return (best / number * 1e6)
+
+    def testSerializers(self):
+        '''
+        Benchmark serializers across message shapes
+        '''
+        console.terse("{0}\n".format(self.testSerializers.__doc__))
+        shapes = [("event", eventShape()),
+                  ("return", returnShape()),
+                  ("wide", wideShape())]
+        codecs = [("json odict", serializing.JsonSerializer()),
+                  ("json dict", serializing.JsonSerializer(ordered=False)),
+                  ("msgpack odict", serializing.MsgpackSerializer()),
+                  ("msgpack dict", serializing.MsgpackSerializer(ordered=False))]
+        console.terse("{0:<8} {1:<16} {2:>8} {3:>10} {4:>10}\n".format(
+                "shape", "codec", "bytes", "pack us", "parse us"))
+        for shape, body in shapes:
+            for label, codec in codecs:
+                packed = codec.pack(body)
+                self.assertEqual(codec.parse(packed), body)
+                packing = self.time(lambda: codec.pack(body))
+                parsing = self.time(lambda: codec.parse(packed))
+                console.terse("{0:<8} {1:<16} {2:>8} {3:>10.1f} {4:>10.1f}\n".format(
+                        shape, label, len(packed), packing, parsing))
+            prepacked = serializing.Packed(codecs[0][1].pack(body))
+            packing = self.time(lambda: codecs[0][1].pack(prepacked))
+            console.terse("{0:<8} {1:<16} {2:>8} {3:>10.1f} {4:>10}\n".format(
+                    shape, "packed passthru", len(prepacked), packing, "-"))
+
+
+def runOne(test):
+    '''
+    Unittest Runner
+    '''
+    test = BenchTestCase(test)
+    suite = unittest.TestSuite([test])
+    unittest.TextTestRunner(verbosity=2).run(suite)
+
+
+def runSome():
+    '''
+    Unittest runner
+    '''
+    tests = []
+    names = [
+                'testSerializers',
+            ]
+
+    tests.extend(map(BenchTestCase, names))
+
+    suite = unittest.TestSuite(tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
+
+
+def runAll():
+    '''
+    Unittest runner
+    '''
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(BenchTestCase))
+
+    unittest.TextTestRunner(verbosity=2).run(suite)
+
+
+if __name__ == '__main__' and __package__ is None:
+
+    # console.reinit(verbosity=console.Wordage.concise)
+
+    # runAll()  # run all unittests
+
+    runSome()  # only run some
+
+    # runOne('testSerializers')